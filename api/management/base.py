@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+class RebuildCommand(BaseCommand):
+    """
+    Base for commands that recompute a maintained table from ``File`` rows with
+    ``service.rebuild(user)``, for one user (``--user``) or all of them.
+    Subclasses set ``service``, ``rows_label`` and ``help``.
+    """
+    service = None
+    rows_label = 'rows'
+    verb = 'rebuild'
+    done = 'Rebuilt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help=f'Username to {self.verb} (default: all users)')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        rows = self.service.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f'{self.done} {rows} {self.rows_label}'))
@@ -0,0 +1,8 @@
+from api.management.base import RebuildCommand
+from api.services.stats_service import StatsService
+
+
+class Command(RebuildCommand):
+    help = 'Rebuilds the FileStat facets from File rows.'
+    service = StatsService
+    rows_label = 'file statistics'
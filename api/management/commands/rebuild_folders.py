@@ -0,0 +1,8 @@
+from api.management.base import RebuildCommand
+from api.services.folder_service import FolderService
+
+
+class Command(RebuildCommand):
+    help = 'Rebuilds the materialized Folder tree from File rows.'
+    service = FolderService
+    rows_label = 'folders'
@@ -0,0 +1,8 @@
+from api.management.base import RebuildCommand
+from api.services.tag_service import TagService
+
+
+class Command(RebuildCommand):
+    help = 'Rebuilds the Tag/FileTag index from File.tags.'
+    service = TagService
+    rows_label = 'tags'
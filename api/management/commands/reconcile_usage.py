@@ -0,0 +1,10 @@
+from api.management.base import RebuildCommand
+from api.services.usage_service import UsageService
+
+
+class Command(RebuildCommand):
+    help = 'Rebuilds the StorageUsage ledger from File rows.'
+    service = UsageService
+    rows_label = 'usage rows'
+    verb = 'reconcile'
+    done = 'Reconciled'
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.services.activity_log_service import ActivityLogPartitions, ActivityLogRetention
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming ActivityLog partitions and rolls expired rows into daily aggregates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.ACTIVITY_LOG['RETENTION_DAYS'],
+            help='Keep detail rows for this many days (default: ACTIVITY_LOG_RETENTION_DAYS)'
+        )
+        parser.add_argument('--max-days', type=int, default=None, help='Roll up at most this many days per run')
+        parser.add_argument('--months-ahead', type=int, default=2, help='Partitions to create ahead of the current month')
+
+    def handle(self, *args, **options):
+        created = ActivityLogPartitions.ensure(options['months_ahead'])
+        if created:
+            self.stdout.write(f"Created partitions: {', '.join(created)}")
+        days, rows = ActivityLogRetention.rollup(options['retention_days'], options['max_days'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {rows} activity log rows across {days} days'))
@@ -0,0 +1,58 @@
+import multiprocessing
+import signal
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from api.services.job_service import JobService
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs until stopped (SIGINT/SIGTERM finish the running jobs first).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOBS['THREADS'],
+            help='Jobs run concurrently per process (default: JOBS_THREADS)'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS['PROCESSES'],
+            help='Worker processes to fork (default: JOBS_PROCESSES)'
+        )
+        parser.add_argument('--queue', action='append', dest='queues', help='Only run jobs of this queue (repeatable)')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--retry-dead', nargs='?', const='', default=None, metavar='TASK',
+                            help='Requeue dead jobs (optionally of one task) and exit')
+
+    def handle(self, *args, **options):
+        if options['retry_dead'] is not None:
+            count = JobService.retry_dead(options['retry_dead'] or None)
+            self.stdout.write(self.style.SUCCESS(f'Requeued {count} dead jobs'))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        work = (options['threads'], options['queues'], options['once'], stop)
+
+        if options['processes'] <= 1:
+            JobService.work(*work)
+            return
+
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=JobService.work, args=work, name=f'run_jobs-{index}')
+            for index in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+        while any(child.is_alive() for child in children):
+            if stop.wait(1):
+                for child in children:
+                    if child.is_alive():
+                        child.terminate()
+                break
+        for child in children:
+            child.join()
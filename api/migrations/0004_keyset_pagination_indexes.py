@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_apikey_prefix_backfill'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='activitylog',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Activity Log', 'verbose_name_plural': 'Activity Logs'},
+        ),
+        migrations.AlterModelOptions(
+            name='file',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'File', 'verbose_name_plural': 'Files'},
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='activitylog_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='file_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_usage(apps, schema_editor):
+    File = apps.get_model('api', 'File')
+    StorageUsage = apps.get_model('api', 'StorageUsage')
+    totals = File.objects.order_by().values('user_id', 'storage_account_id', 'file_type').annotate(
+        total_bytes=Sum('size'), file_count=Count('id')
+    )
+    StorageUsage.objects.bulk_create([StorageUsage(**row) for row in totals], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='storage_quota_bytes',
+            field=models.BigIntegerField(blank=True, help_text='Overrides STORAGE_QUOTA_BYTES for this user. 0 means unlimited.', null=True, verbose_name='Storage Quota (Bytes)'),
+        ),
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_type', models.CharField(max_length=100, verbose_name='MIME Type')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='Total Bytes')),
+                ('file_count', models.IntegerField(default=0, verbose_name='File Count')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('storage_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='api.storagecredential')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='storage_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Storage Usage',
+                'verbose_name_plural': 'Storage Usage',
+                'unique_together': {('user', 'storage_account', 'file_type')},
+            },
+        ),
+        migrations.RunPython(backfill_usage, migrations.RunPython.noop),
+    ]
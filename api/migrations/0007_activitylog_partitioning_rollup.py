@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.conf import settings
+import datetime
+from django.db import migrations, models
+
+
+def _month_partitions(first_month, last_month):
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        yield f"api_activitylog_p{month:%Y%m}", month, following
+        month = following
+
+
+def partition_activity_log(apps, schema_editor):
+    """
+    Rebuilds api_activitylog as a table partitioned monthly on created_at
+    (PostgreSQL only). Other backends keep the plain table and retention
+    falls back to DELETE.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'api_activitylog' AND indexname <> 'api_activitylog_pkey'"
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'api_activitylog'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT MIN(created_at)::date FROM api_activitylog")
+        today = datetime.date.today()
+        first_month = cursor.fetchone()[0] or today
+        last_month = (today.replace(day=1) + datetime.timedelta(days=64)).replace(day=1)
+
+        cursor.execute('ALTER TABLE api_activitylog RENAME TO api_activitylog_unpartitioned')
+        cursor.execute(
+            'CREATE TABLE api_activitylog (LIKE api_activitylog_unpartitioned INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute('CREATE TABLE api_activitylog_default PARTITION OF api_activitylog DEFAULT')
+        for name, start, end in _month_partitions(first_month, last_month):
+            cursor.execute(f"CREATE TABLE {name} PARTITION OF api_activitylog FOR VALUES FROM ('{start}') TO ('{end}')")
+        cursor.execute('INSERT INTO api_activitylog SELECT * FROM api_activitylog_unpartitioned')
+        cursor.execute('DROP TABLE api_activitylog_unpartitioned')
+        # The partition key must be part of the primary key.
+        cursor.execute('ALTER TABLE api_activitylog ADD CONSTRAINT api_activitylog_pkey PRIMARY KEY (id, created_at)')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE api_activitylog ADD CONSTRAINT {name} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_activitylog_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('action_type', models.CharField(choices=[('login', 'User Login'), ('logout', 'User Logout'), ('upload', 'File Upload'), ('delete', 'File Delete'), ('update', 'File Update'), ('create_category', 'Category Created'), ('api_key_generated', 'API Key Generated'), ('settings_update', 'Settings Updated'), ('other', 'Other Action')], max_length=50)),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity Log Rollup',
+                'verbose_name_plural': 'Activity Log Rollups',
+                'ordering': ['-day', 'action_type'],
+                'unique_together': {('user', 'day', 'action_type')},
+            },
+        ),
+        migrations.RunPython(partition_activity_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:12
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    ApiKey = apps.get_model('api', 'ApiKey')
+    for api_key in ApiKey.objects.all():
+        api_key.key_hash = hashlib.sha256(api_key.key.encode()).hexdigest()
+        api_key.prefix = api_key.key[:10]
+        api_key.save(update_fields=['key_hash', 'prefix'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_activitylog_partitioning_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='API Key Digest'),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='apikey',
+            name='key',
+        ),
+        migrations.AlterField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True, verbose_name='API Key Digest'),
+        ),
+        migrations.AlterField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=10, verbose_name='Key Prefix'),
+        ),
+    ]
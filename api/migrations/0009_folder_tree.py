@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+# Frozen copies of the api.models helpers as of this migration.
+def normalize_folder_path(path):
+    segments = [segment for segment in (path or '').strip().split('/') if segment.strip()]
+    return '/' + '/'.join(segment.strip() for segment in segments)
+
+
+def folder_ancestors(path):
+    ancestors = ['/']
+    for segment in path.strip('/').split('/'):
+        if segment:
+            ancestors.append(ancestors[-1].rstrip('/') + '/' + segment)
+    return ancestors
+
+
+def backfill_folders(apps, schema_editor):
+    File = apps.get_model('api', 'File')
+    Folder = apps.get_model('api', 'Folder')
+    for raw in File.objects.order_by().values_list('folder_path', flat=True).distinct():
+        if raw != normalize_folder_path(raw):
+            File.objects.filter(folder_path=raw).update(folder_path=normalize_folder_path(raw))
+    folders = {}
+    totals = File.objects.order_by().values('user_id', 'folder_path').annotate(total=Sum('size'), count=Count('id'))
+    for row in totals:
+        ancestors = folder_ancestors(row['folder_path'])
+        for depth, path in enumerate(ancestors):
+            folder = folders.get((row['user_id'], path))
+            if folder is None:
+                folder = folders[(row['user_id'], path)] = Folder(
+                    user_id=row['user_id'], path=path, parent_path=ancestors[depth - 1] if depth else None,
+                    name=path.rsplit('/', 1)[-1], depth=depth,
+                )
+            folder.tree_bytes += row['total']
+            folder.tree_file_count += row['count']
+            if path == row['folder_path']:
+                folder.total_bytes += row['total']
+                folder.file_count += row['count']
+    Folder.objects.bulk_create(folders.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_apikey_key_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Folder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, verbose_name='Path')),
+                ('parent_path', models.CharField(blank=True, max_length=255, null=True, verbose_name='Parent Path')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('depth', models.PositiveSmallIntegerField(default=0, verbose_name='Depth')),
+                ('file_count', models.IntegerField(default=0, verbose_name='File Count')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='Total Bytes')),
+                ('tree_file_count', models.IntegerField(default=0, verbose_name='File Count (Recursive)')),
+                ('tree_bytes', models.BigIntegerField(default=0, verbose_name='Total Bytes (Recursive)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='folders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Folder',
+                'verbose_name_plural': 'Folders',
+                'ordering': ['path'],
+                'indexes': [models.Index(fields=['user', 'parent_path', 'name'], name='folder_user_parent_idx')],
+                'unique_together': {('user', 'path')},
+            },
+        ),
+        migrations.RunPython(backfill_folders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:04
+
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+# Frozen copy of api.models.build_search_document as of this migration.
+def build_search_document(name, original_name='', tags=(), category_names=()):
+    text = ' '.join(str(part) for part in [name, original_name, *(tags or []), *category_names] if part)
+    return ' '.join(dict.fromkeys(re.sub(r'[\W_]+', ' ', text).lower().split()))
+
+
+def backfill_search_documents(apps, schema_editor):
+    File = apps.get_model('api', 'File')
+    Through = File.categories.through
+    names = defaultdict(list)
+    for file_id, name in Through.objects.values_list('file_id', 'category__name').iterator():
+        names[file_id].append(name)
+    batch = []
+    for file in File.objects.only('pk', 'name', 'original_name', 'tags').iterator(chunk_size=1000):
+        file.search_document = build_search_document(file.name, file.original_name, file.tags, names[file.pk])
+        batch.append(file)
+        if len(batch) >= 1000:
+            File.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    File.objects.bulk_update(batch, ['search_document'])
+
+
+def install_search_index(apps, schema_editor):
+    # The DDL of SearchService.install as of this migration.
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'postgresql':
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS file_search_fts_idx ON api_file "
+                "USING GIN (to_tsvector('simple', search_document))"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS file_search_trgm_idx ON api_file "
+                "USING GIN (search_document gin_trgm_ops)"
+            )
+        elif schema_editor.connection.vendor == 'sqlite':
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS api_file_fts USING fts5("
+                "search_document, content='api_file', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS api_file_fts_ai AFTER INSERT ON api_file BEGIN "
+                "INSERT INTO api_file_fts(rowid, search_document) VALUES (new.rowid, new.search_document); END"
+            )
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS api_file_fts_ad AFTER DELETE ON api_file BEGIN "
+                "INSERT INTO api_file_fts(api_file_fts, rowid, search_document) "
+                "VALUES ('delete', old.rowid, old.search_document); END"
+            )
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS api_file_fts_au AFTER UPDATE OF search_document ON api_file BEGIN "
+                "INSERT INTO api_file_fts(api_file_fts, rowid, search_document) "
+                "VALUES ('delete', old.rowid, old.search_document); "
+                "INSERT INTO api_file_fts(rowid, search_document) VALUES (new.rowid, new.search_document); END"
+            )
+            cursor.execute("INSERT INTO api_file_fts(api_file_fts) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS file_search_fts_idx')
+            cursor.execute('DROP INDEX IF EXISTS file_search_trgm_idx')
+        elif schema_editor.connection.vendor == 'sqlite':
+            for trigger in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS api_file_fts_{trigger}')
+            cursor.execute('DROP TABLE IF EXISTS api_file_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_folder_tree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Search Document'),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, drop_search_index),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:07
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    File = apps.get_model('api', 'File')
+    Tag = apps.get_model('api', 'Tag')
+    FileTag = apps.get_model('api', 'FileTag')
+    links = defaultdict(list)
+    for file in File.objects.only('pk', 'user_id', 'tags').iterator(chunk_size=1000):
+        names = (str(tag).strip()[:100] for tag in (file.tags or []) if tag is not None)
+        for name in dict.fromkeys(name for name in names if name):
+            links[(file.user_id, name)].append(file.pk)
+    Tag.objects.bulk_create(
+        [Tag(user_id=user_id, name=name, file_count=len(file_ids)) for (user_id, name), file_ids in links.items()],
+        batch_size=1000,
+    )
+    tag_ids = {(tag.user_id, tag.name): tag.pk for tag in Tag.objects.all()}
+    FileTag.objects.bulk_create(
+        [FileTag(file_id=file_id, tag_id=tag_ids[key]) for key, file_ids in links.items() for file_id in file_ids],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_file_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('file_count', models.IntegerField(default=0, verbose_name='File Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['-file_count', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FileTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_tags', to='api.file')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_tags', to='api.tag')),
+            ],
+            options={
+                'verbose_name': 'File Tag',
+                'verbose_name_plural': 'File Tags',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-file_count', 'name'], name='tag_user_count_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='filetag',
+            unique_together={('tag', 'file')},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:09
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_file_stats(apps, schema_editor):
+    File = apps.get_model('api', 'File')
+    FileStat = apps.get_model('api', 'FileStat')
+    totals = defaultdict(lambda: [0, 0])
+    rows = File.objects.values_list('user_id', 'file_type', 'extension', 'storage_account_id', 'is_favorite', 'created_at', 'size')
+    for user_id, file_type, extension, account_id, is_favorite, created_at, size in rows.iterator(chunk_size=1000):
+        if timezone.is_aware(created_at):
+            created_at = timezone.localtime(created_at)
+        for dimension, key in (
+            ('file_type', file_type or ''),
+            ('extension', extension or ''),
+            ('storage_account', str(account_id) if account_id else ''),
+            ('is_favorite', 'true' if is_favorite else 'false'),
+            ('month', created_at.strftime('%Y-%m')),
+        ):
+            total = totals[(user_id, dimension, key[:100])]
+            total[0] += size
+            total[1] += 1
+    FileStat.objects.bulk_create([
+        FileStat(user_id=user_id, dimension=dimension, key=key, total_bytes=total_bytes, file_count=file_count)
+        for (user_id, dimension, key), (total_bytes, file_count) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_tag_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20, verbose_name='Dimension')),
+                ('key', models.CharField(blank=True, max_length=100, verbose_name='Key')),
+                ('file_count', models.IntegerField(default=0, verbose_name='File Count')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='Total Bytes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'File Statistic',
+                'verbose_name_plural': 'File Statistics',
+                'ordering': ['dimension', 'key'],
+                'unique_together': {('user', 'dimension', 'key')},
+            },
+        ),
+        migrations.RunPython(backfill_file_stats, migrations.RunPython.noop),
+    ]
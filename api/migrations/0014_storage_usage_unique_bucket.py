@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_unassigned_duplicates(apps, schema_editor):
+    # Rows without a storage account were not unique before; fold each group into one.
+    StorageUsage = apps.get_model('api', 'StorageUsage')
+    groups = StorageUsage.objects.filter(storage_account__isnull=True).order_by().values('user_id', 'file_type').annotate(
+        rows=Count('id'), total_bytes=Sum('total_bytes'), file_count=Sum('file_count')
+    ).filter(rows__gt=1)
+    for group in groups:
+        rows = StorageUsage.objects.filter(
+            user_id=group['user_id'], storage_account__isnull=True, file_type=group['file_type']
+        ).order_by('id')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        StorageUsage.objects.filter(pk=keep.pk).update(
+            total_bytes=group['total_bytes'], file_count=group['file_count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_job_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='storageusage',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_unassigned_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='storageusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('storage_account__isnull', False)), fields=('user', 'storage_account', 'file_type'), name='storage_usage_unique_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='storageusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('storage_account__isnull', True)), fields=('user', 'file_type'), name='storage_usage_unique_unassigned'),
+        ),
+    ]
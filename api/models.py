@@ -1,9 +1,17 @@
 
+import copy
+import hashlib
+import re
+import secrets
+import threading
 import uuid
+from contextlib import contextmanager
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+from django.db import connections, transaction
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed, post_migrate
+from django.dispatch import receiver, Signal
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -29,6 +37,32 @@ def validate_hex_color(value):
     if not value.startswith('#') or len(value) not in [4, 7]:
         raise ValidationError(_('Invalid HEX color code.'))
 
+def normalize_folder_path(path):
+    """
+    Returns the canonical form of a virtual folder path: a leading slash, no
+    empty segments and no trailing slash (``/`` for the root).
+    """
+    segments = [segment for segment in (path or '').strip().split('/') if segment.strip()]
+    return '/' + '/'.join(segment.strip() for segment in segments)
+
+def build_search_document(name, original_name='', tags=(), category_names=()):
+    """
+    Returns the lowercased, de-duplicated words of a file's searchable text.
+    Punctuation and underscores split words, so ``q3_report.pdf`` indexes as ``q3 report pdf``.
+    """
+    text = ' '.join(str(part) for part in [name, original_name, *(tags or []), *category_names] if part)
+    return ' '.join(dict.fromkeys(re.sub(r'[\W_]+', ' ', text).lower().split()))
+
+def folder_ancestors(path):
+    """
+    Returns ``path`` and every folder above it, root first: ``/a/b`` -> ``['/', '/a', '/a/b']``.
+    """
+    ancestors = ['/']
+    for segment in path.strip('/').split('/'):
+        if segment:
+            ancestors.append(ancestors[-1].rstrip('/') + '/' + segment)
+    return ancestors
+
 # ==============================================================================
 # MODELS
 # ==============================================================================
@@ -63,6 +97,10 @@ class Profile(TimeStampedModel):
     bio = models.TextField(blank=True, verbose_name=_("Bio"))
     phone_number = models.CharField(max_length=20, blank=True, verbose_name=_("Phone Number"))
     is_verified = models.BooleanField(default=False, verbose_name=_("Is Verified"))
+    storage_quota_bytes = models.BigIntegerField(
+        null=True, blank=True, verbose_name=_("Storage Quota (Bytes)"),
+        help_text=_("Overrides STORAGE_QUOTA_BYTES for this user. 0 means unlimited.")
+    )
     preferences = models.JSONField(default=dict, blank=True, verbose_name=_("User Preferences"))
 
     class Meta:
@@ -135,6 +173,20 @@ class StorageCredential(TimeStampedModel):
         super().save(*args, **kwargs)
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_file_count(self):
+        """
+        Annotates ``file_count`` with a correlated subquery on the M2M through table.
+        A plain ``Count('files')`` would share the join used when the queryset is
+        prefetched through ``File.categories`` and count only the prefetched file.
+        """
+        through = File.categories.through
+        counts = through.objects.filter(category_id=models.OuterRef('pk')).order_by().values('category_id').annotate(
+            total=models.Count('*')
+        ).values('total')
+        return self.annotate(file_count=Coalesce(models.Subquery(counts), 0))
+
+
 class Category(TimeStampedModel):
     """
     Categories for organizing files.
@@ -153,6 +205,8 @@ class Category(TimeStampedModel):
     sort_order = models.IntegerField(default=0, verbose_name=_("Sort Order"))
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='subcategories')
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Category")
         verbose_name_plural = _("Categories")
@@ -164,7 +218,20 @@ class Category(TimeStampedModel):
 
     @property
     def file_count(self):
-        return self.files.count()
+        """
+        Prefer the ``file_count`` annotation (see ``Category.objects.with_file_count``);
+        falls back to a COUNT query for instances loaded without it.
+        """
+        if self._file_count is None:
+            return self.files.count()
+        return self._file_count
+
+    @file_count.setter
+    def file_count(self, value):
+        # Lets queryset annotations named ``file_count`` populate the property.
+        self._file_count = value
+
+    _file_count = None
 
 
 class File(TimeStampedModel):
@@ -194,6 +261,9 @@ class File(TimeStampedModel):
     is_favorite = models.BooleanField(default=False, verbose_name=_("Is Favorite"))
     is_public = models.BooleanField(default=False, verbose_name=_("Is Public"))
     
+    # Name, tags and category names, kept current by signals; indexed for search
+    search_document = models.TextField(blank=True, default='', editable=False, verbose_name=_("Search Document"))
+
     # Analytics
     download_count = models.IntegerField(default=0, verbose_name=_("Download Count"))
     last_accessed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Last Accessed"))
@@ -201,30 +271,190 @@ class File(TimeStampedModel):
     class Meta:
         verbose_name = _("File")
         verbose_name_plural = _("Files")
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['user', 'file_type']),
             models.Index(fields=['user', 'folder_path']),
+            models.Index(fields=['user', '-created_at', '-id'], name='file_user_created_idx'),
         ]
 
     def __str__(self):
         return self.name
 
+    # Fields whose last saved values the denormalized aggregates need on
+    # save/delete. Captured on load (post_init) and after every save.
+    TRACKED_FIELDS = (
+        'user_id', 'storage_account_id', 'file_type', 'size', 'folder_path',
+        'name', 'original_name', 'tags', 'extension', 'is_favorite', 'created_at',
+    )
+    SEARCH_FIELDS = ('name', 'original_name', 'tags')
+
     def save(self, *args, **kwargs):
+        self.ensure_extension()
+        self.folder_path = normalize_folder_path(self.folder_path)
+        if self._state.adding:
+            # A new file has no categories yet; later changes go through SearchService.refresh.
+            self.search_document = build_search_document(self.name, self.original_name, self.tags)
+        super().save(*args, **kwargs)
+        self.snapshot()
+
+    def ensure_extension(self):
         if not self.extension and self.name:
             import os
             _, ext = os.path.splitext(self.name)
             self.extension = ext.lower().replace('.', '')
-        super().save(*args, **kwargs)
+
+    def snapshot(self):
+        # Copied so in-place edits (e.g. ``tags.append``) still show up as changes.
+        self._tracked = {name: copy.copy(self.__dict__.get(name)) for name in self.TRACKED_FIELDS}
 
     @property
     def size_formatted(self):
         """Returns size in human readable format."""
+        size = self.size
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if self.size < 1024.0:
-                return f"{self.size:.2f} {unit}"
-            self.size /= 1024.0
-        return f"{self.size:.2f} PB"
+            if size < 1024.0:
+                return f"{size:.2f} {unit}"
+            size /= 1024.0
+        return f"{size:.2f} PB"
+
+
+class Tag(models.Model):
+    """
+    Per-user tag dictionary behind ``File.tags``, linked to files through ``FileTag``.
+    ``file_count`` is kept current by ``File`` signals; rebuilt by ``manage.py rebuild_tags``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=100, verbose_name=_("Name"))
+    file_count = models.IntegerField(default=0, verbose_name=_("File Count"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Tag")
+        verbose_name_plural = _("Tags")
+        ordering = ['-file_count', 'name']
+        unique_together = ['user', 'name']
+        indexes = [
+            models.Index(fields=['user', '-file_count', 'name'], name='tag_user_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class FileTag(models.Model):
+    """
+    Indexed link between a file and each of its tags.
+    """
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name='file_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='file_tags')
+
+    class Meta:
+        verbose_name = _("File Tag")
+        verbose_name_plural = _("File Tags")
+        unique_together = ['tag', 'file']
+
+    def __str__(self):
+        return f"{self.file_id} {self.tag_id}"
+
+
+class StorageUsage(models.Model):
+    """
+    Denormalized storage totals per user, storage account and MIME type.
+    Kept current by ``File`` signals; rebuilt by ``manage.py reconcile_usage``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='storage_usage')
+    storage_account = models.ForeignKey(StorageCredential, on_delete=models.CASCADE, null=True, blank=True, related_name='usage')
+    file_type = models.CharField(max_length=100, verbose_name=_("MIME Type"))
+    total_bytes = models.BigIntegerField(default=0, verbose_name=_("Total Bytes"))
+    file_count = models.IntegerField(default=0, verbose_name=_("File Count"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Storage Usage")
+        verbose_name_plural = _("Storage Usage")
+        constraints = [
+            # Files without a storage account share one row per type; a partial index per
+            # case keeps that unique on every backend, unlike NULLS NOT DISTINCT.
+            models.UniqueConstraint(
+                fields=['user', 'storage_account', 'file_type'], condition=models.Q(storage_account__isnull=False),
+                name='storage_usage_unique_bucket'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'file_type'], condition=models.Q(storage_account__isnull=True),
+                name='storage_usage_unique_unassigned'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.file_type}: {self.total_bytes} bytes"
+
+
+class Folder(models.Model):
+    """
+    Materialized virtual folder tree: one row per user and normalized path, with
+    ``/`` as the root. ``file_count``/``total_bytes`` cover files directly in the
+    folder; ``tree_file_count``/``tree_bytes`` include every descendant.
+    Kept current by ``File`` signals; rebuilt by ``manage.py rebuild_folders``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='folders')
+    path = models.CharField(max_length=255, verbose_name=_("Path"))
+    parent_path = models.CharField(max_length=255, null=True, blank=True, verbose_name=_("Parent Path"))
+    name = models.CharField(max_length=255, verbose_name=_("Name"))
+    depth = models.PositiveSmallIntegerField(default=0, verbose_name=_("Depth"))
+    file_count = models.IntegerField(default=0, verbose_name=_("File Count"))
+    total_bytes = models.BigIntegerField(default=0, verbose_name=_("Total Bytes"))
+    tree_file_count = models.IntegerField(default=0, verbose_name=_("File Count (Recursive)"))
+    tree_bytes = models.BigIntegerField(default=0, verbose_name=_("Total Bytes (Recursive)"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Folder")
+        verbose_name_plural = _("Folders")
+        ordering = ['path']
+        unique_together = ['user', 'path']
+        indexes = [
+            models.Index(fields=['user', 'parent_path', 'name'], name='folder_user_parent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.path}"
+
+    @classmethod
+    def for_path(cls, user_id, path):
+        ancestors = folder_ancestors(path)
+        return cls(
+            user_id=user_id,
+            path=path,
+            parent_path=ancestors[-2] if len(ancestors) > 1 else None,
+            name=path.rsplit('/', 1)[-1],
+            depth=len(ancestors) - 1,
+        )
+
+
+class FileStat(models.Model):
+    """
+    Per-user file counts and bytes by facet: ``dimension`` is one of ``DIMENSIONS``
+    and ``key`` its value, e.g. ``('extension', 'pdf')`` or ``('month', '2024-05')``.
+    Kept current by ``File`` signals; rebuilt by ``manage.py rebuild_file_stats``.
+    """
+    DIMENSIONS = ('file_type', 'extension', 'storage_account', 'is_favorite', 'month')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='file_stats')
+    dimension = models.CharField(max_length=20, verbose_name=_("Dimension"))
+    key = models.CharField(max_length=100, blank=True, verbose_name=_("Key"))
+    file_count = models.IntegerField(default=0, verbose_name=_("File Count"))
+    total_bytes = models.BigIntegerField(default=0, verbose_name=_("Total Bytes"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("File Statistic")
+        verbose_name_plural = _("File Statistics")
+        ordering = ['dimension', 'key']
+        unique_together = ['user', 'dimension', 'key']
+
+    def __str__(self):
+        return f"{self.user_id} {self.dimension}={self.key}: {self.file_count}"
 
 
 class ActivityLog(models.Model):
@@ -250,26 +480,56 @@ class ActivityLog(models.Model):
     details = models.JSONField(default=dict, blank=True, verbose_name=_("Metadata"))
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name=_("IP Address"))
     user_agent = models.TextField(blank=True, null=True, verbose_name=_("User Agent"))
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the writer when the entry is queued, not when the batch is flushed
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = _("Activity Log")
         verbose_name_plural = _("Activity Logs")
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='activitylog_user_created_idx'),
+            # Retention: finds and ranges over expired rows across all users.
+            models.Index(fields=['created_at'], name='activitylog_created_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.created_at.strftime('%Y-%m-%d %H:%M')}] {self.user.username}: {self.action_type}"
 
 
+class ActivityLogRollup(models.Model):
+    """
+    Per-user daily action counts for activity log rows past the retention window.
+    Written by ``manage.py rollup_activity_logs``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_rollups')
+    day = models.DateField(verbose_name=_("Day"))
+    action_type = models.CharField(max_length=50, choices=ActivityLog.ACTION_TYPES)
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Activity Log Rollup")
+        verbose_name_plural = _("Activity Log Rollups")
+        ordering = ['-day', 'action_type']
+        unique_together = ['user', 'day', 'action_type']
+
+    def __str__(self):
+        return f"[{self.day}] {self.user_id}: {self.action_type} x{self.count}"
+
+
 class ApiKey(TimeStampedModel):
     """
     API Keys for programmatic access (e.g., CI/CD, external scripts).
+    Only a SHA-256 digest of the key is stored; the raw key is shown once by ``generate``.
     """
+    KEY_PREFIX = 'sk_'
+    PREFIX_LENGTH = 10
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_keys')
     name = models.CharField(max_length=255, verbose_name=_("Key Name"))
-    key = models.CharField(max_length=255, unique=True, editable=False, verbose_name=_("API Key"))
-    prefix = models.CharField(max_length=10, editable=False, verbose_name=_("Key Prefix"), default='')
+    key_hash = models.CharField(max_length=64, unique=True, editable=False, verbose_name=_("API Key Digest"))
+    prefix = models.CharField(max_length=10, editable=False, db_index=True, verbose_name=_("Key Prefix"), default='')
     
     last_used_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Last Used At"))
     expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Expires At"))
@@ -284,6 +544,21 @@ class ApiKey(TimeStampedModel):
     def __str__(self):
         return f"{self.name} ({self.prefix}...)"
 
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    @classmethod
+    def generate(cls, user, name, **fields):
+        """
+        Creates a key and returns ``(api_key, raw_key)``. The raw key is not recoverable later.
+        """
+        raw_key = cls.KEY_PREFIX + secrets.token_urlsafe(32)
+        api_key = cls.objects.create(
+            user=user, name=name, key_hash=cls.hash_key(raw_key), prefix=raw_key[:cls.PREFIX_LENGTH], **fields
+        )
+        return api_key, raw_key
+
     def is_valid(self):
         if not self.is_active:
             return False
@@ -319,10 +594,78 @@ class ShareLink(TimeStampedModel):
         return f"/s/{self.token}"
 
 
+class Job(models.Model):
+    """
+    Background work queued in the database and run by ``manage.py run_jobs``.
+    ``name`` selects a handler registered with ``JobService.task``. Failed jobs
+    are retried with backoff until ``max_attempts``, then kept as ``dead``;
+    finished jobs are deleted.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DEAD, 'Dead'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name=_("Task Name"))
+    queue = models.CharField(max_length=50, default='default', verbose_name=_("Queue"))
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_("Payload"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name=_("Status"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name=_("Max Attempts"))
+    run_at = models.DateTimeField(default=timezone.now, verbose_name=_("Run At"))
+    locked_by = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Locked By"))
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Locked At"))
+    last_error = models.TextField(blank=True, verbose_name=_("Last Error"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Job")
+        verbose_name_plural = _("Jobs")
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
 # ==============================================================================
 # SIGNALS
 # ==============================================================================
 
+# Sent with ``user_id`` and ``files`` after ``File.objects.bulk_create``, which
+# bypasses ``post_save``. Receivers must do in bulk what the per-row ones do.
+files_bulk_created = Signal()
+# Sent with ``user_id``, ``ids`` and ``fields`` after a set-based update
+# (``fields`` may include ``categories`` for through-table changes). When a
+# tracked field changes, ``previous`` holds the changed rows' ``pk`` and
+# ``TRACKED_FIELDS`` values from before the update.
+files_bulk_updated = Signal()
+# Sent with ``user_id`` and the deleted ``files`` (as loaded before deletion).
+files_bulk_deleted = Signal()
+
+_file_receivers = threading.local()
+
+@contextmanager
+def bulk_file_changes():
+    """
+    Mutes the per-row ``File`` receivers while a bulk path applies their effects
+    itself through the ``files_bulk_*`` signals.
+    """
+    _file_receivers.muted = True
+    try:
+        yield
+    finally:
+        _file_receivers.muted = False
+
+def file_receivers_muted():
+    return getattr(_file_receivers, 'muted', False)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -334,15 +677,297 @@ def save_user_profile(sender, instance, **kwargs):
 
 @receiver(post_save, sender=File)
 def log_file_upload(sender, instance, created, **kwargs):
-    if created:
-        ActivityLog.objects.create(
-            user=instance.user,
-            action_type='upload',
-            description=f"Uploaded file: {instance.name}",
+    if created and not file_receivers_muted():
+        from api.services.activity_log_service import ActivityLogWriter
+        ActivityLogWriter.log(
+            instance.user_id,
+            'upload',
+            f"Uploaded file: {instance.name}",
             details={'file_id': str(instance.id), 'size': instance.size}
         )
 
-@receiver(pre_save, sender=ApiKey)
-def ensure_apikey_prefix(sender, instance, **kwargs):
-    if not instance.prefix and instance.key:
-        instance.prefix = instance.key[:7]
+@receiver(files_bulk_created)
+def log_bulk_file_upload(sender, user_id, files, **kwargs):
+    from api.services.activity_log_service import ActivityLogWriter
+    ActivityLogWriter.log_many([
+        ActivityLogWriter.build(
+            user_id,
+            'upload',
+            f"Uploaded file: {file.name}",
+            details={'file_id': str(file.id), 'size': file.size}
+        )
+        for file in files
+    ])
+
+@receiver(post_save, sender=ApiKey)
+@receiver(post_delete, sender=ApiKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    from api.utils.authentication import ApiKeyAuthentication
+    ApiKeyAuthentication.invalidate(instance.key_hash)
+
+@receiver(post_save, sender=StorageCredential)
+@receiver(post_delete, sender=StorageCredential)
+def invalidate_credential_registry(sender, instance, **kwargs):
+    from api.services.credential_registry import CredentialRegistry
+    # Drop now for this thread, and again after commit so no other worker caches
+    # the pre-commit rows under the new version.
+    CredentialRegistry.invalidate()
+    transaction.on_commit(CredentialRegistry.invalidate)
+
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+def invalidate_file_responses(sender, instance, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.utils.cache import ResponseCache
+    # Category listings carry file counts, so they go stale with the files.
+    ResponseCache.bump(['files', 'categories'], instance.user_id)
+
+@receiver(files_bulk_created)
+@receiver(files_bulk_updated)
+@receiver(files_bulk_deleted)
+def invalidate_bulk_file_responses(sender, user_id, **kwargs):
+    from api.utils.cache import ResponseCache
+    ResponseCache.bump(['files', 'categories'], user_id)
+
+@receiver(m2m_changed, sender=File.categories.through)
+def invalidate_file_category_responses(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not file_receivers_muted():
+        from api.utils.cache import ResponseCache
+        ResponseCache.bump(['files', 'categories'], instance.user_id)
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    from api.utils.cache import ResponseCache
+    ResponseCache.bump(['files', 'categories'], instance.user_id)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    from api.utils.authentication import UserSnapshotCache
+    UserSnapshotCache.invalidate(instance.pk if sender is User else instance.user_id)
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_responses(sender, instance, **kwargs):
+    from api.utils.cache import ResponseCache
+    ResponseCache.bump('profile', instance.user_id)
+
+@receiver(post_save, sender=User)
+def reset_user_responses(sender, instance, created, **kwargs):
+    from api.utils.cache import ResponseCache
+    # The profile response embeds user fields (username, email, names).
+    ResponseCache.bump(['files', 'categories', 'profile'] if created else 'profile', instance.pk)
+
+@receiver(post_init, sender=File)
+def snapshot_file(sender, instance, **kwargs):
+    instance.snapshot()
+
+@receiver(post_save, sender=File)
+def update_usage_on_save(sender, instance, created, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.usage_service import UsageService
+    UsageService.file_saved(instance, created)
+
+@receiver(files_bulk_created)
+def update_usage_on_bulk_create(sender, user_id, files, **kwargs):
+    from api.services.usage_service import UsageService
+    UsageService.files_created(files)
+
+@receiver(post_delete, sender=File)
+def update_usage_on_delete(sender, instance, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.usage_service import UsageService
+    UsageService.file_deleted(instance)
+
+@receiver(files_bulk_deleted)
+def update_usage_on_bulk_delete(sender, user_id, files, **kwargs):
+    from api.services.usage_service import UsageService
+    UsageService.files_deleted(files)
+
+@receiver(pre_delete, sender=StorageCredential)
+def detach_usage_from_credential(sender, instance, **kwargs):
+    from api.services.usage_service import UsageService
+    UsageService.detach_account(instance)
+
+@receiver(pre_delete, sender=StorageCredential)
+def detach_stats_from_credential(sender, instance, **kwargs):
+    from api.services.stats_service import StatsService
+    StatsService.detach_account(instance)
+
+@receiver(post_save, sender=StorageCredential)
+def refresh_stats_account_names(sender, instance, created, **kwargs):
+    if not created:
+        from api.utils.cache import ResponseCache
+        # Storage account facets carry the credential name.
+        ResponseCache.bump('stats', instance.user_id)
+
+@receiver(post_save, sender=ShareLink)
+@receiver(post_delete, sender=ShareLink)
+def invalidate_share_link(sender, instance, **kwargs):
+    from api.services.share_service import ShareLinkService
+    ShareLinkService.invalidate(instance.token)
+    transaction.on_commit(lambda: ShareLinkService.invalidate(instance.token))
+
+@receiver(post_save, sender=File)
+def enqueue_file_jobs(sender, instance, created, **kwargs):
+    if created and not file_receivers_muted():
+        from api.services.job_service import JobService
+        JobService.files_created([instance])
+
+@receiver(files_bulk_created)
+def enqueue_file_jobs_on_bulk_create(sender, user_id, files, **kwargs):
+    from api.services.job_service import JobService
+    JobService.files_created(files)
+
+@receiver(post_save, sender=File)
+def update_folders_on_save(sender, instance, created, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.folder_service import FolderService
+    FolderService.file_saved(instance, created)
+
+@receiver(post_delete, sender=File)
+def update_folders_on_delete(sender, instance, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.folder_service import FolderService
+    FolderService.file_deleted(instance)
+
+@receiver(files_bulk_created)
+def update_folders_on_bulk_create(sender, user_id, files, **kwargs):
+    from api.services.folder_service import FolderService
+    FolderService.files_created(files)
+
+@receiver(files_bulk_updated)
+def update_folders_on_bulk_update(sender, user_id, ids, fields, previous=None, **kwargs):
+    if previous and 'folder_path' in fields:
+        from api.services.folder_service import FolderService
+        FolderService.files_updated(previous)
+
+@receiver(files_bulk_deleted)
+def update_folders_on_bulk_delete(sender, user_id, files, **kwargs):
+    from api.services.folder_service import FolderService
+    FolderService.files_deleted(files)
+
+@receiver(post_save, sender=File)
+def update_search_document_on_save(sender, instance, created, **kwargs):
+    old = getattr(instance, '_tracked', None)
+    if created or not old or file_receivers_muted():
+        return
+    if any(old[name] != getattr(instance, name) for name in File.SEARCH_FIELDS):
+        from api.services.search_service import SearchService
+        SearchService.refresh([instance.pk])
+
+@receiver(m2m_changed, sender=File.categories.through)
+def update_search_document_on_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear') or file_receivers_muted():
+        return
+    if reverse and action == 'pre_clear':
+        # The links are gone after the clear, so remember whose documents to refresh.
+        instance._search_file_ids = list(instance.files.values_list('pk', flat=True))
+        return
+    from api.services.search_service import SearchService
+    if not reverse:
+        if action != 'pre_clear':
+            SearchService.refresh([instance.pk])
+    elif action == 'post_clear':
+        SearchService.refresh(getattr(instance, '_search_file_ids', []))
+    else:
+        SearchService.refresh(pk_set or [])
+
+@receiver(post_save, sender=Category)
+def update_search_documents_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        from api.services.search_service import SearchService
+        SearchService.refresh_category(instance)
+
+@receiver(pre_delete, sender=Category)
+def collect_search_documents_on_category_delete(sender, instance, **kwargs):
+    instance._search_file_ids = list(instance.files.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Category)
+def update_search_documents_on_category_delete(sender, instance, **kwargs):
+    from api.services.search_service import SearchService
+    SearchService.refresh(getattr(instance, '_search_file_ids', []))
+
+@receiver(files_bulk_updated)
+def update_search_documents_on_bulk_update(sender, user_id, ids, fields, **kwargs):
+    if set(fields) & {'categories', *File.SEARCH_FIELDS}:
+        from api.services.search_service import SearchService
+        SearchService.refresh(ids)
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # SQLite migrations rebuild altered tables, dropping the FTS triggers with them.
+    db_connection = connections[using]
+    if sender.label != 'api' or db_connection.vendor != 'sqlite':
+        return
+    with db_connection.cursor() as cursor:
+        columns = [column.name for column in db_connection.introspection.get_table_description(cursor, File._meta.db_table)]
+    if 'search_document' in columns:
+        from api.services.search_service import SearchService
+        SearchService.install(db_connection)
+
+@receiver(post_save, sender=File)
+def update_tags_on_save(sender, instance, created, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.tag_service import TagService
+    TagService.file_saved(instance, created)
+
+@receiver(post_delete, sender=File)
+def update_tags_on_delete(sender, instance, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.tag_service import TagService
+    TagService.file_deleted(instance)
+
+@receiver(files_bulk_created)
+def update_tags_on_bulk_create(sender, user_id, files, **kwargs):
+    from api.services.tag_service import TagService
+    TagService.files_created(files)
+
+@receiver(files_bulk_updated)
+def update_tags_on_bulk_update(sender, user_id, ids, fields, previous=None, **kwargs):
+    if previous and 'tags' in fields:
+        from api.services.tag_service import TagService
+        TagService.files_updated(previous)
+
+@receiver(files_bulk_deleted)
+def update_tags_on_bulk_delete(sender, user_id, files, **kwargs):
+    from api.services.tag_service import TagService
+    TagService.files_deleted(files)
+
+@receiver(post_save, sender=File)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.stats_service import StatsService
+    StatsService.file_saved(instance, created)
+
+@receiver(post_delete, sender=File)
+def update_stats_on_delete(sender, instance, **kwargs):
+    if file_receivers_muted():
+        return
+    from api.services.stats_service import StatsService
+    StatsService.file_deleted(instance)
+
+@receiver(files_bulk_created)
+def update_stats_on_bulk_create(sender, user_id, files, **kwargs):
+    from api.services.stats_service import StatsService
+    StatsService.files_created(files)
+
+@receiver(files_bulk_updated)
+def update_stats_on_bulk_update(sender, user_id, ids, fields, previous=None, **kwargs):
+    from api.services.stats_service import StatsService
+    if previous and set(fields) & set(StatsService.FIELDS):
+        StatsService.files_updated(previous)
+
+@receiver(files_bulk_deleted)
+def update_stats_on_bulk_delete(sender, user_id, files, **kwargs):
+    from api.services.stats_service import StatsService
+    StatsService.files_deleted(files)
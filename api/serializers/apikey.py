@@ -12,16 +12,13 @@ class ApiKeySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'prefix', 'last_used_at', 'created_at']
 
     def create(self, validated_data):
-        raise serializers.ValidationError("API Key generation disabled. Use ENV.")
-    
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Only show full key on creation if we were passing it back, 
-        # but here we are not hashing yet so it's stored in DB.
-        # In this implementation we don't return the full key in list view for security, 
-        # but maybe on create we should return it.
-        return data
+        api_key, raw_key = ApiKey.generate(**validated_data)
+        # Only a digest is stored, so the raw key can be returned on creation only.
+        api_key.raw_key = raw_key
+        return api_key
 
 class ApiKeyCreateResponseSerializer(ApiKeySerializer):
+    key = serializers.CharField(source='raw_key', read_only=True)
+
     class Meta(ApiKeySerializer.Meta):
-        fields = ApiKeySerializer.Meta.fields
+        fields = ApiKeySerializer.Meta.fields + ['key']
@@ -2,6 +2,7 @@
 from rest_framework import serializers
 from api.models import File, Category
 from .category import CategorySerializer
+from api.services.usage_service import UsageService
 
 class FileSerializer(serializers.ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
@@ -26,6 +27,88 @@ class FileSerializer(serializers.ModelSerializer):
             'download_count', 'last_accessed_at'
         ]
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        request = self.context.get('request')
+        if request is not None and 'size' in attrs:
+            previous = self.instance.size if self.instance is not None else 0
+            if not UsageService.check_quota(request.user, attrs['size'] - previous):
+                raise serializers.ValidationError({'size': 'Storage quota exceeded.'})
+        return attrs
+
     def create(self, validated_data):
         # Additional logic if needed during creation
         return super().create(validated_data)
+
+class FileBulkSerializer(FileSerializer):
+    """
+    Validates one row of a bulk ingest. Relations are plain ids here and are
+    resolved per chunk by ``FileIngestService``; quota is also checked per chunk.
+    """
+    storage_account = serializers.UUIDField(required=False, allow_null=True)
+    category_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+    class Meta(FileSerializer.Meta):
+        fields = [name for name in FileSerializer.Meta.fields if name != 'categories']
+
+    def validate(self, attrs):
+        return attrs
+
+class FileBatchFilterSerializer(serializers.Serializer):
+    """
+    The ``filter`` of a batch request. Every key is typed, so malformed values
+    are rejected before they reach the queryset.
+    """
+    file_type = serializers.CharField(max_length=100, required=False)
+    extension = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    folder_path = serializers.CharField(max_length=255, required=False)
+    is_favorite = serializers.BooleanField(required=False)
+    is_public = serializers.BooleanField(required=False)
+    category_id = serializers.UUIDField(required=False)
+    tag = serializers.CharField(max_length=100, required=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = set(data) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(f"Unsupported filter fields: {', '.join(sorted(unknown))}")
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Provide at least one filter field.')
+        return attrs
+
+
+class FileBatchSerializer(serializers.Serializer):
+    """
+    Request body of ``/api/files/batch/``: an operation, its arguments, and the
+    files it applies to as an ``ids`` list or a ``filter`` of listing fields.
+    """
+    OPERATIONS = ('move', 'tag_add', 'tag_remove', 'favorite', 'public', 'categories', 'delete')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    filter = FileBatchFilterSerializer(required=False)
+    folder_path = serializers.CharField(max_length=255, required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False, allow_empty=False)
+    value = serializers.BooleanField(required=False)
+    category_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    mode = serializers.ChoiceField(choices=('add', 'remove', 'set'), default='set')
+
+    REQUIRED = {
+        'move': 'folder_path',
+        'tag_add': 'tags',
+        'tag_remove': 'tags',
+        'favorite': 'value',
+        'public': 'value',
+        'categories': 'category_ids',
+    }
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Provide exactly one of ids or filter.')
+        required = self.REQUIRED.get(attrs['op'])
+        if required and required not in attrs:
+            raise serializers.ValidationError({required: f"This field is required for '{attrs['op']}'."})
+        return attrs
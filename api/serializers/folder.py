@@ -0,0 +1,12 @@
+
+from rest_framework import serializers
+from api.models import Folder
+
+class FolderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Folder
+        fields = [
+            'path', 'name', 'depth', 'file_count', 'total_bytes',
+            'tree_file_count', 'tree_bytes', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,289 @@
+
+import atexit
+import datetime
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from api.models import ActivityLog, ActivityLogRollup
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    """
+    Audit log pipeline.
+
+    In async mode entries are queued once the surrounding transaction commits and
+    a background thread writes them with ``bulk_create`` whenever ``BATCH_SIZE``
+    entries are waiting or ``FLUSH_INTERVAL`` seconds have passed. The queue is
+    drained at interpreter exit. Sync mode (the default under ``manage.py test``)
+    inserts immediately.
+    """
+    _queue = queue.Queue()
+    _wakeup = threading.Event()
+    _thread = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.ACTIVITY_LOG
+
+    @staticmethod
+    def build(user, action_type, description='', details=None, request=None):
+        entry = ActivityLog(
+            user_id=getattr(user, 'pk', user),
+            action_type=action_type,
+            description=description[:255],
+            details=details or {},
+            created_at=timezone.now(),
+        )
+        if request is not None:
+            entry.user_agent = request.META.get('HTTP_USER_AGENT')
+        return entry
+
+    @classmethod
+    def log(cls, user, action_type, description='', details=None, request=None):
+        cls.log_many([cls.build(user, action_type, description, details, request)])
+
+    @classmethod
+    def log_many(cls, entries):
+        if not entries:
+            return
+        if not cls._config()['ASYNC']:
+            ActivityLog.objects.bulk_create(entries, batch_size=cls._config()['BATCH_SIZE'])
+            return
+        transaction.on_commit(lambda: cls._enqueue(entries))
+
+    @classmethod
+    def _enqueue(cls, entries):
+        cls._ensure_worker()
+        if cls._queue.qsize() + len(entries) > cls._config()['MAX_QUEUE']:
+            # Writer is falling behind; apply backpressure to the caller.
+            cls._write(entries)
+            return
+        for entry in entries:
+            cls._queue.put(entry)
+        if cls._queue.qsize() >= cls._config()['BATCH_SIZE']:
+            cls._wakeup.set()
+
+    @classmethod
+    def _ensure_worker(cls):
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name='activity-log-writer', daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wakeup.wait(cls._config()['FLUSH_INTERVAL'])
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            except Exception:
+                logger.exception('Activity log flush failed')
+            finally:
+                close_old_connections()
+
+    @classmethod
+    def _drain(cls, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(cls._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @classmethod
+    def flush(cls):
+        """
+        Writes every queued entry. Returns the number written.
+        """
+        written = 0
+        while True:
+            batch = cls._drain(cls._config()['BATCH_SIZE'])
+            if not batch:
+                return written
+            written += cls._write(batch)
+
+    @staticmethod
+    def _write(batch):
+        try:
+            ActivityLog.objects.bulk_create(batch)
+            return len(batch)
+        except Exception:
+            # One bad row (e.g. its user was deleted meanwhile) must not drop the batch.
+            written = 0
+            for entry in batch:
+                try:
+                    entry.save(force_insert=True)
+                    written += 1
+                except Exception:
+                    logger.exception(f'Dropping activity log entry {entry.action_type} for user {entry.user_id}')
+            return written
+
+
+atexit.register(ActivityLogWriter.flush)
+
+
+class ActivityLogPartitions:
+    """
+    Monthly range partitions of ``api_activitylog`` on PostgreSQL.
+    A no-op on other backends, where the table is not partitioned.
+    """
+    TABLE = 'api_activitylog'
+    DEFAULT = 'api_activitylog_default'
+
+    @classmethod
+    def supported(cls):
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [cls.TABLE])
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def _month_start(day):
+        return day.replace(day=1)
+
+    @staticmethod
+    def _next_month(month):
+        return (month + datetime.timedelta(days=32)).replace(day=1)
+
+    @classmethod
+    def partitions(cls):
+        """
+        Returns ``{name: month_start}`` for the monthly partitions.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass", [cls.TABLE]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        months = {}
+        for name in names:
+            suffix = name.rsplit('_p', 1)[-1]
+            if name != cls.DEFAULT and suffix.isdigit():
+                months[name] = datetime.date(int(suffix[:4]), int(suffix[4:]), 1)
+        return months
+
+    @classmethod
+    def ensure(cls, months_ahead=2):
+        """
+        Creates partitions from the current month through ``months_ahead``. Rows that
+        already landed in the default partition for a new range are moved into it.
+        Returns the names created.
+        """
+        if not cls.supported():
+            return []
+        existing = set(cls.partitions())
+        month = cls._month_start(timezone.now().date())
+        created = []
+        for _ in range(months_ahead + 1):
+            following = cls._next_month(month)
+            name = f'{cls.TABLE}_p{month:%Y%m}'
+            if name not in existing:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f'CREATE TABLE {name} (LIKE {cls.TABLE} INCLUDING DEFAULTS)')
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {cls.DEFAULT} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved", [month, following]
+                    )
+                    cursor.execute(
+                        f"ALTER TABLE {cls.TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{following}')"
+                    )
+                created.append(name)
+            month = following
+        return created
+
+    @classmethod
+    def drop_expired(cls, end):
+        """
+        Detaches and drops the partitions that end on or before ``end``; their rows
+        must already be rolled up. Dropping a partition reclaims its space at once,
+        with no row-by-row DELETE and no vacuum.
+        """
+        if not cls.supported():
+            return []
+        dropped = []
+        for name, month in sorted(cls.partitions().items(), key=lambda item: item[1]):
+            if cls._next_month(month) > end.date():
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {cls.TABLE} DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+            dropped.append(name)
+        return dropped
+
+
+class ActivityLogRetention:
+    """
+    Rolls activity log rows older than the retention window into
+    ``ActivityLogRollup`` rows (one per user, day and action) and removes them.
+
+    All expired days are counted with one GROUP BY over the ``created_at`` index
+    and merged into the rollups in one transaction; ``max_days`` bounds the range
+    per invocation, oldest first. On PostgreSQL, monthly partitions that fall
+    wholly inside the range are detached and dropped instead of deleted row by row.
+    """
+
+    @staticmethod
+    def cutoff(retention_days):
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - datetime.timedelta(days=retention_days)
+
+    @classmethod
+    def rollup(cls, retention_days=None, max_days=None):
+        """
+        Returns ``(days_processed, rows_rolled_up)``.
+        """
+        if retention_days is None:
+            retention_days = settings.ACTIVITY_LOG['RETENTION_DAYS']
+        cutoff = cls.cutoff(retention_days)
+        oldest = ActivityLog.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None:
+            return 0, 0
+        end = cutoff
+        if max_days is not None:
+            start = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+            end = min(start + datetime.timedelta(days=max_days), cutoff)
+        return cls._rollup_before(end)
+
+    @staticmethod
+    def _rollup_before(end):
+        with transaction.atomic():
+            detail = ActivityLog.objects.filter(created_at__lt=end)
+            counts = list(
+                detail.order_by().annotate(day=TruncDate('created_at'))
+                .values('day', 'user_id', 'action_type').annotate(total=Count('id'))
+            )
+            days = {row['day'] for row in counts}
+            existing = {
+                (rollup.day, rollup.user_id, rollup.action_type): rollup
+                for rollup in ActivityLogRollup.objects.select_for_update().filter(day__in=days)
+            }
+            created, updated, total = [], [], 0
+            for row in counts:
+                total += row['total']
+                rollup = existing.get((row['day'], row['user_id'], row['action_type']))
+                if rollup is None:
+                    created.append(ActivityLogRollup(
+                        user_id=row['user_id'], day=row['day'], action_type=row['action_type'], count=row['total']
+                    ))
+                else:
+                    rollup.count += row['total']
+                    updated.append(rollup)
+            ActivityLogRollup.objects.bulk_create(created, batch_size=1000)
+            ActivityLogRollup.objects.bulk_update(updated, ['count'], batch_size=1000)
+            ActivityLogPartitions.drop_expired(end)
+            detail.delete()
+        return len(days), total
@@ -1,21 +1,133 @@
 
+import asyncio
+import copy
+import hashlib
+import json
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+import httpx
 import requests
 from django.conf import settings
 import logging
+from api.services.http_client import HttpClient
 
 logger = logging.getLogger(__name__)
 
+
+class CompletionCache:
+    """
+    Per-process cache of non-streamed completions, keyed by a hash of the model
+    and the normalized messages, bounded by ``TTL`` seconds and ``SIZE`` entries
+    (least recently used first out). Concurrent misses on one key are coalesced:
+    the first caller computes, the others wait for its result or its error.
+    """
+    _entries = OrderedDict()
+    _inflight = {}
+    _lock = threading.Lock()
+    _counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0}
+
+    @staticmethod
+    def _config():
+        return settings.AI_CACHE
+
+    @staticmethod
+    def key(model, messages):
+        normalized = [
+            {name: value.strip() if isinstance(value, str) else value for name, value in message.items()}
+            if isinstance(message, dict) else message
+            for message in messages
+        ]
+        document = json.dumps({'model': model, 'messages': normalized}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(document.encode()).hexdigest()
+
+    @classmethod
+    def get_or_compute(cls, key, compute):
+        """
+        Returns a copy of the cached value for ``key``, computing it with ``compute()`` on a miss.
+        """
+        config = cls._config()
+        if config['TTL'] <= 0 or config['SIZE'] <= 0:
+            return compute()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                cls._entries.move_to_end(key)
+                cls._counters['hits'] += 1
+                return copy.deepcopy(entry[1])
+            future = cls._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = cls._inflight[key] = Future()
+                cls._counters['misses'] += 1
+            else:
+                cls._counters['coalesced'] += 1
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            value = compute()
+        except BaseException as e:
+            # Errors are shared with the waiters but never cached.
+            with cls._lock:
+                cls._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with cls._lock:
+            cls._entries[key] = (time.monotonic() + config['TTL'], value)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > config['SIZE']:
+                cls._entries.popitem(last=False)
+                cls._counters['evictions'] += 1
+            cls._inflight.pop(key, None)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {**cls._counters, 'size': len(cls._entries), 'inflight': len(cls._inflight)}
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+
 class AIService:
     API_URL = os.environ.get("AI_API_URL", "https://one.apprentice.cyou/api/v1/chat/completions")
     API_KEY = os.environ.get("AI_API_KEY", "")
     MODEL = os.environ.get("AI_MODEL", "gemini-2.5-flash")
 
+    # One pooled async client per event loop (httpx clients are loop-bound).
+    _async_clients = weakref.WeakKeyDictionary()
+    _async_client_closers = weakref.WeakKeyDictionary()
+    _metrics_lock = threading.Lock()
+    _metrics = {'streams': 0, 'completed': 0, 'cancelled': 0, 'failed': 0, 'ttft_count': 0, 'ttft_total': 0.0, 'ttft_max': 0.0}
+
+    @classmethod
+    def _headers(cls):
+        headers = {"Content-Type": "application/json"}
+        if cls.API_KEY:
+            headers["Authorization"] = f"Bearer {cls.API_KEY}"
+        return headers
+
     @classmethod
     def generate_response(cls, messages, stream=False):
         """
-        Generates a response from the AI model.
+        Generates a response from the AI model. Identical prompts are served from
+        ``CompletionCache`` and concurrent duplicates share one upstream call.
         """
+        if stream:
+            return cls._request(messages, stream)
+        return CompletionCache.get_or_compute(
+            CompletionCache.key(cls.MODEL, messages), lambda: cls._request(messages, stream)
+        )
+
+    @classmethod
+    def _request(cls, messages, stream=False):
         try:
             payload = {
                 "model": cls.MODEL,
@@ -23,14 +135,7 @@ class AIService:
                 "stream": stream
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            if cls.API_KEY:
-                headers["Authorization"] = f"Bearer {cls.API_KEY}"
-            
-            response = requests.post(cls.API_URL, json=payload, headers=headers, timeout=60)
+            response = HttpClient.post(cls.API_URL, profile="ai", json=payload, headers=cls._headers())
             response.raise_for_status()
             
             return response.json()
@@ -38,6 +143,110 @@ class AIService:
             logger.error(f"AI Service Error: {str(e)}")
             raise e
 
+    @classmethod
+    async def _async_client(cls):
+        loop = asyncio.get_running_loop()
+        client = cls._async_clients.get(loop)
+        if client is None:
+            config = settings.HTTP_CLIENT
+            client = cls._async_clients[loop] = httpx.AsyncClient(
+                timeout=httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+                limits=httpx.Limits(
+                    max_connections=config['POOL_MAXSIZE'], max_keepalive_connections=config['POOL_CONNECTIONS']
+                ),
+            )
+            # A loop finalizes suspended async generators when it shuts down
+            # (shutdown_asyncgens), so this closes the client on its own loop.
+            closer = cls._async_client_closers[loop] = cls._close_on_shutdown(client)
+            await closer.__anext__()
+        return client
+
+    @staticmethod
+    async def _close_on_shutdown(client):
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    @staticmethod
+    def _event(data, event=None):
+        prefix = f"event: {event}\n" if event else ""
+        return f"{prefix}data: {data}\n\n".encode()
+
+    @classmethod
+    async def stream_events(cls, messages):
+        """
+        Streams a completion as Server-Sent Events: each upstream ``data:`` line is
+        relayed as one event, ending with ``data: [DONE]``; failures end the stream
+        with an ``error`` event.
+
+        Upstream lines are read only as fast as the client takes them, so a slow
+        client slows the upstream read instead of growing a buffer. When the client
+        disconnects the ASGI handler cancels this generator, which closes the
+        upstream request. Only served under ASGI; a WSGI server would buffer it.
+        Time to first token is recorded in ``stream_metrics()``.
+        """
+        payload = {"model": cls.MODEL, "messages": messages, "stream": True}
+        started = time.monotonic()
+        ttft = None
+        chunks = 0
+        outcome = 'cancelled'
+        try:
+            async with (await cls._async_client()).stream("POST", cls.API_URL, json=payload, headers=cls._headers()) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if ttft is None and data != "[DONE]":
+                        ttft = time.monotonic() - started
+                    chunks += 1
+                    yield cls._event(data)
+            outcome = 'completed'
+        except httpx.HTTPError as e:
+            outcome = 'failed'
+            logger.error(f"AI Service Stream Error: {str(e)}")
+            yield cls._event(json.dumps({"error": str(e)}), event="error")
+        finally:
+            cls._record_stream(outcome, ttft, time.monotonic() - started, chunks)
+
+    @classmethod
+    def _record_stream(cls, outcome, ttft, duration, chunks):
+        with cls._metrics_lock:
+            cls._metrics['streams'] += 1
+            cls._metrics[outcome] += 1
+            if ttft is not None:
+                cls._metrics['ttft_total'] += ttft
+                cls._metrics['ttft_max'] = max(cls._metrics['ttft_max'], ttft)
+                cls._metrics['ttft_count'] += 1
+        ttft_ms = f"{ttft * 1000:.0f}ms" if ttft is not None else "-"
+        logger.info(f"AI stream {outcome}: ttft={ttft_ms} duration={duration * 1000:.0f}ms chunks={chunks}")
+
+    @classmethod
+    def stream_metrics(cls):
+        """
+        Returns per-process stream counters and time-to-first-token (seconds).
+        """
+        with cls._metrics_lock:
+            metrics = dict(cls._metrics)
+        total, count = metrics.pop('ttft_total'), metrics.pop('ttft_count')
+        metrics['ttft_avg'] = total / count if count else None
+        return metrics
+
+    @classmethod
+    def suggest_tags(cls, file_summary, limit=5):
+        """
+        Asks the model for up to ``limit`` short tags describing a file.
+        """
+        messages = [
+            {"role": "system", "content": f"Reply with at most {limit} short lowercase tags for the file, comma separated, nothing else."},
+            {"role": "user", "content": file_summary}
+        ]
+        response = cls.generate_response(messages)
+        content = response["choices"][0]["message"]["content"] or ""
+        tags = (tag.strip().strip(".#").lower() for tag in content.replace("\n", ",").split(","))
+        return list(dict.fromkeys(tag for tag in tags if tag))[:limit]
+
     @classmethod
     def analyze_file(cls, file_content_summary):
         """
@@ -0,0 +1,73 @@
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+
+class CredentialRegistry:
+    """
+    In-process cache of active ``StorageCredential`` rows grouped by provider.
+
+    Uploads read credentials from here instead of querying the database. Entries
+    expire after ``TTL`` seconds and are dropped by the ``post_save``/``post_delete``
+    signals on ``StorageCredential``. With ``SHARED`` enabled, invalidations also
+    bump a version counter in the Django cache so other workers reload too.
+    """
+    VERSION_KEY = 'credential_registry:version'
+
+    _by_provider = None
+    _loaded_at = 0.0
+    _version = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.CREDENTIAL_REGISTRY
+
+    @classmethod
+    def _shared_version(cls):
+        if not cls._config()['SHARED']:
+            return None
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, 1, None)
+            version = cache.get(cls.VERSION_KEY, 1)
+        return version
+
+    @classmethod
+    def _load(cls):
+        from api.models import StorageCredential
+        by_provider = {}
+        for cred in StorageCredential.objects.filter(is_active=True):
+            by_provider.setdefault(cred.provider, []).append(cred)
+        return by_provider
+
+    @classmethod
+    def get(cls, provider=None):
+        """
+        Returns active credentials, optionally for one provider. The list is a copy
+        callers may reorder freely.
+        """
+        version = cls._shared_version()
+        by_provider = cls._by_provider
+        expired = time.monotonic() - cls._loaded_at > cls._config()['TTL']
+        if by_provider is None or expired or version != cls._version:
+            with cls._lock:
+                by_provider = cls._load()
+                cls._by_provider = by_provider
+                cls._loaded_at = time.monotonic()
+                cls._version = version
+        if provider:
+            return list(by_provider.get(provider, []))
+        return [cred for creds in by_provider.values() for cred in creds]
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._by_provider = None
+        if cls._config()['SHARED']:
+            try:
+                cache.incr(cls.VERSION_KEY)
+            except ValueError:
+                cache.set(cls.VERSION_KEY, int(time.time()), None)
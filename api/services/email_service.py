@@ -1,19 +1,130 @@
-
-from django.core.mail import send_mail
+import logging
+import smtplib
+import threading
+import time
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
+from api.services.job_service import JobService, PermanentJobError
+
+logger = logging.getLogger(__name__)
+
 
 class EmailService:
+    """
+    Outbound mail. Messages are queued as ``email.send`` jobs (on the ``mail``
+    queue, committed with the caller's transaction) and sent by ``run_jobs`` in
+    batches of up to ``JOBS_BATCH_SIZE``. Each worker thread keeps one backend
+    connection open across batches and reopens it after ``KEEPALIVE`` idle
+    seconds or a dropped connection. Transient SMTP failures are retried by the
+    job queue; messages whose recipients are all rejected (550/551/553) are
+    dead-lettered.
+    """
+    QUEUE = 'mail'
+    # RCPT replies that no retry will fix: no such mailbox, user not local, bad address.
+    REJECTED_RECIPIENT_CODES = (550, 551, 553)
+    _local = threading.local()
+
     @staticmethod
-    def send_welcome_email(user):
-        send_mail(
+    def _config():
+        return settings.EMAIL_QUEUE
+
+    @classmethod
+    def queue(cls, subject, body, to, from_email=None, html=None):
+        return JobService.enqueue('email.send', {
+            'subject': subject,
+            'body': body,
+            'to': list(to),
+            'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+            'html': html,
+        }, queue=cls.QUEUE, max_attempts=cls._config()['MAX_ATTEMPTS'])
+
+    @classmethod
+    def send_welcome_email(cls, user):
+        if not user.email:
+            return None
+        return cls.queue(
             'Welcome to Storage App',
             f'Hi {user.username}, welcome to your new storage solution.',
-            settings.DEFAULT_FROM_EMAIL,
             [user.email],
-            fail_silently=True,
         )
 
+    @classmethod
+    def send_verification_email(cls, user, token):
+        if not user.email:
+            return None
+        return cls.queue(
+            'Verify your email address',
+            f'Hi {user.username}, your verification code is {token}.',
+            [user.email],
+        )
+
+    @classmethod
+    def _connection(cls):
+        connection = getattr(cls._local, 'connection', None)
+        idle = time.monotonic() - getattr(cls._local, 'used_at', 0)
+        if connection is not None and idle > cls._config()['KEEPALIVE']:
+            cls.close()
+            connection = None
+        if connection is None:
+            connection = cls._local.connection = get_connection()
+            connection.open()
+        return connection
+
+    @classmethod
+    def close(cls):
+        connection, cls._local.connection = getattr(cls._local, 'connection', None), None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
     @staticmethod
-    def send_verification_email(user, token):
-        # Logic to send verification link
-        pass
+    def _message(payload, connection):
+        message = EmailMultiAlternatives(
+            payload['subject'], payload['body'], payload['from_email'], payload['to'], connection=connection
+        )
+        if payload.get('html'):
+            message.attach_alternative(payload['html'], 'text/html')
+        return message
+
+    @classmethod
+    def _permanent(cls, error):
+        """
+        Only rejected recipients are permanent. Other 5xx replies (authentication,
+        sender refused, policy) are usually server or configuration faults that
+        a retry after a fix can get past.
+        """
+        if not isinstance(error, smtplib.SMTPRecipientsRefused) or not error.recipients:
+            return False
+        return all(code in cls.REJECTED_RECIPIENT_CODES for code, _ in error.recipients.values())
+
+    @classmethod
+    def send_batch(cls, payloads):
+        """
+        Sends the payloads over the thread's connection. Returns one result per
+        payload: None if sent, else the error.
+        """
+        results = []
+        for payload in payloads:
+            try:
+                cls._send(payload)
+                results.append(None)
+            except Exception as e:
+                logger.warning(f"Email to {', '.join(payload['to'])} failed: {e}")
+                results.append(PermanentJobError(str(e)) if cls._permanent(e) else e)
+        return results
+
+    @classmethod
+    def _send(cls, payload):
+        for attempt in range(2):
+            connection = cls._connection()
+            try:
+                cls._message(payload, connection).send()
+                cls._local.used_at = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The kept-alive connection went away; reconnect once before giving up.
+                cls.close()
+                if attempt:
+                    raise
@@ -0,0 +1,141 @@
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from api.models import File, Category, bulk_file_changes, files_bulk_updated, files_bulk_deleted, normalize_folder_path
+
+
+class FileBatchService:
+    """
+    Applies one operation to many of a user's files with set-based queries.
+
+    Matching files are walked in primary-key order, ``CHUNK_SIZE`` ids at a time,
+    and each chunk is updated in its own transaction, so a large selection never
+    holds long locks. Per-row signals are replaced by one ``files_bulk_*`` signal
+    per chunk. Returns ``{'op', 'matched', 'affected'}``.
+    """
+
+    @staticmethod
+    def _config():
+        return settings.FILE_BATCH
+
+    @staticmethod
+    def queryset(user, ids=None, filters=None):
+        queryset = File.objects.filter(user=user)
+        if ids is not None:
+            return queryset.filter(pk__in=ids)
+        filters = dict(filters)
+        if 'folder_path' in filters:
+            filters['folder_path'] = normalize_folder_path(filters['folder_path'])
+        category_id = filters.pop('category_id', None)
+        if category_id:
+            queryset = queryset.filter(categories__id=category_id)
+        tag = filters.pop('tag', None)
+        if tag:
+            queryset = queryset.filter(file_tags__tag__user=user, file_tags__tag__name=tag)
+        return queryset.filter(**filters)
+
+    @classmethod
+    def _chunks(cls, queryset):
+        size = cls._config()['CHUNK_SIZE']
+        last = None
+        while True:
+            page = queryset.order_by('pk')
+            if last is not None:
+                page = page.filter(pk__gt=last)
+            chunk = list(page.values_list('pk', flat=True).distinct()[:size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
+
+    @classmethod
+    def run(cls, user, op, ids=None, filters=None, **params):
+        queryset = cls.queryset(user, ids, filters)
+        if op == 'categories':
+            params['category_ids'] = list(
+                Category.objects.filter(user=user, pk__in=params['category_ids']).values_list('pk', flat=True)
+            )
+        handler = getattr(cls, f'_{op}')
+        matched = affected = 0
+        for chunk in cls._chunks(queryset):
+            with transaction.atomic():
+                affected += handler(user, chunk, **params)
+            matched += len(chunk)
+        return {'op': op, 'matched': matched, 'affected': affected}
+
+    @staticmethod
+    def _update(user, chunk, **values):
+        # Rows already holding the value are skipped, so ``affected`` counts real changes.
+        changed = File.objects.filter(pk__in=chunk).exclude(**values)
+        previous = None
+        if set(values) & set(File.TRACKED_FIELDS):
+            previous = list(changed.values('pk', *File.TRACKED_FIELDS))
+        # update() skips auto_now, so stamp updated_at as save() would.
+        rows = changed.update(**values, updated_at=timezone.now())
+        files_bulk_updated.send(sender=File, user_id=user.pk, ids=chunk, fields=list(values), previous=previous)
+        return rows
+
+    @classmethod
+    def _move(cls, user, chunk, folder_path, **params):
+        return cls._update(user, chunk, folder_path=normalize_folder_path(folder_path))
+
+    @classmethod
+    def _favorite(cls, user, chunk, value, **params):
+        return cls._update(user, chunk, is_favorite=value)
+
+    @classmethod
+    def _public(cls, user, chunk, value, **params):
+        return cls._update(user, chunk, is_public=value)
+
+    @staticmethod
+    def _retag(user, chunk, change):
+        # JSON list edits differ per backend, so compute them here and write one bulk UPDATE.
+        files, previous = [], []
+        now = timezone.now()
+        for row in File.objects.filter(pk__in=chunk).values('pk', *File.TRACKED_FIELDS):
+            tags = change(list(row['tags'] or []))
+            if tags != row['tags']:
+                files.append(File(pk=row['pk'], tags=tags, updated_at=now))
+                previous.append(row)
+        File.objects.bulk_update(files, ['tags', 'updated_at'])
+        files_bulk_updated.send(sender=File, user_id=user.pk, ids=chunk, fields=['tags'], previous=previous)
+        return len(files)
+
+    @classmethod
+    def _tag_add(cls, user, chunk, tags, **params):
+        return cls._retag(user, chunk, lambda current: current + [tag for tag in dict.fromkeys(tags) if tag not in current])
+
+    @classmethod
+    def _tag_remove(cls, user, chunk, tags, **params):
+        return cls._retag(user, chunk, lambda current: [tag for tag in current if tag not in tags])
+
+    @staticmethod
+    def _categories(user, chunk, category_ids, mode='set', **params):
+        Through = File.categories.through
+        # ``affected`` counts files whose categories changed, not link rows.
+        affected = set()
+        if mode in ('remove', 'set'):
+            links = Through.objects.filter(file_id__in=chunk)
+            links = links.exclude(category_id__in=category_ids) if mode == 'set' else links.filter(category_id__in=category_ids)
+            affected.update(links.values_list('file_id', flat=True))
+            links.delete()
+        if mode in ('add', 'set'):
+            existing = set(Through.objects.filter(file_id__in=chunk, category_id__in=category_ids).values_list('file_id', 'category_id'))
+            links = [
+                Through(file_id=file_id, category_id=category_id)
+                for file_id in chunk for category_id in category_ids
+                if (file_id, category_id) not in existing
+            ]
+            Through.objects.bulk_create(links)
+            affected.update(link.file_id for link in links)
+        files_bulk_updated.send(sender=File, user_id=user.pk, ids=chunk, fields=['categories'])
+        return len(affected)
+
+    @staticmethod
+    def _delete(user, chunk, **params):
+        files = list(File.objects.filter(pk__in=chunk))
+        with bulk_file_changes():
+            File.objects.filter(pk__in=chunk).delete()
+        files_bulk_deleted.send(sender=File, user_id=user.pk, files=files)
+        return len(files)
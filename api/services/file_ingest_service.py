@@ -0,0 +1,114 @@
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from api.models import File, Category, StorageCredential, files_bulk_created, normalize_folder_path, build_search_document
+from api.serializers.file import FileBulkSerializer
+from api.services.usage_service import UsageService
+
+
+class FileIngestService:
+    """
+    Registers many ``File`` rows per request.
+
+    Rows are validated and inserted ``CHUNK_SIZE`` at a time: relations are
+    resolved with one query per chunk, files and category links go in with
+    ``bulk_create``, and ``files_bulk_created`` updates the usage ledger, caches
+    and audit log once per chunk. A bad row is reported by its index and skipped;
+    it never aborts the rest of the batch.
+    """
+
+    @staticmethod
+    def _config():
+        return settings.FILE_BULK
+
+    @classmethod
+    def ingest(cls, user, rows, context=None):
+        """
+        Returns ``{'created', 'failed', 'ids', 'errors'}`` where ``errors`` holds
+        ``{'index', 'errors'}`` per rejected row.
+        """
+        config = cls._config()
+        result = {'created': 0, 'failed': 0, 'ids': [], 'errors': []}
+        validator = FileBulkSerializer(context=context or {})
+        quota = UsageService.quota_for(user)
+        budget = quota - UsageService.used_bytes(user) if quota else None
+        chunk = []
+        for index, row in enumerate(rows):
+            if index >= config['MAX_ROWS']:
+                cls._reject(result, index, {'non_field_errors': [f"Row limit of {config['MAX_ROWS']} exceeded."]})
+                break
+            chunk.append((index, row))
+            if len(chunk) >= config['CHUNK_SIZE']:
+                budget = cls._ingest_chunk(user, chunk, validator, budget, result)
+                chunk = []
+        if chunk:
+            cls._ingest_chunk(user, chunk, validator, budget, result)
+        result['errors'].sort(key=lambda error: error['index'])
+        result['failed'] = len(result['errors'])
+        return result
+
+    @staticmethod
+    def _reject(result, index, errors):
+        result['errors'].append({'index': index, 'errors': errors})
+
+    @classmethod
+    def _ingest_chunk(cls, user, chunk, validator, budget, result):
+        valid = []
+        for index, row in chunk:
+            if isinstance(row, Exception):
+                cls._reject(result, index, {'non_field_errors': [f'Invalid JSON: {row}']})
+                continue
+            if not isinstance(row, dict):
+                cls._reject(result, index, {'non_field_errors': ['Expected a JSON object.']})
+                continue
+            try:
+                valid.append((index, validator.run_validation(row)))
+            except serializers.ValidationError as e:
+                cls._reject(result, index, e.detail)
+
+        account_ids = {data['storage_account'] for _, data in valid if data.get('storage_account')}
+        category_ids = {pk for _, data in valid for pk in data.get('category_ids', [])}
+        accounts = set(
+            StorageCredential.objects.filter(user=user, pk__in=account_ids).values_list('pk', flat=True)
+        ) if account_ids else set()
+        categories = dict(
+            Category.objects.filter(user=user, pk__in=category_ids).values_list('pk', 'name')
+        ) if category_ids else {}
+
+        files, links = [], []
+        for index, data in valid:
+            row_categories = set(data.pop('category_ids', []))
+            account_id = data.pop('storage_account', None)
+            if account_id and account_id not in accounts:
+                cls._reject(result, index, {'storage_account': ['Unknown storage account.']})
+                continue
+            missing = row_categories - set(categories)
+            if missing:
+                cls._reject(result, index, {'category_ids': [f'Unknown category: {pk}' for pk in sorted(map(str, missing))]})
+                continue
+            if budget is not None:
+                if data['size'] > budget:
+                    cls._reject(result, index, {'size': ['Storage quota exceeded.']})
+                    continue
+                budget -= data['size']
+            file = File(user=user, storage_account_id=account_id, **data)
+            file.ensure_extension()
+            file.folder_path = normalize_folder_path(file.folder_path)
+            file.search_document = build_search_document(
+                file.name, file.original_name, file.tags, [categories[pk] for pk in row_categories]
+            )
+            files.append(file)
+            links.extend((file.pk, pk) for pk in row_categories)
+
+        if files:
+            Through = File.categories.through
+            with transaction.atomic():
+                # Django lowers this to the backend's parameter limit
+                # (on SQLite, 999 parameters: a few dozen files per INSERT).
+                File.objects.bulk_create(files, batch_size=cls._config()['CHUNK_SIZE'])
+                Through.objects.bulk_create([Through(file_id=file_id, category_id=pk) for file_id, pk in links])
+                files_bulk_created.send(sender=File, user_id=user.pk, files=files)
+            result['created'] += len(files)
+            result['ids'].extend(str(file.pk) for file in files)
+        return budget
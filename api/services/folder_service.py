@@ -0,0 +1,147 @@
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Q, Sum, Count
+from api.models import File, Folder, normalize_folder_path, folder_ancestors
+
+
+class FolderService:
+    """
+    Maintains the materialized ``Folder`` tree.
+
+    A file change becomes a ``(bytes, count)`` delta on its folder's direct
+    totals and on the recursive totals of that folder and every ancestor. Deltas
+    are merged per folder and written with one ``F()`` UPDATE per distinct delta,
+    so a change costs a handful of queries whatever the depth. Folders whose
+    recursive count drops to zero are removed.
+    """
+
+    @staticmethod
+    def _deltas(removed=(), added=()):
+        """
+        Returns ``{user_id: {path: (tree_bytes, tree_count, bytes, count)}}`` for file
+        rows with ``user_id``, ``folder_path``, ``size`` and an optional ``count``.
+        """
+        direct = defaultdict(lambda: [0, 0])
+        for rows, sign in ((removed, -1), (added, 1)):
+            for values in rows:
+                if None in (values['user_id'], values['size']):
+                    continue
+                key = (values['user_id'], normalize_folder_path(values['folder_path']))
+                direct[key][0] += sign * values['size']
+                direct[key][1] += sign * values.get('count', 1)
+        tree = defaultdict(lambda: [0, 0])
+        for (user_id, path), (bytes_delta, count_delta) in direct.items():
+            for ancestor in folder_ancestors(path):
+                tree[(user_id, ancestor)][0] += bytes_delta
+                tree[(user_id, ancestor)][1] += count_delta
+        by_user = defaultdict(dict)
+        for (user_id, path), (tree_bytes, tree_count) in tree.items():
+            direct_bytes, direct_count = direct.get((user_id, path), (0, 0))
+            if tree_bytes or tree_count or direct_bytes or direct_count:
+                by_user[user_id][path] = (tree_bytes, tree_count, direct_bytes, direct_count)
+        return by_user
+
+    @classmethod
+    def apply_changes(cls, removed=(), added=()):
+        """
+        Applies removed and added file rows (mappings with ``user_id``, ``folder_path`` and ``size``).
+        """
+        for user_id, deltas in cls._deltas(removed, added).items():
+            cls._apply_user(user_id, deltas)
+
+    @staticmethod
+    def _apply_user(user_id, deltas):
+        with transaction.atomic():
+            existing = set(Folder.objects.filter(user_id=user_id, path__in=list(deltas)).values_list('path', flat=True))
+            missing = [path for path, delta in deltas.items() if path not in existing and delta[1] > 0]
+            # Concurrent writers may create the same folder; the unique constraint keeps one.
+            Folder.objects.bulk_create([Folder.for_path(user_id, path) for path in missing], ignore_conflicts=True)
+            grouped = defaultdict(list)
+            for path, delta in deltas.items():
+                grouped[delta].append(path)
+            for (tree_bytes, tree_count, direct_bytes, direct_count), paths in grouped.items():
+                Folder.objects.filter(user_id=user_id, path__in=paths).update(
+                    tree_bytes=F('tree_bytes') + tree_bytes,
+                    tree_file_count=F('tree_file_count') + tree_count,
+                    total_bytes=F('total_bytes') + direct_bytes,
+                    file_count=F('file_count') + direct_count,
+                )
+            if any(delta[1] < 0 for delta in deltas.values()):
+                Folder.objects.filter(user_id=user_id, path__in=list(deltas), tree_file_count__lte=0).delete()
+
+    @staticmethod
+    def _values(file):
+        return {'user_id': file.user_id, 'folder_path': file.folder_path, 'size': file.size}
+
+    @classmethod
+    def file_saved(cls, file, created):
+        new = cls._values(file)
+        if created:
+            cls.apply_changes(added=[new])
+            return
+        old = getattr(file, '_tracked', None)
+        if not old or None in (old['user_id'], old['size']):
+            return
+        if (old['user_id'], normalize_folder_path(old['folder_path']), old['size']) != (new['user_id'], new['folder_path'], new['size']):
+            cls.apply_changes(removed=[old], added=[new])
+
+    @classmethod
+    def file_deleted(cls, file):
+        old = getattr(file, '_tracked', None)
+        if old:
+            cls.apply_changes(removed=[old])
+
+    @classmethod
+    def files_created(cls, files):
+        cls.apply_changes(added=[cls._values(file) for file in files])
+
+    @classmethod
+    def files_deleted(cls, files):
+        cls.apply_changes(removed=[file._tracked for file in files if getattr(file, '_tracked', None)])
+
+    @classmethod
+    def files_updated(cls, previous):
+        """
+        Applies a set-based update given the affected rows as they were before it.
+        """
+        current = File.objects.filter(pk__in=[row['pk'] for row in previous]).values('user_id', 'folder_path', 'size')
+        cls.apply_changes(removed=previous, added=list(current))
+
+    @staticmethod
+    def listing(user, path):
+        """
+        Returns ``(folder, children)`` for ``path`` from one query on the folder indexes.
+        ``folder`` is None when no file is stored at or below ``path``.
+        """
+        path = normalize_folder_path(path)
+        folder, children = None, []
+        for row in Folder.objects.filter(Q(path=path) | Q(parent_path=path), user=user).order_by('depth', 'name'):
+            if row.path == path:
+                folder = row
+            else:
+                children.append(row)
+        return folder, children
+
+    @classmethod
+    def rebuild(cls, user=None):
+        """
+        Recomputes the tree from ``File`` rows. Returns the number of folders written.
+        """
+        files = File.objects.all()
+        folders = Folder.objects.all()
+        if user is not None:
+            files = files.filter(user=user)
+            folders = folders.filter(user=user)
+        totals = files.order_by().values('user_id', 'folder_path').annotate(size=Sum('size'), count=Count('id'))
+        rows = []
+        for user_id, deltas in cls._deltas(added=totals).items():
+            for path, (tree_bytes, tree_count, direct_bytes, direct_count) in deltas.items():
+                folder = Folder.for_path(user_id, path)
+                folder.tree_bytes, folder.tree_file_count = tree_bytes, tree_count
+                folder.total_bytes, folder.file_count = direct_bytes, direct_count
+                rows.append(folder)
+        with transaction.atomic():
+            folders.delete()
+            Folder.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
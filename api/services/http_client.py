@@ -0,0 +1,127 @@
+
+import os
+import threading
+from http import cookiejar
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+class _BlockAllCookies(cookiejar.CookiePolicy):
+    """
+    Shared sessions must not carry cookies from one provider account to the next.
+    """
+    netscape = True
+    rfc2965 = hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class HttpClient:
+    """
+    Process-wide pooled HTTP sessions for outbound provider calls.
+    Each profile owns one ``requests.Session`` whose adapter keeps a keep-alive
+    connection pool per host, so repeat calls to ImageKit, Cloudinary or the AI
+    endpoint skip the TCP/TLS handshake.
+    """
+    # Upload bodies are streamed and cannot be replayed, so only profiles with
+    # replayable JSON bodies retry POSTs on retryable status codes.
+    PROFILES = {
+        'default': {'retry_methods': Retry.DEFAULT_ALLOWED_METHODS},
+        'storage': {'retry_methods': Retry.DEFAULT_ALLOWED_METHODS},
+        'ai': {'retry_methods': Retry.DEFAULT_ALLOWED_METHODS | {'POST'}},
+    }
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    _sessions = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.HTTP_CLIENT
+
+    @classmethod
+    def default_timeout(cls):
+        config = cls._config()
+        return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+    @classmethod
+    def _build_session(cls, profile):
+        config = cls._config()
+        retries = config['MAX_RETRIES']
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=config['BACKOFF_FACTOR'],
+            status_forcelist=cls.RETRY_STATUSES,
+            allowed_methods=cls.PROFILES[profile]['retry_methods'],
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config['POOL_CONNECTIONS'],
+            pool_maxsize=config['POOL_MAXSIZE'],
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.cookies.set_policy(_BlockAllCookies())
+        return session
+
+    @classmethod
+    def session(cls, profile='default'):
+        session = cls._sessions.get(profile)
+        if session is None:
+            with cls._lock:
+                session = cls._sessions.get(profile)
+                if session is None:
+                    session = cls._build_session(profile)
+                    cls._sessions[profile] = session
+        return session
+
+    @classmethod
+    def request(cls, method, url, profile='default', timeout=None, **kwargs):
+        if timeout is None:
+            timeout = cls.default_timeout()
+        return cls.session(profile).request(method, url, timeout=timeout, **kwargs)
+
+    @classmethod
+    def get(cls, url, **kwargs):
+        return cls.request('GET', url, **kwargs)
+
+    @classmethod
+    def post(cls, url, **kwargs):
+        return cls.request('POST', url, **kwargs)
+
+    @classmethod
+    def delete(cls, url, **kwargs):
+        return cls.request('DELETE', url, **kwargs)
+
+    @classmethod
+    def reset(cls):
+        """
+        Closes every pooled session. Called in forked workers so pools are never
+        shared across processes.
+        """
+        with cls._lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: HttpClient._sessions.clear())
@@ -0,0 +1,294 @@
+import datetime
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from api.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """
+    Raised (or returned by batch handlers) for failures a retry cannot fix;
+    the job is dead-lettered at once.
+    """
+
+
+class JobService:
+    """
+    Database-backed job queue; no broker needed.
+
+    Workers claim due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` (on
+    backends without it, with a single conditional UPDATE), run them on a
+    thread pool and delete them on success.
+    Failures are retried after an exponential, jittered backoff; after
+    ``max_attempts`` the job is kept as ``dead`` with its last traceback. Jobs
+    of a worker that stopped mid-run are requeued once ``LEASE_TIMEOUT`` passes.
+    """
+    _tasks = {}
+    _batch_tasks = set()
+
+    @staticmethod
+    def _config():
+        return settings.JOBS
+
+    @classmethod
+    def task(cls, name, batch=False):
+        """
+        Registers the decorated function as the handler of ``name``; it is
+        called with the job payload as keyword arguments. A ``batch`` handler
+        instead gets a list of up to ``BATCH_SIZE`` payloads and returns one
+        result per payload: None on success, else the error.
+        """
+        def register(func):
+            cls._tasks[name] = func
+            if batch:
+                cls._batch_tasks.add(name)
+            else:
+                cls._batch_tasks.discard(name)
+            return func
+        return register
+
+    @staticmethod
+    def load_tasks():
+        import api.tasks  # noqa: F401 (registers the handlers)
+
+    @classmethod
+    def _build(cls, name, payload, queue, delay, max_attempts):
+        return Job(
+            name=name, queue=queue, payload=payload or {},
+            run_at=timezone.now() + datetime.timedelta(seconds=delay),
+            max_attempts=max_attempts or cls._config()['MAX_ATTEMPTS'],
+        )
+
+    @classmethod
+    def enqueue(cls, name, payload=None, queue='default', delay=0, max_attempts=None):
+        """
+        Queues one job. Inside a transaction the job becomes visible to workers
+        only when it commits, together with the data it refers to.
+        """
+        job = cls._build(name, payload, queue, delay, max_attempts)
+        job.save()
+        return job
+
+    @classmethod
+    def enqueue_many(cls, name, payloads, queue='default', delay=0, max_attempts=None):
+        jobs = [cls._build(name, payload, queue, delay, max_attempts) for payload in payloads]
+        return Job.objects.bulk_create(jobs, batch_size=500)
+
+    @classmethod
+    def files_created(cls, files):
+        """
+        Queues the post-upload work for new files.
+        """
+        config = cls._config()
+        if config['THUMBNAILS']:
+            images = [file for file in files if (file.file_type or '').startswith('image/') and not file.thumbnail_url]
+            cls.enqueue_many('files.thumbnail', [{'file_id': str(file.pk)} for file in images])
+        if config['AI_TAGGING']:
+            cls.enqueue_many('files.tag', [{'file_id': str(file.pk)} for file in files], queue='ai')
+
+    @classmethod
+    def claim(cls, worker, limit, queues=None, names=None, exclude=None):
+        """
+        Marks up to ``limit`` due jobs as running for ``worker`` and returns them.
+        """
+        now = timezone.now()
+        token = f'{worker}:{uuid.uuid4().hex[:8]}'
+        due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        if queues:
+            due = due.filter(queue__in=queues)
+        if names:
+            due = due.filter(name__in=names)
+        if exclude:
+            due = due.exclude(name__in=exclude)
+        claimed = {'status': Job.RUNNING, 'locked_by': token, 'locked_at': now, 'attempts': F('attempts') + 1}
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                ids = list(
+                    due.select_for_update(skip_locked=True).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+                )
+                if not ids:
+                    return []
+                Job.objects.filter(pk__in=ids).update(**claimed)
+        else:
+            # One statement, so it takes the write lock up front (SQLite serializes writers).
+            ids = due.order_by('run_at', 'id').values('pk')[:limit]
+            if not Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(**claimed):
+                return []
+        return list(Job.objects.filter(locked_by=token, status=Job.RUNNING))
+
+    @classmethod
+    def claim_units(cls, worker, limit, queues=None):
+        """
+        Claims up to ``limit`` units of work: a batch of jobs of one batch task,
+        or a single job.
+        """
+        units = []
+        for name in sorted(cls._batch_tasks):
+            if len(units) >= limit:
+                return units
+            jobs = cls.claim(worker, cls._config()['BATCH_SIZE'], queues, names=[name])
+            if jobs:
+                units.append(jobs)
+        if len(units) < limit:
+            units.extend([job] for job in cls.claim(worker, limit - len(units), queues, exclude=cls._batch_tasks))
+        return units
+
+    @classmethod
+    def execute(cls, job):
+        """
+        Runs a claimed job. Returns True if it succeeded.
+        """
+        try:
+            handler = cls._tasks.get(job.name)
+            if handler is None:
+                raise PermanentJobError(f'No task registered as {job.name}')
+            if job.name in cls._batch_tasks:
+                error = handler([job.payload])[0]
+                if error is not None:
+                    raise error if isinstance(error, Exception) else RuntimeError(error)
+            else:
+                handler(**job.payload)
+        except Exception as e:
+            cls._failed(job, traceback.format_exc(), isinstance(e, PermanentJobError))
+            return False
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+        return True
+
+    @classmethod
+    def execute_unit(cls, jobs):
+        """
+        Runs a unit from ``claim_units``. Returns the number of jobs that succeeded.
+        """
+        if len(jobs) == 1:
+            return int(cls.execute(jobs[0]))
+        try:
+            results = cls._tasks[jobs[0].name]([job.payload for job in jobs])
+            if len(results) != len(jobs):
+                raise RuntimeError(f'{jobs[0].name} returned {len(results)} results for {len(jobs)} jobs')
+        except Exception:
+            results = [traceback.format_exc()] * len(jobs)
+        done = []
+        for job, error in zip(jobs, results):
+            if error is None:
+                done.append(job.pk)
+            else:
+                cls._failed(job, str(error) or repr(error), isinstance(error, PermanentJobError))
+        Job.objects.filter(pk__in=done, locked_by=jobs[0].locked_by).delete()
+        return len(done)
+
+    @classmethod
+    def _failed(cls, job, error, permanent=False):
+        fields = {'locked_by': None, 'locked_at': None, 'last_error': error[-4000:]}
+        if permanent or job.attempts >= job.max_attempts:
+            fields['status'] = Job.DEAD
+            logger.error(f'Job {job} failed for good after {job.attempts} attempts:\n{error}')
+        else:
+            fields['status'] = Job.QUEUED
+            fields['run_at'] = timezone.now() + datetime.timedelta(seconds=cls.backoff(job.attempts))
+            logger.warning(f'Job {job} failed (attempt {job.attempts}/{job.max_attempts}), retrying')
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**fields)
+
+    @classmethod
+    def backoff(cls, attempts):
+        config = cls._config()
+        delay = min(config['BACKOFF_BASE'] * 2 ** max(attempts - 1, 0), config['BACKOFF_MAX'])
+        # Jitter spreads out retries of jobs that failed together.
+        return delay * random.uniform(0.5, 1)
+
+    @classmethod
+    def requeue_stale(cls):
+        """
+        Requeues (or dead-letters) running jobs whose lease expired. Returns the number changed.
+        """
+        cutoff = timezone.now() - datetime.timedelta(seconds=cls._config()['LEASE_TIMEOUT'])
+        stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+        released = {'locked_by': None, 'locked_at': None, 'last_error': 'Worker lease expired'}
+        dead = stale.filter(attempts__gte=F('max_attempts')).update(status=Job.DEAD, **released)
+        return dead + stale.update(status=Job.QUEUED, **released)
+
+    @staticmethod
+    def retry_dead(name=None):
+        """
+        Requeues dead jobs (optionally only those of task ``name``) with fresh attempts.
+        """
+        dead = Job.objects.filter(status=Job.DEAD)
+        if name:
+            dead = dead.filter(name=name)
+        return dead.update(status=Job.QUEUED, attempts=0, run_at=timezone.now())
+
+    @classmethod
+    def run_pending(cls, queues=None, worker='inline'):
+        """
+        Runs due jobs in the calling thread until none are left. Returns ``(succeeded, failed)``.
+        """
+        cls.load_tasks()
+        succeeded = failed = 0
+        while True:
+            units = cls.claim_units(worker, 100, queues)
+            if not units:
+                return succeeded, failed
+            for jobs in units:
+                done = cls.execute_unit(jobs)
+                succeeded += done
+                failed += len(jobs) - done
+
+    @classmethod
+    def _execute_in_thread(cls, jobs):
+        try:
+            return cls.execute_unit(jobs)
+        except Exception:
+            logger.exception(f'Jobs {", ".join(str(job) for job in jobs)} could not be settled')
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def work(cls, threads, queues=None, once=False, stop=None):
+        """
+        Worker loop: keeps up to ``threads`` units running until ``stop`` is set,
+        or with ``once`` until no due job is left.
+        """
+        cls.load_tasks()
+        config = cls._config()
+        stop = stop or threading.Event()
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        recovered_at = None
+        running = set()
+        with ThreadPoolExecutor(threads, thread_name_prefix='job') as pool:
+            while not stop.is_set():
+                now = timezone.now()
+                if recovered_at is None or (now - recovered_at).total_seconds() >= config['LEASE_TIMEOUT'] / 2:
+                    recovered_at = now
+                    try:
+                        cls.requeue_stale()
+                    except DatabaseError:
+                        logger.exception('Requeueing stale jobs failed')
+                running = {future for future in running if not future.done()}
+                free = threads - len(running)
+                try:
+                    units = cls.claim_units(worker, free, queues) if free else []
+                except DatabaseError:
+                    logger.exception('Claiming jobs failed')
+                    close_old_connections()
+                    stop.wait(config['POLL_INTERVAL'])
+                    continue
+                for jobs in units:
+                    running.add(pool.submit(cls._execute_in_thread, jobs))
+                if once and not units and not running:
+                    break
+                if len(running) >= threads:
+                    wait(running, timeout=config['POLL_INTERVAL'], return_when=FIRST_COMPLETED)
+                elif not units:
+                    stop.wait(config['POLL_INTERVAL'])
+            wait(running)
+        close_old_connections()
@@ -0,0 +1,130 @@
+
+import math
+import random
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+
+class ProviderScheduler:
+    """
+    Orders storage credentials for an upload by observed health.
+
+    Each credential keeps an EWMA of upload latency and error rate plus a circuit
+    breaker. Closed circuits are ordered by weighted random sampling on
+    ``1 / score`` (weighted-least-latency). Open circuits are skipped until
+    ``OPEN_SECONDS`` have passed; then one half-open probe is let through, and
+    its outcome closes or re-opens the circuit.
+
+    State lives in process memory. With ``SHARED`` enabled it is also written to
+    the Django cache, so every worker skips an account that one of them saw failing.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    CACHE_PREFIX = 'provider_scheduler:'
+
+    _states = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.PROVIDER_SCHEDULER
+
+    @classmethod
+    def _new_state(cls):
+        return {
+            'latency_ms': None,
+            'error_rate': 0.0,
+            'failures': 0,
+            'circuit': cls.CLOSED,
+            'opened_at': 0.0,
+            'probe_at': 0.0,
+            'updated_at': 0.0,
+        }
+
+    @classmethod
+    def _load(cls, keys):
+        if cls._config()['SHARED']:
+            shared = cache.get_many([cls.CACHE_PREFIX + key for key in keys])
+            for key in keys:
+                state = shared.get(cls.CACHE_PREFIX + key)
+                local = cls._states.get(key)
+                if state and (local is None or state['updated_at'] >= local['updated_at']):
+                    cls._states[key] = state
+        return {key: cls._states.setdefault(key, cls._new_state()) for key in keys}
+
+    @classmethod
+    def _store(cls, key, state):
+        state['updated_at'] = time.time()
+        cls._states[key] = state
+        if cls._config()['SHARED']:
+            cache.set(cls.CACHE_PREFIX + key, state, cls._config()['SHARED_TTL'])
+
+    @classmethod
+    def order(cls, creds):
+        """
+        Returns the credentials worth trying, best first. Credentials behind an
+        open circuit are left out; an empty list means every provider is tripped.
+        """
+        config = cls._config()
+        now = time.time()
+        with cls._lock:
+            states = cls._load([str(cred.pk) for cred in creds])
+            known = [s['latency_ms'] for s in states.values() if s['latency_ms'] is not None]
+            # Unmeasured credentials get an optimistic prior so they are explored.
+            prior = min(known) if known else 1.0
+            keyed = []
+            for cred in creds:
+                key = str(cred.pk)
+                state = states[key]
+                if state['circuit'] != cls.CLOSED:
+                    cooled_down = now - state['opened_at'] >= config['OPEN_SECONDS']
+                    probe_stale = now - state['probe_at'] >= config['OPEN_SECONDS']
+                    if not cooled_down or (state['circuit'] == cls.HALF_OPEN and not probe_stale):
+                        continue
+                    state['circuit'] = cls.HALF_OPEN
+                    state['probe_at'] = now
+                    cls._store(key, state)
+                latency = state['latency_ms'] if state['latency_ms'] is not None else prior
+                score = max(latency, 1.0) * (1 + config['ERROR_PENALTY'] * state['error_rate'])
+                # Efraimidis-Spirakis weighted sampling without replacement, in log
+                # space: key = log(u) / weight with weight = 1 / score.
+                keyed.append((math.log(1.0 - random.random()) * score, cred))
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        return [cred for _, cred in keyed]
+
+    @classmethod
+    def record_success(cls, cred, latency_ms):
+        alpha = cls._config()['EWMA_ALPHA']
+        key = str(cred.pk)
+        with cls._lock:
+            state = cls._load([key])[key]
+            if state['latency_ms'] is None:
+                state['latency_ms'] = float(latency_ms)
+            else:
+                state['latency_ms'] = alpha * latency_ms + (1 - alpha) * state['latency_ms']
+            state['error_rate'] = (1 - alpha) * state['error_rate']
+            state['failures'] = 0
+            state['circuit'] = cls.CLOSED
+            cls._store(key, state)
+
+    @classmethod
+    def record_failure(cls, cred, latency_ms=None):
+        config = cls._config()
+        alpha = config['EWMA_ALPHA']
+        key = str(cred.pk)
+        with cls._lock:
+            state = cls._load([key])[key]
+            if latency_ms is not None and state['latency_ms'] is not None:
+                state['latency_ms'] = alpha * latency_ms + (1 - alpha) * state['latency_ms']
+            state['error_rate'] = alpha + (1 - alpha) * state['error_rate']
+            state['failures'] += 1
+            if state['circuit'] == cls.HALF_OPEN or state['failures'] >= config['FAILURE_THRESHOLD']:
+                state['circuit'] = cls.OPEN
+                state['opened_at'] = time.time()
+            cls._store(key, state)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._states = {}
@@ -0,0 +1,147 @@
+
+import re
+from collections import defaultdict
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from api.models import File, build_search_document
+
+
+class SearchService:
+    """
+    Indexed search over ``File.search_document`` (name, original name, tags and
+    category names).
+
+    - PostgreSQL: a GIN index on ``to_tsvector('simple', search_document)``
+      answers word-prefix queries ranked by ``ts_rank``, and a ``pg_trgm`` GIN
+      index answers substring matches, ranked by ``similarity``.
+    - SQLite: an external-content FTS5 table kept in sync by triggers,
+      ranked by ``bm25``.
+    - Anything else falls back to unindexed ``icontains``.
+    """
+    FTS_TABLE = 'api_file_fts'
+    MAX_TERMS = 8
+    REFRESH_CHUNK = 1000
+
+    @classmethod
+    def terms(cls, query):
+        return re.findall(r'[^\W_]+', (query or '').lower())[:cls.MAX_TERMS]
+
+    @classmethod
+    def refresh(cls, ids):
+        """
+        Recomputes the search documents of the given files.
+        """
+        ids = list(ids)
+        Through = File.categories.through
+        for start in range(0, len(ids), cls.REFRESH_CHUNK):
+            chunk = ids[start:start + cls.REFRESH_CHUNK]
+            names = defaultdict(list)
+            for file_id, name in Through.objects.filter(file_id__in=chunk).values_list('file_id', 'category__name'):
+                names[file_id].append(name)
+            files = list(File.objects.filter(pk__in=chunk).only('pk', 'name', 'original_name', 'tags', 'search_document'))
+            changed = []
+            for file in files:
+                document = build_search_document(file.name, file.original_name, file.tags, names[file.pk])
+                if document != file.search_document:
+                    file.search_document = document
+                    changed.append(file)
+            File.objects.bulk_update(changed, ['search_document'])
+
+    @classmethod
+    def refresh_category(cls, category):
+        cls.refresh(category.files.values_list('pk', flat=True))
+
+    @staticmethod
+    def _column():
+        return f'{connection.ops.quote_name(File._meta.db_table)}.{connection.ops.quote_name("search_document")}'
+
+    @classmethod
+    def _fts_available(cls):
+        if connection.vendor != 'sqlite':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [cls.FTS_TABLE])
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def search(cls, queryset, query):
+        """
+        Filters ``queryset`` to files matching every term of ``query`` (each term as a
+        prefix) and annotates ``search_rank``, higher is better.
+        """
+        terms = cls.terms(query)
+        if not terms:
+            return queryset.none()
+        column = cls._column()
+        if connection.vendor == 'postgresql':
+            tsquery = ' & '.join(f'{term}:*' for term in terms)
+            vector = f"to_tsvector('simple', {column})"
+            likes = ' AND '.join(f'{column} ILIKE %s' for _ in terms)
+            patterns = [f'%{term}%' for term in terms]
+            match = RawSQL(
+                f"({vector} @@ to_tsquery('simple', %s) OR ({likes}))", [tsquery, *patterns], output_field=BooleanField()
+            )
+            rank = RawSQL(
+                f"ts_rank({vector}, to_tsquery('simple', %s)) + similarity({column}, %s)",
+                [tsquery, ' '.join(terms)], output_field=FloatField()
+            )
+        elif cls._fts_available():
+            table = connection.ops.quote_name(File._meta.db_table)
+            fts_query = ' '.join(f'"{term}"*' for term in terms)
+            match = RawSQL(
+                f"{table}.rowid IN (SELECT rowid FROM {cls.FTS_TABLE} WHERE {cls.FTS_TABLE} MATCH %s)",
+                [fts_query], output_field=BooleanField()
+            )
+            # bm25() is lower for better matches.
+            rank = RawSQL(
+                f"(SELECT -bm25({cls.FTS_TABLE}) FROM {cls.FTS_TABLE} "
+                f"WHERE {cls.FTS_TABLE} MATCH %s AND {cls.FTS_TABLE}.rowid = {table}.rowid)",
+                [fts_query], output_field=FloatField()
+            )
+        else:
+            match = Q()
+            for term in terms:
+                match &= Q(search_document__icontains=term)
+            rank = Value(0.0, output_field=FloatField())
+        return queryset.filter(match).annotate(search_rank=rank)
+
+    @classmethod
+    def install(cls, db_connection):
+        """
+        Creates the search indexes for ``db_connection`` if missing. On SQLite it also
+        (re)creates the sync triggers and rebuilds the FTS table, which a table
+        rebuild by a later migration would otherwise leave stale.
+        """
+        table = File._meta.db_table
+        with db_connection.cursor() as cursor:
+            if db_connection.vendor == 'postgresql':
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS file_search_fts_idx ON {table} "
+                    f"USING GIN (to_tsvector('simple', search_document))"
+                )
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS file_search_trgm_idx ON {table} "
+                    f"USING GIN (search_document gin_trgm_ops)"
+                )
+            elif db_connection.vendor == 'sqlite':
+                fts = cls.FTS_TABLE
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"search_document, content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, search_document) VALUES (new.rowid, new.search_document); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.rowid, old.search_document); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF search_document ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, search_document) VALUES ('delete', old.rowid, old.search_document); "
+                    f"INSERT INTO {fts}(rowid, search_document) VALUES (new.rowid, new.search_document); END"
+                )
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
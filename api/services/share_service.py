@@ -0,0 +1,145 @@
+
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.db.models import F
+from api.models import ShareLink
+
+
+class ShareLinkError(Exception):
+    """
+    Raised by ``ShareLinkService.resolve``; ``status`` is the HTTP status to answer with.
+    """
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class ShareLinkService:
+    """
+    Serves ``/s/<token>``.
+
+    Token lookups are cached (``CACHE_TTL``), including unknown tokens, so a hot
+    link costs no query to resolve. Links with ``max_downloads`` are counted with
+    one conditional ``F()`` UPDATE, which cannot overshoot the limit under
+    concurrency. Unlimited links are counted with ``cache.incr``; the request
+    that brings a link's pending count to ``FLUSH_THRESHOLD``, or finds it older
+    than ``FLUSH_INTERVAL`` seconds, writes it with one ``F()`` UPDATE. Nothing
+    waits for a later request or process exit, so at most a threshold's worth
+    per link is pending at any time.
+    """
+    PREFIX = 'share'
+    MISSING = {'missing': True}
+
+    @staticmethod
+    def _config():
+        return settings.SHARE_LINKS
+
+    @classmethod
+    def _key(cls, token):
+        return f'{cls.PREFIX}:{token}'
+
+    @staticmethod
+    def _entry(link):
+        return {
+            'id': link['id'],
+            'url': link['file__url'],
+            'is_active': link['is_active'] and link['file__url'] is not None,
+            'expires_at': link['expires_at'].timestamp() if link['expires_at'] else None,
+            'password_hash': link['password_hash'] or None,
+            'max_downloads': link['max_downloads'],
+            'exhausted': 0 < link['max_downloads'] <= link['current_downloads'],
+        }
+
+    @classmethod
+    def lookup(cls, token):
+        """
+        Returns the cached metadata of ``token``, or None if there is no such link.
+        """
+        key = cls._key(token)
+        entry = cache.get(key)
+        if entry is None:
+            link = ShareLink.objects.filter(token=token).values(
+                'id', 'is_active', 'expires_at', 'password_hash', 'max_downloads', 'current_downloads', 'file__url',
+            ).first()
+            entry = cls._entry(link) if link else cls.MISSING
+            cache.set(key, entry, cls._config()['CACHE_TTL'])
+        return None if entry.get('missing') else entry
+
+    @classmethod
+    def invalidate(cls, token):
+        cache.delete(cls._key(token))
+
+    @classmethod
+    def resolve(cls, token, password=None):
+        """
+        Checks the link and counts the download. Returns the URL to redirect to.
+        """
+        entry = cls.lookup(token)
+        if entry is None or not entry['is_active']:
+            raise ShareLinkError('Share link not found', 404)
+        if entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+            raise ShareLinkError('Share link has expired', 410)
+        if entry['exhausted']:
+            raise ShareLinkError('Download limit reached', 410)
+        if entry['password_hash'] and not (password and check_password(password, entry['password_hash'])):
+            raise ShareLinkError('Password required', 401)
+        if entry['max_downloads']:
+            cls._count_limited(token, entry)
+        else:
+            cls._count(entry['id'])
+        return entry['url']
+
+    @classmethod
+    def _count_limited(cls, token, entry):
+        counted = ShareLink.objects.filter(
+            pk=entry['id'], current_downloads__lt=entry['max_downloads']
+        ).update(current_downloads=F('current_downloads') + 1)
+        if not counted:
+            # Cache the exhausted state so later requests are refused without a query.
+            cache.set(cls._key(token), {**entry, 'exhausted': True}, cls._config()['CACHE_TTL'])
+            raise ShareLinkError('Download limit reached', 410)
+
+    @classmethod
+    def _pending_keys(cls, link_id):
+        prefix = f'{cls.PREFIX}:downloads:{link_id}'
+        return prefix, f'{prefix}:since', f'{prefix}:lock'
+
+    @classmethod
+    def _count(cls, link_id):
+        key, since_key, _ = cls._pending_keys(link_id)
+        cache.add(key, 0, None)
+        try:
+            pending = cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr.
+            cache.set(key, 1, None)
+            pending = 1
+        if pending == 1:
+            cache.add(since_key, time.time(), None)
+        config = cls._config()
+        age = time.time() - cache.get(since_key, time.time())
+        if pending >= config['FLUSH_THRESHOLD'] or age >= config['FLUSH_INTERVAL']:
+            cls.flush(link_id)
+
+    @classmethod
+    def flush(cls, link_id):
+        """
+        Writes the pending download count of one link. Returns the number of downloads written.
+        """
+        key, since_key, lock_key = cls._pending_keys(link_id)
+        if not cache.add(lock_key, 1, 30):
+            return 0  # Another request is writing it.
+        try:
+            pending = cache.get(key) or 0
+            if pending <= 0:
+                return 0
+            # Only increments happen meanwhile, so taking back ``pending`` leaves theirs.
+            cache.decr(key, pending)
+            cache.set(since_key, time.time(), None)
+            ShareLink.objects.filter(pk=link_id).update(current_downloads=F('current_downloads') + pending)
+            return pending
+        finally:
+            cache.delete(lock_key)
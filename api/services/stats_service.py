@@ -0,0 +1,205 @@
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from api.models import File, FileStat, StorageCredential
+from api.utils.cache import ResponseCache
+
+
+class StatsService:
+    """
+    Maintains and reads the ``FileStat`` facet tables.
+
+    Every file counts once in each dimension. A change becomes ``(bytes, count)``
+    deltas on the affected ``(dimension, key)`` rows, written with one ``F()``
+    UPDATE per distinct delta; rows that reach zero files are removed. The
+    ``stats`` response cache of the user is bumped with every change.
+    """
+    FIELDS = ('user_id', 'storage_account_id', 'file_type', 'extension', 'is_favorite', 'created_at', 'size')
+
+    @staticmethod
+    def _month(value):
+        if value is None:
+            return ''
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m')
+
+    @classmethod
+    def keys(cls, values):
+        """
+        Returns the ``(dimension, key)`` pairs a file row counts toward.
+        """
+        return [
+            ('file_type', values['file_type'] or ''),
+            ('extension', values['extension'] or ''),
+            ('storage_account', str(values['storage_account_id']) if values['storage_account_id'] else ''),
+            ('is_favorite', 'true' if values['is_favorite'] else 'false'),
+            ('month', cls._month(values['created_at'])),
+        ]
+
+    @classmethod
+    def _values(cls, file):
+        return {name: file.__dict__.get(name) for name in cls.FIELDS}
+
+    @classmethod
+    def apply_changes(cls, removed=(), added=()):
+        """
+        Applies file rows (``FIELDS`` mappings) as they were before and after a change.
+        """
+        deltas = defaultdict(lambda: [0, 0])
+        for rows, sign in ((removed, -1), (added, 1)):
+            for values in rows:
+                if None in (values['user_id'], values['size']):
+                    continue
+                for dimension, key in cls.keys(values):
+                    delta = deltas[(values['user_id'], dimension, key[:100])]
+                    delta[0] += sign * values['size']
+                    delta[1] += sign
+        by_user = defaultdict(dict)
+        for (user_id, dimension, key), (bytes_delta, count_delta) in deltas.items():
+            if bytes_delta or count_delta:
+                by_user[user_id][(dimension, key)] = (bytes_delta, count_delta)
+        for user_id, user_deltas in by_user.items():
+            cls._apply_user(user_id, user_deltas)
+            ResponseCache.bump('stats', user_id)
+
+    @staticmethod
+    def _apply_user(user_id, deltas):
+        with transaction.atomic():
+            rows = FileStat.objects.filter(user_id=user_id, dimension__in={dimension for dimension, _ in deltas})
+            existing = {(row['dimension'], row['key']): row['pk'] for row in rows.values('pk', 'dimension', 'key')}
+            missing = [key for key, delta in deltas.items() if key not in existing and delta[1] > 0]
+            # Concurrent writers may create the same row; the unique constraint keeps one.
+            FileStat.objects.bulk_create(
+                [FileStat(user_id=user_id, dimension=dimension, key=key) for dimension, key in missing],
+                ignore_conflicts=True,
+            )
+            if missing:
+                existing.update(
+                    ((row['dimension'], row['key']), row['pk'])
+                    for row in rows.values('pk', 'dimension', 'key')
+                )
+            grouped = defaultdict(list)
+            for key, delta in deltas.items():
+                if key in existing:
+                    grouped[delta].append(existing[key])
+            for (bytes_delta, count_delta), pks in grouped.items():
+                FileStat.objects.filter(pk__in=pks).update(
+                    total_bytes=F('total_bytes') + bytes_delta,
+                    file_count=F('file_count') + count_delta,
+                )
+            if any(delta[1] < 0 for delta in deltas.values()):
+                FileStat.objects.filter(user_id=user_id, file_count__lte=0).delete()
+
+    @classmethod
+    def file_saved(cls, file, created):
+        new = cls._values(file)
+        if created:
+            cls.apply_changes(added=[new])
+            return
+        old = getattr(file, '_tracked', None)
+        if not old or None in (old['user_id'], old['size']):
+            return
+        if cls.keys(old) != cls.keys(new) or (old['user_id'], old['size']) != (new['user_id'], new['size']):
+            cls.apply_changes(removed=[old], added=[new])
+
+    @classmethod
+    def file_deleted(cls, file):
+        old = getattr(file, '_tracked', None)
+        if old:
+            cls.apply_changes(removed=[old])
+
+    @classmethod
+    def files_created(cls, files):
+        cls.apply_changes(added=[cls._values(file) for file in files])
+
+    @classmethod
+    def files_deleted(cls, files):
+        cls.apply_changes(removed=[file._tracked for file in files if getattr(file, '_tracked', None)])
+
+    @classmethod
+    def files_updated(cls, previous):
+        """
+        Applies a set-based update given the affected rows as they were before it.
+        """
+        current = File.objects.filter(pk__in=[row['pk'] for row in previous]).values(*cls.FIELDS)
+        cls.apply_changes(removed=previous, added=list(current))
+
+    @classmethod
+    def detach_account(cls, credential):
+        """
+        Files of a deleted credential keep existing with ``storage_account=None``,
+        so their totals move to the unassigned key.
+        """
+        row = FileStat.objects.filter(user_id=credential.user_id, dimension='storage_account', key=str(credential.pk)).first()
+        if row is None:
+            return
+        cls._apply_user(row.user_id, {
+            ('storage_account', str(credential.pk)): (-row.total_bytes, -row.file_count),
+            ('storage_account', ''): (row.total_bytes, row.file_count),
+        })
+        ResponseCache.bump('stats', row.user_id)
+
+    @staticmethod
+    def summary(user):
+        """
+        Returns ``{'total': {...}, <dimension>: [{'key', 'file_count', 'total_bytes'}]}``.
+        Storage account facets also carry the account ``name``.
+        """
+        result = {dimension: [] for dimension in FileStat.DIMENSIONS}
+        for row in FileStat.objects.filter(user=user).values('dimension', 'key', 'file_count', 'total_bytes'):
+            if row['dimension'] in result:
+                result[row['dimension']].append({key: row[key] for key in ('key', 'file_count', 'total_bytes')})
+        account_ids = [row['key'] for row in result['storage_account'] if row['key']]
+        names = dict(
+            (str(pk), name) for pk, name in StorageCredential.objects.filter(pk__in=account_ids).values_list('pk', 'name')
+        ) if account_ids else {}
+        for row in result['storage_account']:
+            row['name'] = names.get(row['key'])
+        for dimension in FileStat.DIMENSIONS:
+            result[dimension].sort(key=lambda row: (-row['file_count'], row['key']))
+        result['month'].sort(key=lambda row: row['key'])
+        result['total'] = {
+            'file_count': sum(row['file_count'] for row in result['is_favorite']),
+            'total_bytes': sum(row['total_bytes'] for row in result['is_favorite']),
+        }
+        return result
+
+    @classmethod
+    def rebuild(cls, user=None):
+        """
+        Recomputes the facets from ``File`` rows. Returns the number of rows written.
+        """
+        files = File.objects.all()
+        stats = FileStat.objects.all()
+        if user is not None:
+            files = files.filter(user=user)
+            stats = stats.filter(user=user)
+        groupings = {
+            'file_type': files.values('user_id', 'file_type'),
+            'extension': files.values('user_id', 'extension'),
+            'storage_account': files.values('user_id', 'storage_account_id'),
+            'is_favorite': files.values('user_id', 'is_favorite'),
+            'month': files.annotate(month=TruncMonth('created_at')).values('user_id', 'month'),
+        }
+        totals = defaultdict(lambda: [0, 0])
+        for dimension, grouping in groupings.items():
+            for row in grouping.order_by().annotate(total_bytes=Sum('size'), file_count=Count('id')):
+                values = defaultdict(lambda: None, row, created_at=row.get('month'))
+                key = dict(cls.keys(values))[dimension][:100]
+                total = totals[(row['user_id'], dimension, key)]
+                total[0] += row['total_bytes'] or 0
+                total[1] += row['file_count']
+        rows = [
+            FileStat(user_id=user_id, dimension=dimension, key=key, total_bytes=total_bytes, file_count=file_count)
+            for (user_id, dimension, key), (total_bytes, file_count) in totals.items()
+        ]
+        with transaction.atomic():
+            stats.delete()
+            FileStat.objects.bulk_create(rows, batch_size=1000)
+        for user_id in {row.user_id for row in rows}:
+            ResponseCache.bump('stats', user_id)
+        return len(rows)
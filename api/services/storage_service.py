@@ -2,9 +2,132 @@
 import base64
 import hashlib
 import hmac
+import io
+import mimetypes
 import time
+import uuid
 import requests
 from urllib.parse import urlparse
+from api.services.http_client import HttpClient
+
+
+class UploadCancelled(Exception):
+    """
+    Raised from a body read when a concurrent upload attempt has already won.
+    """
+
+
+class UploadSource:
+    """
+    Re-openable handle on an uploaded file.
+    Every provider attempt gets its own reader positioned at byte 0, so failover
+    never has to keep a copy of the payload around.
+    """
+
+    def __init__(self, name, size, opener, content_type=None):
+        self.name = name
+        self.size = size
+        self.content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self._opener = opener
+
+    def open(self):
+        return self._opener()
+
+    @classmethod
+    def from_uploaded_file(cls, upfile):
+        """
+        Wraps a Django ``UploadedFile``. Large uploads are already spooled to disk by
+        ``TemporaryFileUploadHandler`` and are re-opened by path; small ones live in
+        memory below ``FILE_UPLOAD_MAX_MEMORY_SIZE``.
+        """
+        content_type = getattr(upfile, 'content_type', None)
+        if hasattr(upfile, 'temporary_file_path'):
+            path = upfile.temporary_file_path()
+            return cls(upfile.name, upfile.size, lambda: open(path, 'rb'), content_type)
+        upfile.seek(0)
+        data = upfile.read()
+        return cls(upfile.name, len(data), lambda: io.BytesIO(data), content_type)
+
+    @classmethod
+    def from_bytes(cls, data, name):
+        return cls(name, len(data), lambda: io.BytesIO(data))
+
+
+class MultipartStream:
+    """
+    File-like ``multipart/form-data`` body.
+    Text fields are encoded up front; file parts are pulled from their readers
+    in ``read()``, so ``requests`` sends the body with a known Content-Length
+    while holding at most one chunk in memory.
+    """
+
+    def __init__(self, fields, files, boundary=None, cancel_event=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self._cancel_event = cancel_event
+        self._parts = []
+        self._readers = []
+        for name, value in fields:
+            self._parts.append(self._header(name) + b'\r\n' + str(value).encode() + b'\r\n')
+        for name, (file_name, source) in files:
+            reader = source.open()
+            self._readers.append(reader)
+            self._parts.append(self._header(name, file_name, source.content_type) + b'\r\n')
+            self._parts.append((reader, source.size))
+            self._parts.append(b'\r\n')
+        self._parts.append(f'--{self.boundary}--\r\n'.encode())
+        self.len = sum(part[1] if isinstance(part, tuple) else len(part) for part in self._parts)
+        self._index = 0
+        self._offset = 0
+
+    def _header(self, name, file_name=None, content_type=None):
+        disposition = f'form-data; name="{name}"'
+        if file_name is not None:
+            disposition += f'; filename="{file_name}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type:
+            header += f'Content-Type: {content_type}\r\n'
+        return header.encode()
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise UploadCancelled()
+        if size is None or size < 0:
+            size = self.len
+        out = bytearray()
+        while len(out) < size and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, tuple):
+                chunk = part[0].read(size - len(out))
+                if not chunk:
+                    self._index += 1
+                    continue
+                out += chunk
+            else:
+                chunk = part[self._offset:self._offset + size - len(out)]
+                out += chunk
+                self._offset += len(chunk)
+                if self._offset >= len(part):
+                    self._index += 1
+                    self._offset = 0
+        return bytes(out)
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class StorageService:
     """
@@ -36,22 +159,81 @@ class StorageService:
         return {"signature": signature, "timestamp": ts}
 
     @staticmethod
-    def upload_imagekit(credential, file_bytes, file_name):
-        auth = base64.b64encode((credential.private_key_encrypted + ":").encode()).decode()
-        headers = {"Authorization": f"Basic {auth}"}
-        files = {
-            "file": (file_name, file_bytes),
-            "fileName": (None, file_name),
-        }
+    def _as_source(file_data, file_name):
+        if isinstance(file_data, UploadSource):
+            return file_data
+        return UploadSource.from_bytes(file_data, file_name)
+
+    @staticmethod
+    def upload(credential, file_data, file_name, cancel_event=None):
+        """
+        Uploads to the credential's provider.
+        """
+        if credential.provider == 'imagekit':
+            return StorageService.upload_imagekit(credential, file_data, file_name, cancel_event)
+        elif credential.provider == 'cloudinary':
+            return StorageService.upload_cloudinary(credential, file_data, file_name, cancel_event)
+        raise requests.RequestException(f"Unsupported provider {credential.provider}")
+
+    @staticmethod
+    def delete_file(credential, file_id):
+        """
+        Removes an uploaded object, e.g. the copy left behind by a losing race attempt.
+        """
+        if credential.provider == 'imagekit':
+            url = f"https://api.imagekit.io/v1/files/{file_id}"
+            resp = HttpClient.delete(url, profile="storage", headers={"Authorization": f"Basic {StorageService._imagekit_auth(credential)}"})
+            if resp.status_code not in (200, 204):
+                raise requests.RequestException(f"ImageKit delete failed: {resp.status_code} {resp.text}")
+        elif credential.provider == 'cloudinary':
+            cloud_name = StorageService._cloudinary_cloud_name(credential)
+            ts = int(time.time())
+            to_sign = f"public_id={file_id}&timestamp={ts}"
+            signature = hashlib.sha1((to_sign + credential.private_key_encrypted).encode()).hexdigest()
+            url = f"https://api.cloudinary.com/v1_1/{cloud_name}/image/destroy"
+            data = {"api_key": credential.public_key, "timestamp": ts, "signature": signature, "public_id": file_id}
+            resp = HttpClient.post(url, profile="storage", data=data)
+            if resp.status_code != 200:
+                raise requests.RequestException(f"Cloudinary delete failed: {resp.status_code} {resp.text}")
+        else:
+            raise requests.RequestException(f"Unsupported provider {credential.provider}")
+
+    @staticmethod
+    def thumbnail_url(url, size):
+        """
+        Returns a resized-delivery URL for an image hosted on ImageKit or
+        Cloudinary (the providers resize on request), or None for other hosts.
+        """
+        parsed = urlparse(url or "")
+        if parsed.netloc.endswith("imagekit.io"):
+            separator = "&" if parsed.query else "?"
+            return f"{url}{separator}tr=w-{size},h-{size},c-at_max"
+        if parsed.netloc.endswith("cloudinary.com") and "/upload/" in parsed.path:
+            return url.replace("/upload/", f"/upload/c_limit,w_{size},h_{size}/", 1)
+        return None
+
+    @staticmethod
+    def _imagekit_auth(credential):
+        return base64.b64encode((credential.private_key_encrypted + ":").encode()).decode()
+
+    @staticmethod
+    def upload_imagekit(credential, file_data, file_name, cancel_event=None):
+        """
+        Uploads to ImageKit. ``file_data`` is an ``UploadSource`` (streamed) or raw bytes.
+        """
+        source = StorageService._as_source(file_data, file_name)
+        auth = StorageService._imagekit_auth(credential)
         url = "https://upload.imagekit.io/api/v1/files/upload"
-        resp = requests.post(url, files=files, headers=headers, timeout=60)
+        with MultipartStream([("fileName", file_name)], [("file", (file_name, source))], cancel_event=cancel_event) as body:
+            headers = {"Authorization": f"Basic {auth}", "Content-Type": body.content_type}
+            resp = HttpClient.post(url, profile="storage", data=body, headers=headers)
         if resp.status_code == 200:
             data = resp.json()
             return {"url": data.get("url"), "file_id": data.get("fileId")}
         raise requests.RequestException(f"ImageKit upload failed: {resp.status_code} {resp.text}")
 
     @staticmethod
-    def upload_cloudinary(credential, file_bytes, file_name):
+    def _cloudinary_cloud_name(credential):
         parsed = urlparse(credential.url_endpoint or "")
         path = parsed.path.strip("/")
         cloud_name = ""
@@ -71,18 +253,27 @@ class StorageService:
             cloud_name = credential.bucket_name or ""
         if not cloud_name:
             raise requests.RequestException("Cloudinary upload failed: missing cloud_name in url_endpoint or bucket_name")
+        return cloud_name
+
+    @staticmethod
+    def upload_cloudinary(credential, file_data, file_name, cancel_event=None):
+        """
+        Uploads to Cloudinary. ``file_data`` is an ``UploadSource`` (streamed) or raw bytes.
+        """
+        source = StorageService._as_source(file_data, file_name)
+        cloud_name = StorageService._cloudinary_cloud_name(credential)
         ts = int(time.time())
         to_sign = f"public_id={file_name}&timestamp={ts}"
         signature = hashlib.sha1((to_sign + credential.private_key_encrypted).encode()).hexdigest()
         url = f"https://api.cloudinary.com/v1_1/{cloud_name}/image/upload"
-        data = {
-            "api_key": credential.public_key,
-            "timestamp": ts,
-            "signature": signature,
-            "public_id": file_name,
-        }
-        files = {"file": (file_name, file_bytes)}
-        resp = requests.post(url, data=data, files=files, timeout=60)
+        fields = [
+            ("api_key", credential.public_key),
+            ("timestamp", ts),
+            ("signature", signature),
+            ("public_id", file_name),
+        ]
+        with MultipartStream(fields, [("file", (file_name, source))], cancel_event=cancel_event) as body:
+            resp = HttpClient.post(url, profile="storage", data=body, headers={"Content-Type": body.content_type})
         if resp.status_code == 200:
             j = resp.json()
             return {"url": j.get("secure_url") or j.get("url"), "file_id": j.get("public_id")}
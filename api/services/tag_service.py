@@ -0,0 +1,166 @@
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F
+from api.models import File, Tag, FileTag
+
+
+class TagService:
+    """
+    Maintains the ``Tag``/``FileTag`` index that mirrors ``File.tags``.
+
+    ``File.tags`` stays the source of truth. Each change is diffed into added and
+    removed ``(file, tag)`` links, which are written with ``bulk_create`` and
+    set-based deletes, and each tag's ``file_count`` is adjusted with ``F()``.
+    Tags whose count reaches zero are removed, so facets only list tags in use.
+    """
+    MAX_LENGTH = 100
+
+    @classmethod
+    def normalize(cls, tags):
+        """
+        Returns the distinct, trimmed tag names in their original order.
+        """
+        names = (str(tag).strip()[:cls.MAX_LENGTH] for tag in (tags or []) if tag is not None)
+        return list(dict.fromkeys(name for name in names if name))
+
+    @staticmethod
+    def _values(file):
+        return {'pk': file.pk, 'user_id': file.user_id, 'tags': file.tags}
+
+    @classmethod
+    def apply_changes(cls, removed=(), added=()):
+        """
+        Applies file rows (``pk``, ``user_id``, ``tags``) as they were before and after a change.
+        """
+        old = {row['pk']: (row['user_id'], set(cls.normalize(row['tags']))) for row in removed if row.get('user_id')}
+        new = {row['pk']: (row['user_id'], set(cls.normalize(row['tags']))) for row in added if row.get('user_id')}
+        links_added = defaultdict(list)
+        links_removed = defaultdict(list)
+        for pk in old.keys() | new.keys():
+            old_user, old_names = old.get(pk, (None, set()))
+            new_user, new_names = new.get(pk, (None, set()))
+            kept = old_names & new_names if old_user == new_user else set()
+            for name in old_names - kept:
+                links_removed[(old_user, name)].append(pk)
+            for name in new_names - kept:
+                links_added[(new_user, name)].append(pk)
+        if not links_added and not links_removed:
+            return
+        with transaction.atomic():
+            if links_removed:
+                cls._remove(links_removed)
+            if links_added:
+                cls._add(links_added)
+
+    @staticmethod
+    def _adjust_counts(deltas):
+        grouped = defaultdict(list)
+        for tag_id, delta in deltas.items():
+            grouped[delta].append(tag_id)
+        for delta, tag_ids in grouped.items():
+            Tag.objects.filter(pk__in=tag_ids).update(file_count=F('file_count') + delta)
+
+    @classmethod
+    def _tag_ids(cls, user_id, names, create=False):
+        ids = dict(Tag.objects.filter(user_id=user_id, name__in=names).values_list('name', 'pk'))
+        missing = [name for name in names if name not in ids]
+        if create and missing:
+            # Concurrent writers may create the same tag; the unique constraint keeps one.
+            Tag.objects.bulk_create([Tag(user_id=user_id, name=name) for name in missing], ignore_conflicts=True)
+            ids.update(Tag.objects.filter(user_id=user_id, name__in=missing).values_list('name', 'pk'))
+        return ids
+
+    @classmethod
+    def _by_user(cls, links):
+        by_user = defaultdict(dict)
+        for (user_id, name), file_ids in links.items():
+            by_user[user_id][name] = file_ids
+        return by_user
+
+    @classmethod
+    def _add(cls, links):
+        for user_id, names in cls._by_user(links).items():
+            tag_ids = cls._tag_ids(user_id, list(names), create=True)
+            FileTag.objects.bulk_create(
+                [FileTag(file_id=file_id, tag_id=tag_ids[name]) for name, file_ids in names.items() for file_id in file_ids],
+                ignore_conflicts=True,
+            )
+            cls._adjust_counts({tag_ids[name]: len(file_ids) for name, file_ids in names.items()})
+
+    @classmethod
+    def _remove(cls, links):
+        for user_id, names in cls._by_user(links).items():
+            tag_ids = cls._tag_ids(user_id, list(names))
+            deltas = {}
+            for name, file_ids in names.items():
+                if name in tag_ids:
+                    # Links of deleted files are already gone by cascade; the count still drops.
+                    FileTag.objects.filter(tag_id=tag_ids[name], file_id__in=file_ids).delete()
+                    deltas[tag_ids[name]] = -len(file_ids)
+            cls._adjust_counts(deltas)
+            Tag.objects.filter(pk__in=list(deltas), file_count__lte=0).delete()
+
+    @classmethod
+    def file_saved(cls, file, created):
+        if created:
+            cls.apply_changes(added=[cls._values(file)])
+            return
+        old = getattr(file, '_tracked', None)
+        if not old:
+            return
+        if old['user_id'] != file.user_id or cls.normalize(old['tags']) != cls.normalize(file.tags):
+            cls.apply_changes(removed=[{**old, 'pk': file.pk}], added=[cls._values(file)])
+
+    @classmethod
+    def file_deleted(cls, file):
+        old = getattr(file, '_tracked', None)
+        if old:
+            cls.apply_changes(removed=[{**old, 'pk': file.pk}])
+
+    @classmethod
+    def files_created(cls, files):
+        cls.apply_changes(added=[cls._values(file) for file in files])
+
+    @classmethod
+    def files_deleted(cls, files):
+        cls.apply_changes(removed=[{**file._tracked, 'pk': file.pk} for file in files if getattr(file, '_tracked', None)])
+
+    @classmethod
+    def files_updated(cls, previous):
+        """
+        Applies a set-based update given the affected rows as they were before it.
+        """
+        current = File.objects.filter(pk__in=[row['pk'] for row in previous]).values('pk', 'user_id', 'tags')
+        cls.apply_changes(removed=previous, added=list(current))
+
+    @staticmethod
+    def facets(user, prefix=None, limit=100):
+        """
+        Returns ``[{'name', 'file_count'}]``, most used first, from the ``(user, file_count)`` index.
+        """
+        tags = Tag.objects.filter(user=user)
+        if prefix:
+            tags = tags.filter(name__startswith=prefix)
+        return list(tags.order_by('-file_count', 'name').values('name', 'file_count')[:limit])
+
+    @classmethod
+    def rebuild(cls, user=None):
+        """
+        Recomputes tags and links from ``File.tags``. Returns the number of tags written.
+        """
+        files = File.objects.all()
+        tags = Tag.objects.all()
+        if user is not None:
+            files = files.filter(user=user)
+            tags = tags.filter(user=user)
+        with transaction.atomic():
+            tags.delete()
+            batch = []
+            for file in files.only('pk', 'user_id', 'tags').iterator(chunk_size=1000):
+                batch.append(cls._values(file))
+                if len(batch) >= 1000:
+                    cls.apply_changes(added=batch)
+                    batch = []
+            cls.apply_changes(added=batch)
+        return Tag.objects.filter(user=user).count() if user is not None else Tag.objects.count()
@@ -0,0 +1,153 @@
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from api.services.storage_service import StorageService, UploadCancelled
+from api.services.provider_scheduler import ProviderScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class UploadFailed(Exception):
+    """
+    Raised when no credential accepted the upload. ``errors`` lists one entry per attempt.
+    """
+
+    def __init__(self, errors):
+        super().__init__('All storage providers failed')
+        self.errors = errors
+
+
+class UploadService:
+    """
+    Uploads a file to the first credential that accepts it.
+
+    Strategies:
+    - ``sequential``: try credentials one after another (the original behaviour).
+    - ``hedged``: start the next credential when the current attempt has not
+      finished within ``HEDGE_DELAY`` seconds or has failed.
+    - ``race``: start ``RACE_WIDTH`` credentials at once and keep the first success.
+
+    Concurrent strategies share a bounded thread pool. Losing attempts are
+    cancelled mid-body, and any that still complete are deleted at the provider.
+    """
+    STRATEGIES = ('sequential', 'hedged', 'race')
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.UPLOAD_FAILOVER
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=cls._config()['POOL_SIZE'],
+                        thread_name_prefix='upload'
+                    )
+        return cls._executor
+
+    @classmethod
+    def upload(cls, creds, source, file_name, strategy=None):
+        """
+        Returns ``{'credential', 'data', 'strategy', 'latency_ms'}`` for the winning attempt.
+        """
+        strategy = strategy or cls._config()['STRATEGY']
+        if strategy not in cls.STRATEGIES:
+            raise ValueError(f"Unknown upload strategy '{strategy}'")
+        started = time.monotonic()
+        if strategy == 'sequential':
+            cred, data = cls._upload_sequential(creds, source, file_name)
+        elif strategy == 'hedged':
+            cred, data = cls._upload_concurrent(creds, source, file_name, width=1, hedge_delay=cls._config()['HEDGE_DELAY'])
+        else:
+            cred, data = cls._upload_concurrent(creds, source, file_name, width=cls._config()['RACE_WIDTH'], hedge_delay=None)
+        return {
+            'credential': cred,
+            'data': data,
+            'strategy': strategy,
+            'latency_ms': int((time.monotonic() - started) * 1000),
+        }
+
+    @staticmethod
+    def _attempt(cred, source, file_name, cancel_event):
+        if cancel_event.is_set():
+            raise UploadCancelled()
+        started = time.monotonic()
+        try:
+            data = StorageService.upload(cred, source, file_name, cancel_event)
+        except UploadCancelled:
+            raise
+        except Exception:
+            ProviderScheduler.record_failure(cred, (time.monotonic() - started) * 1000)
+            raise
+        ProviderScheduler.record_success(cred, (time.monotonic() - started) * 1000)
+        return data
+
+    @classmethod
+    def _upload_sequential(cls, creds, source, file_name):
+        errors = []
+        never = threading.Event()
+        for cred in creds:
+            try:
+                return cred, cls._attempt(cred, source, file_name, never)
+            except Exception as e:
+                errors.append({'provider': cred.name, 'error': str(e)})
+        raise UploadFailed(errors)
+
+    @classmethod
+    def _upload_concurrent(cls, creds, source, file_name, width, hedge_delay):
+        pending = deque(creds)
+        inflight = {}
+        errors = []
+        cancel_event = threading.Event()
+        # Hedged mode keeps at most one extra attempt in flight.
+        max_inflight = width if hedge_delay is None else 2
+
+        def launch():
+            cred = pending.popleft()
+            future = cls._pool().submit(cls._attempt, cred, source, file_name, cancel_event)
+            inflight[future] = cred
+
+        while pending and len(inflight) < width:
+            launch()
+
+        while inflight:
+            can_hedge = hedge_delay is not None and pending and len(inflight) < max_inflight
+            done, _ = wait(list(inflight), timeout=hedge_delay if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for future in done:
+                cred = inflight.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    errors.append({'provider': cred.name, 'error': str(e)})
+                    continue
+                cancel_event.set()
+                for loser_future, loser in inflight.items():
+                    loser_future.add_done_callback(cls._cleanup_callback(loser))
+                return cred, data
+            while pending and len(inflight) < width:
+                launch()
+        raise UploadFailed(errors)
+
+    @staticmethod
+    def _cleanup_callback(cred):
+        def cleanup(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            data = future.result()
+            try:
+                StorageService.delete_file(cred, data.get('file_id'))
+            except Exception as e:
+                logger.warning(f"Failed to clean up losing upload on {cred.name}: {str(e)}")
+        return cleanup
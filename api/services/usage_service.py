@@ -0,0 +1,164 @@
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Count
+from api.models import File, StorageUsage
+
+
+class UsageService:
+    """
+    Maintains and reads the ``StorageUsage`` ledger.
+
+    Each ``(user, storage_account, file_type)`` row is updated in place with
+    ``F()`` increments, so concurrent uploads never lose an update and reading
+    a user's usage never touches the ``File`` table.
+    """
+    FIELDS = ('user_id', 'storage_account_id', 'file_type', 'size')
+
+    @staticmethod
+    def apply(user_id, storage_account_id, file_type, bytes_delta, count_delta):
+        """
+        Adds deltas to one ledger row. Only positive deltas create missing rows.
+        """
+        if not bytes_delta and not count_delta:
+            return
+        rows = StorageUsage.objects.filter(user_id=user_id, storage_account_id=storage_account_id, file_type=file_type)
+        pk = rows.values_list('pk', flat=True).first()
+        if pk is not None:
+            StorageUsage.objects.filter(pk=pk).update(
+                total_bytes=F('total_bytes') + bytes_delta,
+                file_count=F('file_count') + count_delta,
+            )
+            return
+        if count_delta < 0 or bytes_delta < 0:
+            # Nothing to decrement (e.g. the owner is being deleted); reconcile_usage repairs drift.
+            return
+        try:
+            with transaction.atomic():
+                StorageUsage.objects.create(
+                    user_id=user_id, storage_account_id=storage_account_id, file_type=file_type,
+                    total_bytes=bytes_delta, file_count=count_delta,
+                )
+        except IntegrityError:
+            # Lost the insert race; the row exists now.
+            UsageService.apply(user_id, storage_account_id, file_type, bytes_delta, count_delta)
+
+    @staticmethod
+    def file_saved(file, created):
+        new = {name: file.__dict__.get(name) for name in UsageService.FIELDS}
+        if created:
+            UsageService.apply(new['user_id'], new['storage_account_id'], new['file_type'], new['size'] or 0, 1)
+            return
+        old = getattr(file, '_tracked', None)
+        if not old or None in (old['user_id'], old['size']) or all(old[name] == new[name] for name in UsageService.FIELDS):
+            return
+        UsageService.apply(old['user_id'], old['storage_account_id'], old['file_type'], -old['size'], -1)
+        UsageService.apply(new['user_id'], new['storage_account_id'], new['file_type'], new['size'] or 0, 1)
+
+    @staticmethod
+    def _apply_many(rows, sign):
+        deltas = {}
+        for row in rows:
+            if None in (row['user_id'], row['size']):
+                continue
+            key = (row['user_id'], row['storage_account_id'], row['file_type'])
+            total_bytes, file_count = deltas.get(key, (0, 0))
+            deltas[key] = (total_bytes + sign * row['size'], file_count + sign)
+        for (user_id, storage_account_id, file_type), (total_bytes, file_count) in deltas.items():
+            UsageService.apply(user_id, storage_account_id, file_type, total_bytes, file_count)
+
+    @staticmethod
+    def files_created(files):
+        """
+        Applies a bulk insert as one delta per ledger row.
+        """
+        UsageService._apply_many([{name: file.__dict__.get(name) for name in UsageService.FIELDS} for file in files], 1)
+
+    @staticmethod
+    def files_deleted(files):
+        """
+        Applies a bulk delete as one delta per ledger row.
+        """
+        UsageService._apply_many([file._tracked for file in files if getattr(file, '_tracked', None)], -1)
+
+    @staticmethod
+    def file_deleted(file):
+        old = getattr(file, '_tracked', None)
+        if not old or None in (old['user_id'], old['size']):
+            return
+        UsageService.apply(old['user_id'], old['storage_account_id'], old['file_type'], -old['size'], -1)
+
+    @staticmethod
+    def detach_account(credential):
+        """
+        Files of a deleted credential keep existing with ``storage_account=None``,
+        so their totals move to the unassigned rows before the account rows cascade away.
+        """
+        for row in StorageUsage.objects.filter(storage_account=credential):
+            UsageService.apply(row.user_id, None, row.file_type, row.total_bytes, row.file_count)
+
+    @staticmethod
+    def summary(user):
+        rows = list(
+            StorageUsage.objects.filter(user=user).values(
+                'storage_account_id', 'storage_account__name', 'file_type', 'total_bytes', 'file_count'
+            )
+        )
+        by_type = {}
+        by_account = {}
+        for row in rows:
+            bucket = by_type.setdefault(row['file_type'], {'total_bytes': 0, 'file_count': 0})
+            bucket['total_bytes'] += row['total_bytes']
+            bucket['file_count'] += row['file_count']
+            account_id = str(row['storage_account_id']) if row['storage_account_id'] else None
+            account = by_account.setdefault(account_id, {
+                'id': account_id, 'name': row['storage_account__name'], 'total_bytes': 0, 'file_count': 0, 'by_file_type': {}
+            })
+            account['total_bytes'] += row['total_bytes']
+            account['file_count'] += row['file_count']
+            account['by_file_type'][row['file_type']] = {'total_bytes': row['total_bytes'], 'file_count': row['file_count']}
+        return {
+            'total_bytes': sum(b['total_bytes'] for b in by_type.values()),
+            'file_count': sum(b['file_count'] for b in by_type.values()),
+            'quota_bytes': UsageService.quota_for(user),
+            'by_file_type': by_type,
+            'by_storage_account': list(by_account.values()),
+        }
+
+    @staticmethod
+    def used_bytes(user):
+        return StorageUsage.objects.filter(user=user).aggregate(total=Sum('total_bytes'))['total'] or 0
+
+    @staticmethod
+    def quota_for(user):
+        """
+        Returns the user's quota in bytes, or 0 for unlimited.
+        """
+        override = user.profile.storage_quota_bytes
+        return override if override is not None else settings.STORAGE_QUOTA_BYTES
+
+    @staticmethod
+    def check_quota(user, additional_bytes):
+        quota = UsageService.quota_for(user)
+        if not quota or additional_bytes <= 0:
+            return True
+        return UsageService.used_bytes(user) + additional_bytes <= quota
+
+    @staticmethod
+    def rebuild(user=None):
+        """
+        Recomputes the ledger from ``File`` rows. Returns the number of ledger rows written.
+        """
+        files = File.objects.all()
+        usage = StorageUsage.objects.all()
+        if user is not None:
+            files = files.filter(user=user)
+            usage = usage.filter(user=user)
+        totals = files.order_by().values('user_id', 'storage_account_id', 'file_type').annotate(
+            total_bytes=Sum('size'), file_count=Count('id')
+        )
+        rows = [StorageUsage(**row) for row in totals]
+        with transaction.atomic():
+            usage.delete()
+            StorageUsage.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
@@ -0,0 +1,48 @@
+"""
+Background job handlers, registered by name with ``JobService.task`` and run
+by ``manage.py run_jobs``. Handlers take the job payload as keyword arguments
+and must be safe to run again after a failure.
+"""
+from django.conf import settings
+from django.db import transaction
+from api.models import File
+from api.services.ai_service import AIService
+from api.services.email_service import EmailService
+from api.services.job_service import JobService
+from api.services.storage_service import StorageService
+from api.services.tag_service import TagService
+from api.utils.cache import ResponseCache
+
+
+@JobService.task('files.thumbnail')
+def generate_thumbnail(file_id):
+    file = File.objects.filter(pk=file_id).first()
+    if file is None or file.thumbnail_url:
+        return
+    url = StorageService.thumbnail_url(file.url, settings.JOBS['THUMBNAIL_SIZE'])
+    if url:
+        File.objects.filter(pk=file.pk).update(thumbnail_url=url)
+        ResponseCache.bump('files', file.user_id)
+
+
+@JobService.task('files.tag')
+def suggest_tags(file_id):
+    file = File.objects.filter(pk=file_id).first()
+    if file is None:
+        return
+    summary = f"{file.original_name or file.name} ({file.file_type}, {file.size_formatted}) in {file.folder_path}"
+    suggested = AIService.suggest_tags(summary)
+    # The model call is slow; merge into the row as it is now, not as it was read.
+    with transaction.atomic():
+        file = File.objects.select_for_update().filter(pk=file_id).first()
+        if file is None:
+            return
+        tags = TagService.normalize(file.tags + suggested)
+        if tags != file.tags:
+            file.tags = tags
+            file.save(update_fields=['tags'])
+
+
+@JobService.task('email.send', batch=True)
+def send_emails(payloads):
+    return EmailService.send_batch(payloads)
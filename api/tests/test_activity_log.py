@@ -0,0 +1,83 @@
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.utils import timezone
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from api.models import ActivityLog, ActivityLogRollup
+from api.services.activity_log_service import ActivityLogWriter, ActivityLogRetention
+
+
+class ActivityLogWriterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='audited', password='password')
+
+    def test_sync_mode_writes_immediately(self):
+        ActivityLogWriter.log(self.user, 'other', 'sync entry')
+        self.assertTrue(ActivityLog.objects.filter(description='sync entry').exists())
+
+    def test_client_supplied_forwarded_for_is_not_recorded(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='foo', HTTP_USER_AGENT='agent/1.0')
+        ActivityLogWriter.log(self.user, 'login', 'with request', request=request)
+        entry = ActivityLog.objects.get(description='with request')
+        self.assertEqual((entry.ip_address, entry.user_agent), (None, 'agent/1.0'))
+
+    @override_settings(ACTIVITY_LOG={**settings.ACTIVITY_LOG, 'ASYNC': True})
+    def test_async_mode_queues_until_commit_and_flush(self):
+        with mock.patch.object(ActivityLogWriter, '_ensure_worker'):
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                for i in range(3):
+                    ActivityLogWriter.log(self.user, 'other', f'queued {i}')
+            self.assertFalse(ActivityLog.objects.filter(description__startswith='queued').exists())
+            for callback in callbacks:
+                callback()
+            with self.assertNumQueries(1):
+                self.assertEqual(ActivityLogWriter.flush(), 3)
+        self.assertEqual(ActivityLog.objects.filter(description__startswith='queued').count(), 3)
+
+
+class ActivityLogRetentionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retained', password='password')
+
+    def add_log(self, action_type, days_ago):
+        ActivityLog.objects.create(
+            user=self.user, action_type=action_type, created_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_rollup_aggregates_and_deletes_expired_rows(self):
+        for _ in range(3):
+            self.add_log('upload', 100)
+        self.add_log('delete', 100)
+        self.add_log('upload', 101)
+        self.add_log('upload', 1)
+
+        call_command('rollup_activity_logs', retention_days=30, stdout=StringIO())
+
+        self.assertEqual(ActivityLog.objects.count(), ActivityLog.objects.filter(created_at__gte=timezone.now() - timedelta(days=30)).count())
+        counts = {(r.action_type, r.count) for r in ActivityLogRollup.objects.filter(user=self.user)}
+        self.assertEqual(counts, {('upload', 3), ('delete', 1), ('upload', 1)})
+
+    def test_rollup_is_incremental(self):
+        self.add_log('upload', 100)
+        self.add_log('upload', 101)
+        days, rows = ActivityLogRetention.rollup(retention_days=30, max_days=1)
+        self.assertEqual((days, rows), (1, 1))
+        self.add_log('upload', 100)
+        ActivityLogRetention.rollup(retention_days=30)
+        self.assertEqual(sum(ActivityLogRollup.objects.values_list('count', flat=True)), 3)
+
+    def test_rollup_queries_do_not_grow_with_days(self):
+        def rollup_queries(first, days):
+            for days_ago in range(first, first + days):
+                self.add_log('upload', days_ago)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(ActivityLogRetention.rollup(retention_days=30), (days, days))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(rollup_queries(100, 2), rollup_queries(200, 20))
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.services.ai_service import AIService, CompletionCache
+
+
+class CompletionCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        CompletionCache.clear()
+
+    def upstream(self, delay=None):
+        def post(*args, **kwargs):
+            if delay is not None:
+                delay.wait(5)
+            return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {'choices': [{'message': {'content': 'ok'}}]})
+        return mock.patch('api.services.ai_service.HttpClient.post', side_effect=post)
+
+    def test_identical_prompts_hit_cache(self):
+        before = CompletionCache.stats()
+        with self.upstream() as post:
+            first = AIService.analyze_file('summary')
+            first['choices'] = []
+            second = AIService.analyze_file('summary ')
+            AIService.analyze_file('other summary')
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(second['choices'][0]['message']['content'], 'ok')
+        after = CompletionCache.stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 2)
+
+    def test_concurrent_duplicates_share_one_call(self):
+        release = threading.Event()
+        with self.upstream(release) as post, ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(AIService.generate_response, [{'role': 'user', 'content': 'hi'}]) for _ in range(4)]
+            while CompletionCache.stats()['inflight'] == 0 or post.call_count == 0:
+                threading.Event().wait(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(post.call_count, 1)
+        self.assertTrue(all(result == results[0] for result in results))
+
+
+class AIStreamTestCase(SimpleTestCase):
+    def use_upstream(self, handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        AIService._async_clients[asyncio.get_running_loop()] = client
+        return client
+
+    async def collect(self, messages):
+        return [event async for event in AIService.stream_events(messages)]
+
+    async def test_relays_upstream_events_and_records_ttft(self):
+        body = b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n: keep-alive\n\ndata: [DONE]\n\n'
+        client = self.use_upstream(lambda request: httpx.Response(200, content=body))
+        before = AIService.stream_metrics()
+        events = await self.collect([{'role': 'user', 'content': 'hello'}])
+        await client.aclose()
+        self.assertEqual(events, [b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n', b'data: [DONE]\n\n'])
+        after = AIService.stream_metrics()
+        self.assertEqual(after['completed'], before['completed'] + 1)
+        self.assertIsNotNone(after['ttft_avg'])
+
+    async def test_upstream_error_ends_with_error_event(self):
+        client = self.use_upstream(lambda request: httpx.Response(502))
+        events = await self.collect([{'role': 'user', 'content': 'hello'}])
+        await client.aclose()
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0].startswith(b'event: error\n'))
+
+
+    def test_client_is_closed_when_its_loop_shuts_down(self):
+        async def open_client():
+            return await AIService._async_client()
+
+        client = asyncio.run(open_client())
+        self.assertTrue(client.is_closed)
+
+
+class AIProxyViewTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='aiuser', password='password')
+        self.auth = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def test_stream_flag_returns_event_stream(self):
+        async def events(messages):
+            yield b'data: [DONE]\n\n'
+
+        with mock.patch('api.views.misc.AIService.stream_events', side_effect=events):
+            response = await self.async_client.post(
+                '/api/ai/generate', {'prompt': 'hi', 'stream': True}, content_type='application/json', headers=self.auth
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertTrue(response.is_async)
+            self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), b'data: [DONE]\n\n')
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.post('/api/ai/generate', {'prompt': 'hi', 'stream': True}, format='json', headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_metrics_require_admin_role(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get('/api/ai/metrics').status_code, 403)
+        self.user.profile.role = 'admin'
+        self.user.profile.save()
+        response = self.client.get('/api/ai/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('stream', response.data)
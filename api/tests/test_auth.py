@@ -1,7 +1,15 @@
 
-from django.test import TestCase
+
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
-from api.models import Profile
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import DEFAULTS, IMPORT_STRINGS, APISettings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from api.models import Profile, ApiKey
+from api.utils.authentication import ApiKeyAuthentication, UserSnapshotCache
 
 class AuthTestCase(TestCase):
     def setUp(self):
@@ -15,3 +23,102 @@ class AuthTestCase(TestCase):
     def test_user_login(self):
         login = self.client.login(username='testuser', password='password123')
         self.assertTrue(login)
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='jwtuser', password='password123')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def test_warm_cache_skips_user_queries(self):
+        self.client.get('/api/profiles/me/', **self.auth)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/profiles/me/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_snapshot_leaves_out_password_hash(self):
+        snapshot = UserSnapshotCache._snapshot(self.user)
+        self.assertNotIn('password', snapshot['user'])
+        self.assertNotIn(self.user.password, str(snapshot))
+
+    def test_password_change_revokes_cached_tokens(self):
+        token = RefreshToken.for_user(self.user).access_token
+        token['hash_password'] = get_md5_hash_password(self.user.password)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        jwt_settings = APISettings({'CHECK_REVOKE_TOKEN': True}, DEFAULTS, IMPORT_STRINGS)
+        with mock.patch('api.utils.authentication.api_settings', jwt_settings):
+            self.assertEqual(self.client.get('/api/profiles/me/', **auth).status_code, 200)
+            self.user.set_password('changed123')
+            self.user.save()
+            self.assertEqual(self.client.get('/api/profiles/me/', **auth).status_code, 401)
+
+    def test_profile_change_is_visible(self):
+        self.client.get('/api/profiles/me/', **self.auth)
+        Profile.objects.filter(user=self.user).update(full_name='Stale')
+        self.user.profile.refresh_from_db()
+        self.user.profile.full_name = 'Fresh'
+        self.user.profile.save()
+        response = self.client.get('/api/profiles/me/', **self.auth)
+        self.assertEqual(response.data['full_name'], 'Fresh')
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/profiles/me/', **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/profiles/me/', **self.auth)
+        self.assertEqual(response.status_code, 401)
+
+
+class ApiKeyAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ApiKeyAuthentication.invalidate()
+        self.user = User.objects.create_user(username='keyuser', password='password123')
+
+    def test_only_digest_is_stored(self):
+        api_key, raw_key = ApiKey.generate(self.user, 'ci')
+        self.assertTrue(raw_key.startswith('sk_'))
+        self.assertEqual(api_key.key_hash, ApiKey.hash_key(raw_key))
+        self.assertEqual(api_key.prefix, raw_key[:ApiKey.PREFIX_LENGTH])
+
+    def test_key_authenticates_and_is_cached(self):
+        _, raw_key = ApiKey.generate(self.user, 'ci')
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {raw_key}'}
+        response = self.client.post('/api/external/upload', **auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNotNone(ApiKey.objects.get(user=self.user).last_used_at)
+        with self.assertNumQueries(0):
+            self.client.post('/api/external/upload', **auth)
+
+    @override_settings(EXTERNAL_UPLOAD_API_KEY='sk_shared')
+    def test_unknown_and_revoked_keys_are_rejected(self):
+        api_key, raw_key = ApiKey.generate(self.user, 'ci')
+        response = self.client.post('/api/external/upload', HTTP_AUTHORIZATION=f'Bearer {raw_key}x')
+        self.assertEqual(response.status_code, 403)
+        self.client.post('/api/external/upload', HTTP_AUTHORIZATION=f'Bearer {raw_key}')
+        api_key.is_active = False
+        api_key.save()
+        response = self.client.post('/api/external/upload', HTTP_AUTHORIZATION=f'Bearer {raw_key}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_key_lacking_scope_is_forbidden(self):
+        _, raw_key = ApiKey.generate(self.user, 'ci', scopes=['read'])
+        response = self.client.post('/api/external/upload', HTTP_AUTHORIZATION=f'Bearer {raw_key}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_key_is_not_accepted_outside_key_views(self):
+        _, raw_key = ApiKey.generate(self.user, 'ci')
+        response = self.client.get('/api/profiles/me/', HTTP_AUTHORIZATION=f'Bearer {raw_key}')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get('/api/files/', HTTP_AUTHORIZATION=f'Bearer {raw_key}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_returns_raw_key_once(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post('/api/api_keys/', {'name': 'deploy'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        api_key = ApiKey.objects.get(pk=response.data['id'])
+        self.assertEqual(api_key.key_hash, ApiKey.hash_key(response.data['key']))
+        self.assertNotIn('key', client.get(f'/api/api_keys/{api_key.pk}/').data)
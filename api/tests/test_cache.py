@@ -0,0 +1,64 @@
+
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from api.models import File, Category
+
+
+class ResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cacheuser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def create_file(self, name):
+        return File.objects.create(
+            user=self.user, name=name, url='http://example.com/f', file_type='text/plain', size=10, file_id=name
+        )
+
+    def test_if_none_match_returns_304(self):
+        response = self.client.get('/api/files/')
+        etag = response['ETag']
+        response = self.client.get('/api/files/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_list_served_without_queries(self):
+        self.client.get('/api/categories/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_file_change_invalidates_files_and_categories(self):
+        category = Category.objects.create(user=self.user, name='Docs')
+        files_etag = self.client.get('/api/files/')['ETag']
+        categories_etag = self.client.get('/api/categories/')['ETag']
+        self.create_file('a.txt').categories.add(category)
+        response = self.client.get('/api/files/', HTTP_IF_NONE_MATCH=files_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=categories_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_generation_expires_only_on_per_process_cache(self):
+        for shared, timeout in ((True, None), (False, 30)):
+            cache.clear()
+            with override_settings(CACHE_SHARED=shared, RESPONSE_CACHE_TTL=30), \
+                    mock.patch('api.utils.cache.cache', wraps=cache) as wrapped:
+                self.client.get('/api/files/')
+            self.assertEqual(wrapped.add.call_args.args[2], timeout)
+
+    def test_profile_update_invalidates_me(self):
+        etag = self.client.get('/api/auth/me')['ETag']
+        self.client.patch(f'/api/profiles/{self.user.profile.id}/', {'full_name': 'New Name'})
+        response = self.client.get('/api/auth/me', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['full_name'], 'New Name')
+
+    def test_user_update_invalidates_me(self):
+        etag = self.client.get('/api/auth/me')['ETag']
+        self.user.email = 'renamed@example.com'
+        self.user.save()
+        response = self.client.get('/api/auth/me', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['email'], 'renamed@example.com')
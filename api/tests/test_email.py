@@ -0,0 +1,60 @@
+import smtplib
+from unittest import mock
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from api.models import Job
+from api.services.email_service import EmailService
+from api.services.job_service import JobService
+
+
+class EmailQueueTestCase(TestCase):
+    def setUp(self):
+        EmailService.close()
+        self.addCleanup(EmailService.close)
+
+    def test_signup_queues_welcome_email(self):
+        response = APIClient().post('/api/auth/dev-login', {'email': 'new@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.filter(name='email.send', queue='mail').count(), 1)
+        JobService.run_pending(queues=['mail'])
+        self.assertEqual([message.to for message in mail.outbox], [['new@example.com']])
+        self.assertFalse(Job.objects.exists())
+
+    def test_batch_reuses_one_connection(self):
+        for index in range(3):
+            EmailService.queue('Hi', 'Body', [f'user{index}@example.com'], html='<p>Body</p>')
+        with mock.patch('api.services.email_service.get_connection', side_effect=get_connection) as connect:
+            self.assertEqual(JobService.run_pending(), (3, 0))
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+
+    def test_transient_errors_retry_and_rejections_dead_letter(self):
+        retried = EmailService.queue('Hi', 'Body', ['slow@example.com'])
+        rejected = EmailService.queue('Hi', 'Body', ['bad@example.com'])
+
+        def send(message, *args, **kwargs):
+            if message.to == ['bad@example.com']:
+                raise smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+            raise smtplib.SMTPServerDisconnected('gone')
+
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', autospec=True, side_effect=send):
+            self.assertEqual(JobService.run_pending(), (0, 2))
+        retried.refresh_from_db()
+        rejected.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), (Job.QUEUED, 1))
+        self.assertEqual(rejected.status, Job.DEAD)
+
+    def test_only_rejected_recipients_are_permanent(self):
+        transient = [
+            smtplib.SMTPAuthenticationError(535, b'Authentication failed'),
+            smtplib.SMTPSenderRefused(550, b'Sender not allowed', 'noreply@example.com'),
+            smtplib.SMTPDataError(554, b'Transaction failed'),
+            smtplib.SMTPRecipientsRefused({'busy@example.com': (450, b'Mailbox busy')}),
+        ]
+        for error in transient:
+            self.assertFalse(EmailService._permanent(error), error)
+        self.assertTrue(EmailService._permanent(smtplib.SMTPRecipientsRefused({'x@example.com': (553, b'Bad address')})))
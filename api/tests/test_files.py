@@ -1,7 +1,12 @@
+import base64
+import json
+import math
 
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
-from api.models import File
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import File, Category
 
 class FileAPITestCase(APITestCase):
     def setUp(self):
@@ -24,3 +29,246 @@ class FileAPITestCase(APITestCase):
         response = self.client.post('/api/files/', data)
         self.assertEqual(response.status_code, 201)
         self.assertEqual(File.objects.count(), 1)
+
+    def test_keyset_pagination_walks_all_files(self):
+        for i in range(5):
+            File.objects.create(
+                user=self.user, name=f'f{i}.txt', url='http://img.com/f', file_type='text/plain', size=1, file_id=str(i)
+            )
+        seen = []
+        url = '/api/files/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = [str(pk) for pk in File.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_prior_page(self):
+        for i in range(4):
+            File.objects.create(
+                user=self.user, name=f'f{i}.txt', url='http://img.com/f', file_type='text/plain', size=1, file_id=str(i)
+            )
+        first = self.client.get('/api/files/?page_size=2').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/files/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+        for pk in ('not-a-uuid', 5):
+            payload = json.dumps({'t': '2024-01-01T00:00:00+00:00', 'i': pk, 'r': 0})
+            token = base64.urlsafe_b64encode(payload.encode()).decode()
+            response = self.client.get(f'/api/files/?cursor={token}')
+            self.assertEqual(response.status_code, 404)
+
+    def test_list_query_count_independent_of_result_size(self):
+        def list_queries(path):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        def add_file(i):
+            file = File.objects.create(
+                user=self.user, name=f'f{i}.txt', url='http://img.com/f', file_type='text/plain', size=1, file_id=str(i)
+            )
+            file.categories.add(Category.objects.create(user=self.user, name=f'c{i}'))
+
+        add_file(0)
+        files_baseline, categories_baseline = list_queries('/api/files/'), list_queries('/api/categories/')
+        for i in range(1, 6):
+            add_file(i)
+        self.assertEqual(list_queries('/api/files/'), files_baseline)
+        self.assertEqual(list_queries('/api/categories/'), categories_baseline)
+        response = self.client.get('/api/categories/')
+        self.assertEqual([row['file_count'] for row in response.data], [1] * 6)
+
+    def test_nested_category_counts(self):
+        category = Category.objects.create(user=self.user, name='Docs')
+        for i in range(3):
+            File.objects.create(
+                user=self.user, name=f'f{i}.txt', url='http://img.com/f', file_type='text/plain', size=1, file_id=str(i)
+            ).categories.add(category)
+        response = self.client.get('/api/files/')
+        counts = [c['file_count'] for row in response.data['results'] for c in row['categories']]
+        self.assertEqual(counts, [3, 3, 3])
+
+
+class FileBulkIngestTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulkuser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def row(self, index, **extra):
+        row = {'name': f'f{index}.txt', 'url': f'http://example.com/{index}', 'file_type': 'text/plain', 'size': 10, 'file_id': f'id{index}'}
+        row.update(extra)
+        return row
+
+    def test_json_array_reports_row_errors_without_aborting(self):
+        category = Category.objects.create(user=self.user, name='Docs')
+        rows = [
+            self.row(0, category_ids=[str(category.id)]),
+            {'name': 'missing-fields.txt'},
+            self.row(2),
+            self.row(3, category_ids=['00000000-0000-0000-0000-000000000000']),
+        ]
+        response = self.client.post('/api/files/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 3])
+        self.assertEqual(File.objects.get(name='f0.txt').extension, 'txt')
+        self.assertEqual(list(category.files.values_list('name', flat=True)), ['f0.txt'])
+        usage = self.client.get('/api/usage').data
+        self.assertEqual((usage['total_bytes'], usage['file_count']), (20, 2))
+        self.assertEqual(self.user.activity_logs.filter(action_type='upload').count(), 2)
+
+    def test_ndjson_stream(self):
+        body = '\n'.join([json.dumps(self.row(0)), '{not json', '', json.dumps(self.row(1))])
+        response = self.client.post('/api/files/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+
+    def test_query_count_independent_of_row_count(self):
+        # Warm up so both measured requests update (not create) the usage row.
+        self.client.post('/api/files/bulk/', [self.row('warm')], format='json')
+        counts = []
+        for size in (5, 50):
+            rows = [self.row(f'{size}-{i}') for i in range(size)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post('/api/files/bulk/', rows, format='json')
+            inserts = sum(query['sql'].startswith('INSERT INTO "api_file" ') for query in ctx.captured_queries)
+            # The file INSERT is split only where the backend caps parameters per query (SQLite: 999).
+            per_insert = connection.ops.bulk_batch_size(File._meta.concrete_fields, rows) or size
+            self.assertEqual(inserts, math.ceil(size / per_insert))
+            counts.append(len(ctx.captured_queries) - inserts)
+        self.assertEqual(counts[0], counts[1])
+
+
+class FileBatchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.files = [
+            File.objects.create(
+                user=self.user, name=f'f{i}.txt', url='http://example.com/f', file_type='text/plain',
+                size=10, file_id=f'id{i}', tags=['old'] if i % 2 else []
+            )
+            for i in range(4)
+        ]
+
+    def batch(self, **body):
+        return self.client.post('/api/files/batch/', body, format='json')
+
+    def test_move_by_ids_counts_changes(self):
+        ids = [str(f.id) for f in self.files[:2]]
+        response = self.batch(op='move', ids=ids, folder_path='/archive')
+        self.assertEqual(response.data, {'op': 'move', 'matched': 2, 'affected': 2})
+        response = self.batch(op='move', ids=ids, folder_path='/archive')
+        self.assertEqual(response.data['affected'], 0)
+        self.assertEqual(File.objects.filter(folder_path='/archive').count(), 2)
+
+    def test_updates_stamp_updated_at(self):
+        before = File.objects.get(pk=self.files[0].pk).updated_at
+        self.batch(op='move', ids=[str(self.files[0].id)], folder_path='/archive')
+        self.batch(op='tag_add', ids=[str(self.files[1].id)], tags=['new'])
+        moved, tagged = File.objects.get(pk=self.files[0].pk), File.objects.get(pk=self.files[1].pk)
+        self.assertGreater(moved.updated_at, before)
+        self.assertGreater(tagged.updated_at, self.files[1].updated_at)
+
+    def test_categories_counts_files_not_links(self):
+        docs = Category.objects.create(user=self.user, name='Docs')
+        work = Category.objects.create(user=self.user, name='Work')
+        ids = [str(f.id) for f in self.files[:2]]
+        response = self.batch(op='categories', ids=ids, category_ids=[str(docs.id), str(work.id)], mode='add')
+        self.assertEqual(response.data['affected'], 2)
+        response = self.batch(op='categories', ids=ids, category_ids=[str(docs.id)], mode='set')
+        self.assertEqual(response.data['affected'], 2)
+        self.assertEqual(work.files.count(), 0)
+
+    def test_tags_favorite_and_categories_by_filter(self):
+        category = Category.objects.create(user=self.user, name='Docs')
+        self.batch(op='tag_add', filter={'file_type': 'text/plain'}, tags=['new', 'old'])
+        self.assertEqual(File.objects.get(pk=self.files[1].pk).tags, ['old', 'new'])
+        self.batch(op='tag_remove', filter={'file_type': 'text/plain'}, tags=['old'])
+        self.assertFalse(any('old' in f.tags for f in File.objects.all()))
+        response = self.batch(op='favorite', filter={'extension': 'txt'}, value=True)
+        self.assertEqual(response.data['affected'], 4)
+        response = self.batch(op='categories', filter={'is_favorite': True}, category_ids=[str(category.id)], mode='add')
+        self.assertEqual(response.data['affected'], 4)
+        self.assertEqual(category.files.count(), 4)
+        response = self.batch(op='favorite', filter={'category_id': str(category.id)}, value=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['affected'], 4)
+        log = self.user.activity_logs.filter(description__startswith='Batch favorite').first()
+        self.assertEqual(log.details['filter'], {'category_id': str(category.id)})
+
+    def test_delete_updates_usage_and_writes_one_audit_entry(self):
+        logs = self.user.activity_logs.count()
+        response = self.batch(op='delete', ids=[str(f.id) for f in self.files[:3]])
+        self.assertEqual(response.data['affected'], 3)
+        self.assertEqual(File.objects.count(), 1)
+        usage = self.client.get('/api/usage').data
+        self.assertEqual((usage['total_bytes'], usage['file_count']), (10, 1))
+        self.assertEqual(self.user.activity_logs.count(), logs + 1)
+
+    def test_requires_a_selection(self):
+        response = self.batch(op='favorite', value=True)
+        self.assertEqual(response.status_code, 400)
+        response = self.batch(op='move', ids=[str(self.files[0].id)])
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_malformed_filters(self):
+        for bad in ({'is_favorite': 'sometimes'}, {'category_id': 'not-a-uuid'}, {'owner': 'x'}, {}):
+            response = self.batch(op='favorite', filter=bad, value=True)
+            self.assertEqual(response.status_code, 400, bad)
+            self.assertIn('filter', response.data)
+
+
+class FileSearchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searchuser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def create_file(self, name, **extra):
+        return File.objects.create(
+            user=self.user, name=name, url='http://example.com/f', file_type='text/plain',
+            size=10, file_id=name, **extra
+        )
+
+    def search(self, q):
+        response = self.client.get('/api/files/search/', {'q': q})
+        return [row['name'] for row in response.data['results']]
+
+    def test_prefix_and_ranked_matches(self):
+        self.create_file('quarterly_report.pdf')
+        self.create_file('report report notes.txt', tags=['report'])
+        self.create_file('holiday.jpg')
+        self.assertEqual(set(self.search('rep')), {'quarterly_report.pdf', 'report report notes.txt'})
+        self.assertEqual(self.search('quart rep'), ['quarterly_report.pdf'])
+        self.assertEqual(self.search('missing'), [])
+
+    def test_document_follows_tags_and_categories(self):
+        file = self.create_file('scan.png')
+        category = Category.objects.create(user=self.user, name='Invoices')
+        file.categories.add(category)
+        self.assertEqual(self.search('invoice'), ['scan.png'])
+        category.name = 'Receipts'
+        category.save()
+        self.assertEqual(self.search('invoice'), [])
+        self.assertEqual(self.search('receipt'), ['scan.png'])
+        file.tags.append('tax2024')
+        file.save()
+        self.assertEqual(self.search('tax2024'), ['scan.png'])
+        self.client.post('/api/files/batch/', {'op': 'tag_remove', 'ids': [str(file.id)], 'tags': ['tax2024']}, format='json')
+        self.assertEqual(self.search('tax2024'), [])
+
+    def test_only_own_files_and_list_filter(self):
+        other = User.objects.create_user(username='other', password='password')
+        File.objects.create(user=other, name='report.pdf', url='http://example.com/f', file_type='text/plain', size=1, file_id='x')
+        self.create_file('my_report.pdf')
+        self.assertEqual(self.search('report'), ['my_report.pdf'])
+        response = self.client.get('/api/files/', {'search': 'report'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['my_report.pdf'])
@@ -0,0 +1,63 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from api.models import File, Folder, normalize_folder_path
+from api.services.folder_service import FolderService
+
+
+class FolderTreeTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='folderuser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def create_file(self, name, folder_path, size=10):
+        return File.objects.create(
+            user=self.user, name=name, url='http://example.com/f', file_type='text/plain',
+            size=size, file_id=name, folder_path=folder_path
+        )
+
+    def tree(self):
+        return {
+            f.path: (f.file_count, f.total_bytes, f.tree_file_count, f.tree_bytes)
+            for f in Folder.objects.filter(user=self.user)
+        }
+
+    def test_normalize_folder_path(self):
+        self.assertEqual(normalize_folder_path(''), '/')
+        self.assertEqual(normalize_folder_path(' docs//2024/ '), '/docs/2024')
+
+    def test_counts_follow_save_move_and_delete(self):
+        a = self.create_file('a.txt', '/docs/2024', size=10)
+        self.create_file('b.txt', 'docs/', size=5)
+        self.assertEqual(self.tree(), {
+            '/': (0, 0, 2, 15), '/docs': (1, 5, 2, 15), '/docs/2024': (1, 10, 1, 10),
+        })
+        a.folder_path = '/photos'
+        a.save()
+        self.assertEqual(self.tree(), {
+            '/': (0, 0, 2, 15), '/docs': (1, 5, 1, 5), '/photos': (1, 10, 1, 10),
+        })
+        a.delete()
+        self.assertEqual(self.tree(), {'/': (0, 0, 1, 5), '/docs': (1, 5, 1, 5)})
+
+    def test_bulk_paths_match_rebuild(self):
+        rows = [
+            {'name': f'f{i}.txt', 'url': 'http://example.com/f', 'file_type': 'text/plain',
+             'size': i + 1, 'file_id': f'id{i}', 'folder_path': f'/bulk/{i % 3}'}
+            for i in range(9)
+        ]
+        self.client.post('/api/files/bulk/', rows, format='json')
+        self.client.post('/api/files/batch/', {'op': 'move', 'filter': {'folder_path': '/bulk/0'}, 'folder_path': '/moved'}, format='json')
+        self.client.post('/api/files/batch/', {'op': 'delete', 'filter': {'folder_path': '/bulk/1'}}, format='json')
+        incremental = self.tree()
+        FolderService.rebuild(self.user)
+        self.assertEqual(incremental, self.tree())
+        self.assertNotIn('/bulk/1', incremental)
+        self.assertIn('/moved', incremental)
+
+    def test_listing_is_one_query(self):
+        self.create_file('a.txt', '/docs/a', size=10)
+        self.create_file('b.txt', '/docs/b', size=20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/folders', {'path': '/docs'})
+        self.assertEqual(response.data['folder']['tree_bytes'], 30)
+        self.assertEqual([child['name'] for child in response.data['children']], ['a', 'b'])
@@ -0,0 +1,100 @@
+import datetime
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from api.models import File, Job
+from api.services.job_service import JobService
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobuser', password='password')
+        self.calls = []
+        JobService.task('test.record')(lambda **payload: self.calls.append(payload))
+        JobService.task('test.fail')(self.fail_task)
+        self.addCleanup(lambda: [JobService._tasks.pop(name) for name in ('test.record', 'test.fail')])
+
+    def fail_task(self, **payload):
+        raise RuntimeError('boom')
+
+    def test_jobs_run_once_and_are_removed(self):
+        JobService.enqueue('test.record', {'n': 1})
+        JobService.enqueue('test.record', {'n': 2}, delay=60)
+        self.assertEqual(JobService.run_pending(), (1, 0))
+        self.assertEqual(self.calls, [{'n': 1}])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'n': 2}])
+
+    def test_failures_back_off_then_dead_letter(self):
+        job = JobService.enqueue('test.fail', max_attempts=2)
+        self.assertEqual(JobService.run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        JobService.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+        call_command('run_jobs', retry_dead='test.fail', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 0))
+
+    def test_batch_result_count_mismatch_fails_every_job(self):
+        JobService.task('test.short', batch=True)(lambda payloads: [None])
+        self.addCleanup(lambda: (JobService._tasks.pop('test.short'), JobService._batch_tasks.discard('test.short')))
+        JobService.enqueue('test.short', {'n': 1})
+        JobService.enqueue('test.short', {'n': 2})
+        self.assertEqual(JobService.run_pending(), (0, 2))
+        for job in Job.objects.all():
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('returned 1 results for 2 jobs', job.last_error)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = JobService.enqueue('test.record')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, locked_by='gone', locked_at=timezone.now() - datetime.timedelta(hours=1), attempts=1
+        )
+        self.assertEqual(JobService.requeue_stale(), 1)
+        self.assertEqual(JobService.run_pending(), (1, 0))
+
+    def test_image_upload_queues_thumbnail(self):
+        file = File.objects.create(
+            user=self.user, name='a.png', url='https://ik.imagekit.io/demo/a.png', file_type='image/png',
+            size=10, file_id='a'
+        )
+        File.objects.create(user=self.user, name='b.txt', url='https://example.com/b.txt', file_type='text/plain', size=1, file_id='b')
+        self.assertEqual(list(Job.objects.values_list('name', flat=True)), ['files.thumbnail'])
+        JobService.run_pending()
+        file.refresh_from_db()
+        self.assertEqual(file.thumbnail_url, 'https://ik.imagekit.io/demo/a.png?tr=w-300,h-300,c-at_max')
+
+    def test_ai_tagging_job_merges_tags(self):
+        file = File.objects.create(
+            user=self.user, name='report.pdf', url='https://example.com/r.pdf', file_type='application/pdf',
+            size=10, file_id='r', tags=['work']
+        )
+        JobService.enqueue('files.tag', {'file_id': str(file.pk)})
+        with mock.patch('api.tasks.AIService.suggest_tags', return_value=['finance', 'work']):
+            JobService.run_pending()
+        file.refresh_from_db()
+        self.assertEqual(file.tags, ['work', 'finance'])
+
+    def test_ai_tagging_keeps_edits_made_during_the_call(self):
+        file = File.objects.create(
+            user=self.user, name='report.pdf', url='https://example.com/r.pdf', file_type='application/pdf',
+            size=10, file_id='r', tags=['work']
+        )
+
+        def suggest(summary):
+            File.objects.filter(pk=file.pk).update(tags=['work', 'urgent'], is_favorite=True)
+            return ['finance']
+
+        JobService.enqueue('files.tag', {'file_id': str(file.pk)})
+        with mock.patch('api.tasks.AIService.suggest_tags', side_effect=suggest):
+            JobService.run_pending()
+        file.refresh_from_db()
+        self.assertEqual(file.tags, ['work', 'urgent', 'finance'])
+        self.assertTrue(file.is_favorite)
@@ -0,0 +1,166 @@
+
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from urllib3 import encode_multipart_formdata
+from api.models import StorageCredential
+from api.services.storage_service import MultipartStream, UploadSource
+from api.services.http_client import HttpClient
+from api.services.upload_service import UploadService, UploadFailed
+from api.services.provider_scheduler import ProviderScheduler
+from api.services.credential_registry import CredentialRegistry
+
+
+class MultipartStreamTestCase(TestCase):
+    def test_matches_reference_encoding(self):
+        source = UploadSource.from_bytes(b'x' * 100000, 'photo.png')
+        body = MultipartStream([('fileName', 'photo.png')], [('file', ('photo.png', source))], boundary='b0undary')
+        streamed = b''
+        while True:
+            chunk = body.read(8192)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 8192)
+            streamed += chunk
+        expected, _ = encode_multipart_formdata(
+            [('fileName', 'photo.png'), ('file', ('photo.png', b'x' * 100000, 'image/png'))],
+            boundary='b0undary'
+        )
+        self.assertEqual(streamed, expected)
+        self.assertEqual(len(body), len(expected))
+
+    def test_source_reopens_from_start(self):
+        source = UploadSource.from_uploaded_file(SimpleUploadedFile('a.txt', b'hello'))
+        self.assertEqual(source.open().read(), b'hello')
+        self.assertEqual(source.open().read(), b'hello')
+
+
+class HttpClientTestCase(TestCase):
+    def tearDown(self):
+        HttpClient.reset()
+
+    def test_sessions_are_pooled_per_profile(self):
+        self.assertIs(HttpClient.session('storage'), HttpClient.session('storage'))
+        self.assertIsNot(HttpClient.session('storage'), HttpClient.session('ai'))
+
+    def test_only_ai_profile_retries_post(self):
+        storage_retry = HttpClient.session('storage').get_adapter('https://upload.imagekit.io').max_retries
+        ai_retry = HttpClient.session('ai').get_adapter('https://example.com').max_retries
+        self.assertNotIn('POST', storage_retry.allowed_methods)
+        self.assertIn('POST', ai_retry.allowed_methods)
+
+
+class UploadStrategyTestCase(TestCase):
+    def setUp(self):
+        self.slow = SimpleNamespace(pk='slow', name='slow', provider='imagekit')
+        self.fast = SimpleNamespace(pk='fast', name='fast', provider='cloudinary')
+        self.source = UploadSource.from_bytes(b'data', 'a.txt')
+
+    def tearDown(self):
+        ProviderScheduler.reset()
+
+    def fake_upload(self, cred, source, file_name, cancel_event=None):
+        if cred.name == 'slow':
+            time.sleep(0.3)
+            raise Exception('timeout')
+        return {'url': f'https://{cred.name}/a.txt', 'file_id': 'a'}
+
+    @override_settings(UPLOAD_FAILOVER={'STRATEGY': 'sequential', 'POOL_SIZE': 4, 'HEDGE_DELAY': 0.05, 'RACE_WIDTH': 2})
+    def test_hedged_starts_backup_before_slow_attempt_fails(self):
+        with mock.patch('api.services.upload_service.StorageService.upload', side_effect=self.fake_upload):
+            result = UploadService.upload([self.slow, self.fast], self.source, 'a.txt', strategy='hedged')
+        self.assertEqual(result['credential'], self.fast)
+        self.assertEqual(result['strategy'], 'hedged')
+        self.assertLess(result['latency_ms'], 300)
+
+    @override_settings(UPLOAD_FAILOVER={'STRATEGY': 'race', 'POOL_SIZE': 4, 'HEDGE_DELAY': 1, 'RACE_WIDTH': 2})
+    def test_race_keeps_first_success(self):
+        with mock.patch('api.services.upload_service.StorageService.upload', side_effect=self.fake_upload):
+            result = UploadService.upload([self.slow, self.fast], self.source, 'a.txt')
+        self.assertEqual(result['credential'], self.fast)
+        self.assertEqual(result['strategy'], 'race')
+
+    def test_all_failures_are_reported(self):
+        with mock.patch('api.services.upload_service.StorageService.upload', side_effect=Exception('boom')):
+            with self.assertRaises(UploadFailed) as ctx:
+                UploadService.upload([self.slow, self.fast], self.source, 'a.txt', strategy='race')
+        self.assertEqual(len(ctx.exception.errors), 2)
+
+
+class ProviderSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.good = SimpleNamespace(pk='good')
+        self.bad = SimpleNamespace(pk='bad')
+
+    def tearDown(self):
+        ProviderScheduler.reset()
+
+    def test_failing_provider_circuit_opens(self):
+        for _ in range(settings.PROVIDER_SCHEDULER['FAILURE_THRESHOLD']):
+            ProviderScheduler.record_failure(self.bad, 50)
+        self.assertEqual(ProviderScheduler.order([self.good, self.bad]), [self.good])
+
+    def test_half_open_probe_after_cooldown(self):
+        for _ in range(settings.PROVIDER_SCHEDULER['FAILURE_THRESHOLD']):
+            ProviderScheduler.record_failure(self.bad, 50)
+        with override_settings(PROVIDER_SCHEDULER={**settings.PROVIDER_SCHEDULER, 'OPEN_SECONDS': 0}):
+            self.assertIn(self.bad, ProviderScheduler.order([self.bad]))
+            ProviderScheduler.record_success(self.bad, 20)
+        self.assertEqual(ProviderScheduler.order([self.bad]), [self.bad])
+
+    def test_prefers_lower_latency(self):
+        ProviderScheduler.record_success(self.good, 50)
+        ProviderScheduler.record_success(self.bad, 5000)
+        firsts = [ProviderScheduler.order([self.good, self.bad])[0] for _ in range(50)]
+        self.assertGreater(firsts.count(self.good), 40)
+
+
+class CredentialRegistryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='registry', password='password')
+        self.cred = StorageCredential.objects.create(
+            user=self.user, name='cl', provider='cloudinary',
+            public_key='pub', private_key_encrypted='priv', url_endpoint='https://res.cloudinary.com/demo'
+        )
+
+    def test_cached_after_first_load(self):
+        CredentialRegistry.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(CredentialRegistry.get('cloudinary'), [self.cred])
+            self.assertEqual(CredentialRegistry.get('imagekit'), [])
+
+    def test_invalidated_on_save(self):
+        CredentialRegistry.get()
+        self.cred.is_active = False
+        self.cred.save()
+        self.assertEqual(CredentialRegistry.get(), [])
+
+
+@override_settings(EXTERNAL_UPLOAD_API_KEY='sk_test')
+class ExternalUploadTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader', password='password')
+        self.cred = StorageCredential.objects.create(
+            user=self.user, name='ik', provider='imagekit',
+            public_key='pub', private_key_encrypted='priv', url_endpoint='https://ik.imagekit.io/demo'
+        )
+
+    def tearDown(self):
+        ProviderScheduler.reset()
+
+    def test_upload_streams_source(self):
+        with mock.patch('api.services.storage_service.StorageService.upload_imagekit', return_value={'url': 'u', 'file_id': 'f'}) as upload:
+            response = self.client.post(
+                '/api/external/upload',
+                {'file': SimpleUploadedFile('a.txt', b'hello')},
+                HTTP_AUTHORIZATION='Bearer sk_test'
+            )
+        self.assertEqual(response.status_code, 200)
+        source = upload.call_args[0][1]
+        self.assertIsInstance(source, UploadSource)
+        self.assertEqual(source.size, 5)
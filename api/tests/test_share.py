@@ -0,0 +1,74 @@
+import datetime
+import time
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from api.models import File, ShareLink
+from api.services.share_service import ShareLinkService
+
+
+class ShareLinkTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='shareuser', password='password')
+        self.file = File.objects.create(
+            user=self.user, name='a.txt', url='https://cdn.example.com/a.txt', file_type='text/plain',
+            size=10, file_id='a'
+        )
+
+    def share(self, token='tok', **fields):
+        return ShareLink.objects.create(user=self.user, file=self.file, token=token, **fields)
+
+    def test_redirects_and_serves_hot_link_from_cache(self):
+        link = self.share()
+        with override_settings(SHARE_LINKS={**settings.SHARE_LINKS, 'FLUSH_THRESHOLD': 100, 'FLUSH_INTERVAL': 3600}):
+            response = self.client.get('/s/tok')
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response['Location'], 'https://cdn.example.com/a.txt')
+            with self.assertNumQueries(0):
+                for _ in range(4):
+                    self.client.get('/s/tok')
+        link.refresh_from_db()
+        self.assertEqual(link.current_downloads, 0)
+        self.assertEqual(ShareLinkService.flush(link.pk), 5)
+        link.refresh_from_db()
+        self.assertEqual(link.current_downloads, 5)
+
+    @override_settings(SHARE_LINKS={**settings.SHARE_LINKS, 'FLUSH_THRESHOLD': 3, 'FLUSH_INTERVAL': 3600})
+    def test_counts_are_written_once_the_threshold_is_reached(self):
+        link = self.share()
+        for _ in range(7):
+            self.client.get('/s/tok')
+        link.refresh_from_db()
+        # Two batches of three were written by the requests that completed them.
+        self.assertEqual(link.current_downloads, 6)
+        with mock.patch('api.services.share_service.time.time', return_value=time.time() + 3600):
+            self.client.get('/s/tok')
+        link.refresh_from_db()
+        self.assertEqual(link.current_downloads, 8)
+
+    def test_download_limit_is_enforced(self):
+        link = self.share(max_downloads=2)
+        statuses = [self.client.get('/s/tok').status_code for _ in range(4)]
+        self.assertEqual(statuses, [302, 302, 410, 410])
+        link.refresh_from_db()
+        self.assertEqual(link.current_downloads, 2)
+
+    def test_unknown_expired_inactive_and_password(self):
+        self.assertEqual(self.client.get('/s/nope').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/s/nope').status_code, 404)
+        self.share('old', expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(self.client.get('/s/old').status_code, 410)
+        link = self.share('secret', password_hash=make_password('hunter2'))
+        self.assertEqual(self.client.get('/s/secret').status_code, 401)
+        self.assertEqual(self.client.get('/s/secret', HTTP_X_SHARE_PASSWORD='hunter2').status_code, 302)
+        self.assertEqual(self.client.post('/s/secret', {'password': 'hunter2'}).status_code, 302)
+        self.assertEqual(self.client.get('/s/secret?password=hunter2').status_code, 401)
+        link.is_active = False
+        link.save()
+        self.assertEqual(self.client.get('/s/secret', HTTP_X_SHARE_PASSWORD='hunter2').status_code, 404)
@@ -0,0 +1,79 @@
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from api.models import File, FileStat, StorageCredential
+
+
+class FileStatsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='statsuser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def create_file(self, name, size, file_type='text/plain', **kwargs):
+        return File.objects.create(
+            user=self.user, name=name, url='http://example.com/f',
+            file_type=file_type, size=size, file_id=name, **kwargs
+        )
+
+    def facets(self, dimension):
+        return {
+            key: (count, total)
+            for key, count, total in FileStat.objects.filter(user=self.user, dimension=dimension)
+            .values_list('key', 'file_count', 'total_bytes')
+        }
+
+    def test_facets_follow_file_changes(self):
+        a = self.create_file('a.txt', 10)
+        self.create_file('b.pdf', 30, file_type='application/pdf')
+        self.assertEqual(self.facets('extension'), {'txt': (1, 10), 'pdf': (1, 30)})
+        self.assertEqual(self.facets('is_favorite'), {'false': (2, 40)})
+        a.is_favorite = True
+        a.save()
+        self.assertEqual(self.facets('is_favorite'), {'false': (1, 30), 'true': (1, 10)})
+        a.delete()
+        self.assertEqual(self.facets('file_type'), {'application/pdf': (1, 30)})
+        self.assertEqual(self.facets('is_favorite'), {'false': (1, 30)})
+
+    def test_bulk_and_batch_paths_update_facets(self):
+        rows = [
+            {'name': f'f{i}.{"txt" if i % 2 else "md"}', 'url': 'http://example.com/f',
+             'file_type': 'text/plain', 'size': i + 1, 'file_id': f'id{i}'}
+            for i in range(6)
+        ]
+        self.client.post('/api/files/bulk/', rows, format='json')
+        self.assertEqual(self.facets('extension'), {'md': (3, 9), 'txt': (3, 12)})
+        self.client.post('/api/files/batch/', {'op': 'favorite', 'filter': {'extension': 'md'}, 'value': True}, format='json')
+        self.client.post('/api/files/batch/', {'op': 'delete', 'filter': {'extension': 'txt'}}, format='json')
+        self.assertEqual(self.facets('extension'), {'md': (3, 9)})
+        self.assertEqual(self.facets('is_favorite'), {'true': (3, 9)})
+        self.assertEqual(self.facets('file_type'), {'text/plain': (3, 9)})
+
+    def test_deleted_account_moves_to_unassigned(self):
+        credential = StorageCredential.objects.create(
+            user=self.user, name='Main', provider='imagekit',
+            public_key='pub', private_key_encrypted='priv', url_endpoint='https://ik.imagekit.io/demo'
+        )
+        self.create_file('a.txt', 10, storage_account=credential)
+        self.create_file('b.txt', 5)
+        response = self.client.get('/api/stats')
+        accounts = {row['key']: row for row in response.data['storage_account']}
+        self.assertEqual(accounts[str(credential.pk)], {'key': str(credential.pk), 'file_count': 1, 'total_bytes': 10, 'name': 'Main'})
+        credential.delete()
+        self.assertEqual(self.facets('storage_account'), {'': (2, 15)})
+
+    def test_endpoint_is_cached_until_files_change(self):
+        self.create_file('a.txt', 10)
+        response = self.client.get('/api/stats')
+        self.assertEqual(response.data['total'], {'file_count': 1, 'total_bytes': 10})
+        with self.assertNumQueries(0):
+            self.client.get('/api/stats')
+        self.create_file('b.txt', 5)
+        response = self.client.get('/api/stats')
+        self.assertEqual(response.data['total'], {'file_count': 2, 'total_bytes': 15})
+
+    def test_rebuild_command_recomputes_facets(self):
+        self.create_file('a.txt', 10)
+        FileStat.objects.all().delete()
+        call_command('rebuild_file_stats', stdout=StringIO())
+        self.assertEqual(FileStat.objects.get(user=self.user, dimension='extension').total_bytes, 10)
@@ -0,0 +1,55 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from api.models import File, Tag, FileTag
+from api.services.tag_service import TagService
+
+
+class TagIndexTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='taguser', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def create_file(self, name, tags):
+        return File.objects.create(
+            user=self.user, name=name, url='http://example.com/f', file_type='text/plain',
+            size=10, file_id=name, tags=tags
+        )
+
+    def counts(self):
+        return dict(Tag.objects.filter(user=self.user).values_list('name', 'file_count'))
+
+    def test_counts_follow_file_changes(self):
+        a = self.create_file('a.txt', ['work', ' work ', 'urgent'])
+        self.create_file('b.txt', ['work'])
+        self.assertEqual(self.counts(), {'work': 2, 'urgent': 1})
+        a.tags = ['home']
+        a.save()
+        self.assertEqual(self.counts(), {'work': 1, 'home': 1})
+        a.delete()
+        self.assertEqual(self.counts(), {'work': 1})
+        self.assertEqual(FileTag.objects.count(), 1)
+
+    def test_bulk_paths_match_rebuild(self):
+        rows = [
+            {'name': f'f{i}.txt', 'url': 'http://example.com/f', 'file_type': 'text/plain',
+             'size': 1, 'file_id': f'id{i}', 'tags': ['even' if i % 2 == 0 else 'odd']}
+            for i in range(6)
+        ]
+        self.client.post('/api/files/bulk/', rows, format='json')
+        self.assertEqual(self.counts(), {'even': 3, 'odd': 3})
+        self.client.post('/api/files/batch/', {'op': 'tag_add', 'filter': {'tag': 'odd'}, 'tags': ['starred']}, format='json')
+        self.client.post('/api/files/batch/', {'op': 'tag_remove', 'filter': {'tag': 'even'}, 'tags': ['even']}, format='json')
+        self.assertEqual(self.counts(), {'odd': 3, 'starred': 3})
+        self.client.post('/api/files/batch/', {'op': 'delete', 'filter': {'file_type': 'text/plain', 'tag': 'starred'}}, format='json')
+        self.assertEqual(self.counts(), {})
+        TagService.rebuild(self.user)
+        self.assertEqual(self.counts(), {})
+
+    def test_tag_filter_and_facets(self):
+        self.create_file('a.txt', ['work', 'urgent'])
+        self.create_file('b.txt', ['work'])
+        response = self.client.get('/api/files/', {'tag': 'urgent'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['a.txt'])
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tags', {'prefix': 'w'})
+        self.assertEqual(response.data['results'], [{'name': 'work', 'file_count': 2}])
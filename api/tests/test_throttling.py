@@ -0,0 +1,112 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.utils.throttling import ConcurrencyLimiter, RateLimiter, parse_rate
+
+
+def policies(**overrides):
+    return {**settings.THROTTLING, 'POLICIES': {**settings.THROTTLING['POLICIES'], **overrides}}
+
+
+class RateLimiterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        RateLimiter.reset()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('30/min'), (30, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+        self.assertIsNone(parse_rate(''))
+
+    @mock.patch('api.utils.throttling.time.time', return_value=6000.0)
+    def test_limit_holds_and_leases_skip_the_cache(self, now):
+        with mock.patch('api.utils.throttling.cache.get_many', wraps=cache.get_many) as get_many:
+            allowed = [RateLimiter.acquire('ai', 'user:1', 100, 60) is None for _ in range(10)]
+        self.assertTrue(all(allowed))
+        # One reservation of LEASE_FRACTION * 100 tokens served all ten requests.
+        self.assertEqual(get_many.call_count, 1)
+        results = [RateLimiter.acquire('ai', 'user:1', 100, 60) for _ in range(150)]
+        self.assertEqual(sum(result is None for result in results), 90)
+        self.assertEqual(results[-1], 60)
+
+    def test_previous_window_carries_over(self):
+        with mock.patch('api.utils.throttling.time.time', return_value=6000.0):
+            for _ in range(10):
+                RateLimiter.acquire('dev_login', 'ip:1', 10, 60)
+        with mock.patch('api.utils.throttling.time.time', return_value=6075.0):
+            # A quarter into the next window, 7.5 of the previous 10 still count.
+            results = [RateLimiter.acquire('dev_login', 'ip:1', 10, 60) for _ in range(3)]
+        self.assertEqual([result is None for result in results], [True, True, False])
+        self.assertGreater(results[-1], 1)
+
+    def test_concurrency_cap(self):
+        first = ConcurrencyLimiter.acquire('ai', 'user:1', 2)
+        second = ConcurrencyLimiter.acquire('ai', 'user:1', 2)
+        self.assertIsNone(ConcurrencyLimiter.acquire('ai', 'user:1', 2))
+        self.assertNotEqual(first, second)
+        ConcurrencyLimiter.release(first)
+        self.assertEqual(ConcurrencyLimiter.acquire('ai', 'user:1', 2), first)
+
+    def test_concurrency_slots_expire_one_by_one(self):
+        with override_settings(THROTTLING={**settings.THROTTLING, 'CONCURRENCY_TTL': 300}):
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1000.0):
+                first = ConcurrencyLimiter.acquire('ai', 'user:1', 2)
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1200.0):
+                second = ConcurrencyLimiter.acquire('ai', 'user:1', 2)
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1350.0):
+                # The first slot lapsed on its own; the second is still held.
+                self.assertEqual(ConcurrencyLimiter.acquire('ai', 'user:1', 2), first)
+                self.assertIsNone(ConcurrencyLimiter.acquire('ai', 'user:1', 2))
+        self.assertNotEqual(first, second)
+
+
+class ThrottledViewsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        RateLimiter.reset()
+
+    @override_settings(THROTTLING=policies(dev_login={'RATE': '2/min', 'CONCURRENCY': 0}))
+    def test_dev_login_returns_retry_after(self):
+        statuses = [
+            self.client.post('/api/auth/dev-login', {'email': 'dev@example.com'}, format='json').status_code
+            for _ in range(2)
+        ]
+        self.assertEqual(statuses, [200, 200])
+        response = self.client.post('/api/auth/dev-login', {'email': 'dev@example.com'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(THROTTLING=policies(dev_login={'RATE': '2/min', 'CONCURRENCY': 0}))
+    def test_spoofed_forwarded_for_does_not_reset_the_limit(self):
+        def login(forwarded):
+            return self.client.post(
+                '/api/auth/dev-login', {'email': 'dev@example.com'}, format='json', HTTP_X_FORWARDED_FOR=forwarded
+            ).status_code
+
+        self.assertEqual([login(f'10.0.0.{i}') for i in range(3)], [200, 200, 429])
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            # Behind one proxy only the address it appended counts.
+            self.assertEqual([login(f'10.0.1.{i}, 203.0.113.7') for i in range(3)], [200, 200, 429])
+
+    @override_settings(THROTTLING=policies(ai={'RATE': '', 'CONCURRENCY': 1}))
+    async def test_stream_holds_concurrency_slot_until_it_ends(self):
+        user = await User.objects.acreate(username='streamer')
+        auth = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+        async def events(messages):
+            yield b'data: [DONE]\n\n'
+
+        def generate():
+            return self.async_client.post(
+                '/api/ai/generate', {'prompt': 'hi', 'stream': True}, content_type='application/json', headers=auth
+            )
+
+        with mock.patch('api.views.misc.AIService.stream_events', side_effect=events):
+            stream = await generate()
+            self.assertEqual((await generate()).status_code, 429)
+            self.assertEqual(b''.join([chunk async for chunk in stream.streaming_content]), b'data: [DONE]\n\n')
+            self.assertEqual((await generate()).status_code, 200)
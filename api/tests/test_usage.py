@@ -0,0 +1,72 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from api.models import File, StorageCredential, StorageUsage
+
+
+class UsageTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='usageuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.cred = StorageCredential.objects.create(
+            user=self.user, name='ik', provider='imagekit',
+            public_key='pub', private_key_encrypted='priv', url_endpoint='https://ik.imagekit.io/demo'
+        )
+
+    def create_file(self, size, file_type='image/png', **kwargs):
+        return File.objects.create(
+            user=self.user, name='a.png', url='http://example.com/a.png',
+            file_type=file_type, size=size, file_id='a', **kwargs
+        )
+
+    def test_ledger_follows_file_lifecycle(self):
+        first = self.create_file(100, storage_account=self.cred)
+        self.create_file(50, file_type='text/plain')
+        first.size = 300
+        first.save()
+        response = self.client.get('/api/usage')
+        self.assertEqual(response.data['total_bytes'], 350)
+        self.assertEqual(response.data['file_count'], 2)
+        self.assertEqual(response.data['by_file_type']['image/png'], {'total_bytes': 300, 'file_count': 1})
+
+        first.delete()
+        response = self.client.get('/api/usage')
+        self.assertEqual(response.data['total_bytes'], 50)
+        self.assertEqual(response.data['file_count'], 1)
+
+    def test_usage_read_is_constant(self):
+        for size in range(10):
+            self.create_file(size)
+        with self.assertNumQueries(1):
+            self.client.get('/api/usage')
+
+    def test_deleted_credential_moves_to_unassigned(self):
+        self.create_file(100, storage_account=self.cred)
+        self.cred.delete()
+        accounts = self.client.get('/api/usage').data['by_storage_account']
+        self.assertEqual([(a['id'], a['total_bytes']) for a in accounts], [(None, 100)])
+
+    def test_one_unassigned_row_per_type(self):
+        StorageUsage.objects.create(user=self.user, storage_account=None, file_type='image/png')
+        StorageUsage.objects.create(user=self.user, storage_account=self.cred, file_type='image/png')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StorageUsage.objects.create(user=self.user, storage_account=None, file_type='image/png')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StorageUsage.objects.create(user=self.user, storage_account=self.cred, file_type='image/png')
+
+    @override_settings(STORAGE_QUOTA_BYTES=1000)
+    def test_quota_enforced_on_create(self):
+        self.create_file(900)
+        data = {'name': 'b.png', 'url': 'http://example.com/b.png', 'file_type': 'image/png', 'size': 200, 'file_id': 'b'}
+        response = self.client.post('/api/files/', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.data)
+
+    def test_reconcile_rebuilds_ledger(self):
+        self.create_file(100)
+        StorageUsage.objects.all().delete()
+        call_command('reconcile_usage', stdout=StringIO())
+        self.assertEqual(StorageUsage.objects.get(user=self.user).total_bytes, 100)
@@ -12,8 +12,12 @@ from api.views.file import FileViewSet
 from api.views.log import ActivityLogViewSet
 from api.views.apikey import ApiKeyViewSet
 from api.views.auth import DevLoginView, ChangePasswordView, CustomTokenObtainPairView
-from api.views.misc import AIProxyView, HealthCheckView
+from api.views.misc import AIProxyView, AIMetricsView, HealthCheckView
 from api.views.external import ExternalUploadView
+from api.views.usage import UsageView
+from api.views.folder import FolderView
+from api.views.tag import TagFacetView
+from api.views.stats import StatsView
 
 router = DefaultRouter()
 router.register(r'profiles', ProfileViewSet, basename='profile')
@@ -31,6 +35,11 @@ urlpatterns = [
     path('auth/password', ChangePasswordView.as_view(), name='change_password'),
     path('auth/me', ProfileViewSet.as_view({'get': 'me'}), name='me'),
     path('ai/generate', AIProxyView.as_view(), name='ai_generate'),
+    path('ai/metrics', AIMetricsView.as_view(), name='ai_metrics'),
     path('external/upload', ExternalUploadView.as_view(), name='external_upload'),
+    path('usage', UsageView.as_view(), name='usage'),
+    path('folders', FolderView.as_view(), name='folders'),
+    path('tags', TagFacetView.as_view(), name='tags'),
+    path('stats', StatsView.as_view(), name='stats'),
     path('', include(router.urls)),
 ]
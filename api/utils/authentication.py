@@ -0,0 +1,229 @@
+
+import datetime
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from api.models import ApiKey, Profile
+
+
+class UserSnapshotCache:
+    """
+    Caches a compact snapshot of a user and their profile, keyed by user id and
+    a per-user version. ``invalidate`` bumps the version (from User/Profile save
+    signals and password changes), orphaning the old snapshot on every worker
+    that shares the cache. Workers with a per-process cache keep their snapshot
+    until ``AUTH_USER_CACHE_TTL`` expires.
+    """
+    PREFIX = 'auth_user'
+    # Only what authentication and the serializers read. The password hash is
+    # never cached; its digest is kept for the token revocation check.
+    USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+    @staticmethod
+    def _fields(model, only=None):
+        # In model order, as ``from_db`` expects.
+        return [field.attname for field in model._meta.concrete_fields if only is None or field.attname in only]
+
+    @classmethod
+    def _version_key(cls, user_id):
+        return f'{cls.PREFIX}:ver:{user_id}'
+
+    @classmethod
+    def _version(cls, user_id):
+        key = cls._version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    @classmethod
+    def _snapshot(cls, user):
+        profile = getattr(user, 'profile', None)
+        return {
+            'user': {name: getattr(user, name) for name in cls._fields(User, cls.USER_FIELDS)},
+            'password_digest': get_md5_hash_password(user.password),
+            'profile': {name: getattr(profile, name) for name in cls._fields(Profile)} if profile else None,
+        }
+
+    @classmethod
+    def _restore(cls, snapshot):
+        # Fields left out of the snapshot are deferred and load on first access.
+        names = list(snapshot['user'])
+        user = User.from_db(DEFAULT_DB_ALIAS, names, [snapshot['user'][name] for name in names])
+        user.password_digest = snapshot['password_digest']
+        if snapshot['profile'] is not None:
+            names = list(snapshot['profile'])
+            user.profile = Profile.from_db(DEFAULT_DB_ALIAS, names, [snapshot['profile'][name] for name in names])
+        return user
+
+    @classmethod
+    def get_user(cls, user_id):
+        """
+        Returns the user with ``profile`` preloaded, or None if it does not exist.
+        """
+        key = f'{cls.PREFIX}:{user_id}:{cls._version(user_id)}'
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return cls._restore(snapshot)
+        user = User.objects.select_related('profile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, cls._snapshot(user), settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    @classmethod
+    def _bump(cls, user_id):
+        try:
+            cache.incr(cls._version_key(user_id))
+        except ValueError:
+            cache.set(cls._version_key(user_id), time.time_ns(), None)
+
+    @classmethod
+    def invalidate(cls, user_id):
+        cls._bump(user_id)
+        transaction.on_commit(lambda: cls._bump(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves the token's user from ``UserSnapshotCache``
+    instead of querying ``auth_user`` (and later ``api_profile``) on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = UserSnapshotCache.get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            digest = getattr(user, 'password_digest', None) or get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    Authenticates ``Authorization: Bearer sk_...`` (or ``X-API-Key``) against hashed ``ApiKey`` rows.
+
+    Candidates are found through the indexed ``prefix`` and the digest is
+    compared in constant time. Verified keys are kept in a small per-process
+    LRU for ``CACHE_TTL`` seconds, and ``last_used_at`` is written at most once
+    per ``TOUCH_INTERVAL``. Tokens without the ``sk_`` prefix, and unknown keys,
+    are left to the next authentication class.
+    """
+    keyword = 'Bearer'
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        return settings.API_KEY_AUTH
+
+    @classmethod
+    def _cached(cls, digest):
+        with cls._lock:
+            entry = cls._entries.get(digest)
+            if entry is None:
+                return None
+            if entry['expires'] < time.monotonic():
+                del cls._entries[digest]
+                return None
+            cls._entries.move_to_end(digest)
+            return entry
+
+    @classmethod
+    def _remember(cls, digest, api_key):
+        entry = {'api_key': api_key, 'expires': time.monotonic() + cls._config()['CACHE_TTL']}
+        with cls._lock:
+            cls._entries[digest] = entry
+            cls._entries.move_to_end(digest)
+            while len(cls._entries) > cls._config()['CACHE_SIZE']:
+                cls._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def invalidate(cls, digest=None):
+        with cls._lock:
+            if digest is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(digest, None)
+
+    def _raw_key(self, request):
+        raw_key = request.headers.get('X-API-Key')
+        if not raw_key:
+            auth = get_authorization_header(request).split()
+            if len(auth) != 2 or auth[0].decode().lower() != self.keyword.lower():
+                return None
+            raw_key = auth[1].decode(errors='ignore')
+        raw_key = raw_key.strip()
+        return raw_key if raw_key.startswith(ApiKey.KEY_PREFIX) else None
+
+    @staticmethod
+    def _lookup(raw_key, digest):
+        candidates = ApiKey.objects.filter(prefix=raw_key[:ApiKey.PREFIX_LENGTH])
+        match = None
+        for api_key in candidates:
+            # Compare every candidate so timing does not depend on which one matches.
+            if hmac.compare_digest(api_key.key_hash, digest):
+                match = api_key
+        return match
+
+    def authenticate(self, request):
+        raw_key = self._raw_key(request)
+        if raw_key is None:
+            return None
+        digest = ApiKey.hash_key(raw_key)
+        entry = self._cached(digest)
+        if entry is None:
+            api_key = self._lookup(raw_key, digest)
+            if api_key is None:
+                return None
+            entry = self._remember(digest, api_key)
+        api_key = entry['api_key']
+        if not api_key.is_valid():
+            raise AuthenticationFailed(_('API key is inactive or expired.'), code='api_key_invalid')
+        user = UserSnapshotCache.get_user(api_key.user_id)
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        self._touch(api_key)
+        return user, api_key
+
+    def _touch(self, api_key):
+        now = timezone.now()
+        interval = datetime.timedelta(seconds=self._config()['TOUCH_INTERVAL'])
+        if api_key.last_used_at and now - api_key.last_used_at < interval:
+            return
+        # Conditional update: concurrent workers past the interval write once between them.
+        ApiKey.objects.filter(pk=api_key.pk).filter(
+            Q(last_used_at__isnull=True) | Q(last_used_at__lt=now - interval)
+        ).update(last_used_at=now)
+        api_key.last_used_at = now
+
+    def authenticate_header(self, request):
+        return self.keyword
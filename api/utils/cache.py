@@ -0,0 +1,92 @@
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    """
+    Generation counters for per-user response caching.
+
+    Every cached response key embeds the current generation of its scope
+    (e.g. ``files``) for the user. Model signals bump the generation, which
+    orphans all older entries at once instead of deleting keys one by one.
+
+    A bump only reaches other workers through a shared cache. On a per-process
+    cache (``CACHE_SHARED`` is false) the counters expire after
+    ``RESPONSE_CACHE_TTL``, so another worker serves stale data for at most that long.
+    """
+    PREFIX = 'response'
+
+    @classmethod
+    def _generation_key(cls, scope, user_id):
+        return f'{cls.PREFIX}:gen:{scope}:{user_id}'
+
+    @staticmethod
+    def _generation_timeout():
+        return None if settings.CACHE_SHARED else settings.RESPONSE_CACHE_TTL
+
+    @classmethod
+    def generation(cls, scope, user_id):
+        key = cls._generation_key(scope, user_id)
+        generation = cache.get(key)
+        if generation is None:
+            # Seed from the clock so an evicted counter never reuses an old value.
+            cache.add(key, time.time_ns(), cls._generation_timeout())
+            generation = cache.get(key)
+        return generation
+
+    @classmethod
+    def _bump_now(cls, scopes, user_id):
+        for scope in scopes:
+            key = cls._generation_key(scope, user_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), cls._generation_timeout())
+
+    @classmethod
+    def bump(cls, scopes, user_id):
+        """
+        Invalidates cached responses of ``scopes`` for a user, immediately and again
+        after commit so a concurrent read cannot cache pre-commit rows.
+        """
+        if isinstance(scopes, str):
+            scopes = [scopes]
+        cls._bump_now(scopes, user_id)
+        transaction.on_commit(lambda: cls._bump_now(scopes, user_id))
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses per user and scope, with ETag support.
+
+    The ETag is derived from the scope generation and the request path, so a
+    matching ``If-None-Match`` is answered with 304 from a single cache read.
+    """
+    def cached_response(self, request, scope, build):
+        user_id = request.user.pk
+        generation = ResponseCache.generation(scope, user_id)
+        fingerprint = hashlib.md5(
+            f'{scope}:{user_id}:{generation}:{request.get_full_path()}'.encode()
+        ).hexdigest()
+        etag = f'"{fingerprint}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        key = f'{ResponseCache.PREFIX}:{scope}:{user_id}:{fingerprint}'
+        data = cache.get(key)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+        return Response(data, headers=headers)
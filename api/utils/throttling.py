@@ -0,0 +1,206 @@
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+from api.models import ApiKey
+
+
+def parse_rate(rate):
+    """
+    Parses ``'<count>/<period>'`` (``s``, ``min``, ``h``, ``d``; only the first
+    letter counts) into ``(count, seconds)``. Empty rates return None.
+    """
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period.strip()[0]]
+
+
+def policy(scope):
+    return settings.THROTTLING['POLICIES'].get(scope) or {}
+
+
+def identity(request):
+    """
+    Who a limit applies to: the API key, else the user, else the client address.
+    """
+    if isinstance(request.auth, ApiKey):
+        return f'key:{request.auth.pk}'
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter over the Django cache.
+
+    Each caller has one counter per fixed window, advanced with atomic
+    ``cache.incr``; the sliding estimate weights the previous window by how much
+    of it still overlaps. A caller well under its limit (estimate plus lease at
+    most half the limit) reserves ``LEASE_FRACTION`` of the limit in one
+    increment and spends it from process memory, so most of its requests need no
+    cache round trip. Leased tokens count against the limit at once, so the limit
+    holds across workers; unspent ones lapse with their window.
+    """
+    PREFIX = 'throttle'
+
+    _leases = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _take_lease(cls, lease_key, window):
+        with cls._lock:
+            lease = cls._leases.get(lease_key)
+            if lease is None or lease[0] != window or lease[1] <= 0:
+                return False
+            cls._leases[lease_key] = (window, lease[1] - 1)
+            return True
+
+    @classmethod
+    def acquire(cls, scope, ident, limit, period):
+        """
+        Takes one request from the budget. Returns None if allowed, else the
+        seconds to wait before retrying.
+        """
+        now = time.time()
+        window, offset = divmod(now, period)
+        window = int(window)
+        lease_key = (scope, ident, limit, period)
+        if cls._take_lease(lease_key, window):
+            return None
+
+        current_key = f'{cls.PREFIX}:{scope}:{ident}:{window}'
+        previous_key = f'{cls.PREFIX}:{scope}:{ident}:{window - 1}'
+        counts = cache.get_many([current_key, previous_key])
+        carried = counts.get(previous_key, 0) * (1 - offset / period)
+        current = counts.get(current_key, 0)
+        if carried + current + 1 > limit:
+            return cls._wait(limit, period, offset, counts.get(previous_key, 0), current)
+
+        size = max(1, int(limit * settings.THROTTLING['LEASE_FRACTION']))
+        if carried + current + size > limit / 2:
+            size = 1
+        cache.add(current_key, 0, period * 2)
+        try:
+            total = cache.incr(current_key, size)
+        except ValueError:
+            # Evicted between add and incr; start the window over.
+            cache.set(current_key, size, period * 2)
+            total = size
+        granted = min(size, math.floor(limit - carried - (total - size)))
+        if granted < size:
+            # Lost a race near the limit: hand back what cannot be used.
+            cache.decr(current_key, size - max(granted, 0))
+        if granted <= 0:
+            return cls._wait(limit, period, offset, counts.get(previous_key, 0), total - size)
+        if granted > 1:
+            with cls._lock:
+                cls._leases[lease_key] = (window, granted - 1)
+        return None
+
+    @staticmethod
+    def _wait(limit, period, offset, previous, current):
+        if current + 1 <= limit and previous:
+            # The previous window's weight falls far enough later in this window.
+            needed = 1 - (limit - current - 1) / previous
+            return max(needed * period - offset, 1)
+        return max(period - offset, 1)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._leases.clear()
+
+
+class PolicyThrottle(BaseThrottle):
+    """
+    Applies the ``RATE`` of the view's ``throttle_scope`` policy from
+    ``settings.THROTTLING``. Views without a scope, or scopes without a rate,
+    are not limited. DRF answers refusals with 429 and ``Retry-After``.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = parse_rate(policy(scope).get('RATE'))
+        if rate is None:
+            return True
+        self._wait = RateLimiter.acquire(scope, identity(request), *rate)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class ConcurrencyLimiter:
+    """
+    Holds in-flight requests per caller as ``cap`` slot keys in the Django
+    cache, each taken with an atomic ``cache.add``. Every slot expires
+    ``CONCURRENCY_TTL`` seconds after it was taken, so a worker that dies
+    mid-request frees its own slot without touching the others.
+    """
+    PREFIX = 'inflight'
+
+    @classmethod
+    def acquire(cls, scope, ident, cap):
+        """
+        Returns the key of a free slot, or None if all ``cap`` are taken.
+        """
+        for slot in range(cap):
+            key = f'{cls.PREFIX}:{scope}:{ident}:{slot}'
+            if cache.add(key, 1, settings.THROTTLING['CONCURRENCY_TTL']):
+                return key
+        return None
+
+    @staticmethod
+    def release(key):
+        cache.delete(key)
+
+
+class ConcurrencyLimitMixin:
+    """
+    Caps in-flight requests per caller at the ``CONCURRENCY`` of the view's
+    ``throttle_scope`` policy. The slot is held until the response is returned,
+    or for streamed responses until the stream ends.
+    """
+    _concurrency_slot = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = getattr(self, 'throttle_scope', None)
+        cap = policy(scope).get('CONCURRENCY')
+        if cap:
+            self._concurrency_slot = ConcurrencyLimiter.acquire(scope, identity(request), cap)
+            if self._concurrency_slot is None:
+                raise Throttled(wait=settings.THROTTLING['CONCURRENCY_RETRY_AFTER'])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        slot, self._concurrency_slot = self._concurrency_slot, None
+        if slot is None:
+            return response
+        if getattr(response, 'streaming', False):
+            response.streaming_content = self._release_after(response.streaming_content, response.is_async, slot)
+        else:
+            ConcurrencyLimiter.release(slot)
+        return response
+
+    @staticmethod
+    def _release_after(content, is_async, slot):
+        if is_async:
+            async def stream():
+                try:
+                    async for chunk in content:
+                        yield chunk
+                finally:
+                    ConcurrencyLimiter.release(slot)
+        else:
+            def stream():
+                try:
+                    yield from content
+                finally:
+                    ConcurrencyLimiter.release(slot)
+        return stream()
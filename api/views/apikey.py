@@ -1,8 +1,9 @@
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
-from api.models import ApiKey, ActivityLog
-from api.serializers.apikey import ApiKeySerializer
+from api.models import ApiKey
+from api.serializers.apikey import ApiKeySerializer, ApiKeyCreateResponseSerializer
+from api.services.activity_log_service import ActivityLogWriter
 from api.utils.permissions import IsOwner
 
 class ApiKeyViewSet(viewsets.ReadOnlyModelViewSet):
@@ -13,7 +14,14 @@ class ApiKeyViewSet(viewsets.ReadOnlyModelViewSet):
         return ApiKey.objects.filter(user=self.request.user)
 
     def create(self, request, *args, **kwargs):
-        return Response({'detail': 'API Key generation disabled. Use ENV.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        api_key = serializer.save(user=request.user)
+        ActivityLogWriter.log(
+            request.user, 'api_key_generated', f"Generated API key: {api_key.name}",
+            details={'api_key_id': str(api_key.id), 'prefix': api_key.prefix}, request=request
+        )
+        return Response(ApiKeyCreateResponseSerializer(api_key).data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, *args, **kwargs):
         return Response({'detail': 'API Key deletion disabled. Use ENV.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -7,7 +7,9 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from api.serializers.auth import LoginSerializer, ChangePasswordSerializer, DevLoginSerializer
-from api.models import ActivityLog
+from api.services.activity_log_service import ActivityLogWriter
+from api.services.email_service import EmailService
+from api.utils.authentication import UserSnapshotCache
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
@@ -31,13 +33,14 @@ class CustomTokenObtainPairView(TokenObtainPairView):
              # Log login
             try:
                 user = User.objects.get(email=request.data.get('email') or request.data.get('username'))
-                ActivityLog.objects.create(user=user, action_type='login', description="User Login via Password")
+                ActivityLogWriter.log(user, 'login', "User Login via Password", request=request)
             except:
                 pass
         return response
 
 class DevLoginView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'dev_login'
 
     def post(self, request):
         serializer = DevLoginSerializer(data=request.data)
@@ -47,11 +50,12 @@ class DevLoginView(views.APIView):
             if created:
                 user.set_unusable_password()
                 user.save()
+                EmailService.send_welcome_email(user)
             
             refresh = RefreshToken.for_user(user)
             
             # Log login
-            ActivityLog.objects.create(user=user, action_type='login', description="Developer Login")
+            ActivityLogWriter.log(user, 'login', "Developer Login", request=request)
 
             return Response({
                 'refresh': str(refresh),
@@ -78,8 +82,9 @@ class ChangePasswordView(views.APIView):
             
             user.set_password(serializer.validated_data['new_password'])
             user.save()
+            UserSnapshotCache.invalidate(user.pk)
             
-            ActivityLog.objects.create(user=user, action_type='settings_update', description="Changed Password")
+            ActivityLogWriter.log(user, 'settings_update', "Changed Password", request=request)
             
             return Response({"status": "password set"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1,20 +1,26 @@
 
 from rest_framework import viewsets, permissions
-from api.models import Category, ActivityLog
+from api.models import Category
+from api.services.activity_log_service import ActivityLogWriter
 from api.serializers.category import CategorySerializer
 from api.utils.permissions import IsOwner
+from api.utils.cache import CachedResponseMixin
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
     def get_queryset(self):
-        return Category.objects.filter(user=self.request.user)
+        return Category.objects.filter(user=self.request.user).with_file_count()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, 'categories', lambda: super(CategoryViewSet, self).list(request, *args, **kwargs))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        ActivityLog.objects.create(
-            user=self.request.user,
-            action_type='create_category',
-            description=f"Created category: {serializer.instance.name}"
+        ActivityLogWriter.log(
+            self.request.user,
+            'create_category',
+            f"Created category: {serializer.instance.name}",
+            request=self.request
         )
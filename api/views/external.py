@@ -1,52 +1,63 @@
+import hmac
 from rest_framework import views, status, permissions
 from rest_framework.response import Response
 from django.conf import settings
+from api.models import ApiKey
+from api.utils.authentication import ApiKeyAuthentication
+from api.utils.throttling import ConcurrencyLimitMixin
 from api.utils.validators import sanitize_api_key
-from api.models import StorageCredential
-from api.services.storage_service import StorageService
-import random
+from api.services.storage_service import UploadSource
+from api.services.upload_service import UploadService, UploadFailed
+from api.services.provider_scheduler import ProviderScheduler
+from api.services.credential_registry import CredentialRegistry
 
-class ExternalUploadView(views.APIView):
+class ExternalUploadView(ConcurrencyLimitMixin, views.APIView):
     permission_classes = [permissions.AllowAny]
-    authentication_classes = []
+    authentication_classes = [ApiKeyAuthentication]
+    throttle_scope = 'upload'
 
     def post(self, request):
-        auth = request.headers.get('Authorization', '')
-        if not settings.EXTERNAL_UPLOAD_API_KEY:
-            return Response({'error': 'EXTERNAL_UPLOAD_API_KEY not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        if not auth.startswith('Bearer '):
-            return Response({'error': 'Missing Bearer token'}, status=status.HTTP_401_UNAUTHORIZED)
-        token = sanitize_api_key(auth.replace('Bearer ', ''))
-        if token != sanitize_api_key(settings.EXTERNAL_UPLOAD_API_KEY):
-            return Response({'error': 'Invalid API key'}, status=status.HTTP_403_FORBIDDEN)
+        if isinstance(request.auth, ApiKey):
+            if request.auth.scopes and 'upload' not in request.auth.scopes:
+                return Response({'error': 'API key lacks the upload scope'}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            auth = request.headers.get('Authorization', '')
+            if not settings.EXTERNAL_UPLOAD_API_KEY:
+                return Response({'error': 'EXTERNAL_UPLOAD_API_KEY not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if not auth.startswith('Bearer '):
+                return Response({'error': 'Missing Bearer token'}, status=status.HTTP_401_UNAUTHORIZED)
+            token = sanitize_api_key(auth.replace('Bearer ', ''))
+            if not hmac.compare_digest(token, sanitize_api_key(settings.EXTERNAL_UPLOAD_API_KEY)):
+                return Response({'error': 'Invalid API key'}, status=status.HTTP_403_FORBIDDEN)
 
         upfile = request.FILES.get('file')
         if not upfile:
             return Response({'error': 'file is required (multipart/form-data)'}, status=status.HTTP_400_BAD_REQUEST)
-        file_bytes = upfile.read()
+        # Stream from the spooled upload instead of reading it into memory
+        source = UploadSource.from_uploaded_file(upfile)
         file_name = upfile.name
 
         provider = request.data.get('provider')
-        qs = StorageCredential.objects.filter(is_active=True)
-        if provider:
-            qs = qs.filter(provider=provider)
-        creds = list(qs)
+        creds = CredentialRegistry.get(provider)
         if not creds:
             return Response({'error': 'No active storage credentials'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        random.shuffle(creds)
+        creds = ProviderScheduler.order(creds)
+        if not creds:
+            return Response({'error': 'All storage providers are temporarily unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        strategy = request.data.get('strategy') or None
+        if strategy and strategy not in UploadService.STRATEGIES:
+            return Response({'error': f"strategy must be one of {', '.join(UploadService.STRATEGIES)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        errors = []
-        for cred in creds:
-            try:
-                if cred.provider == 'imagekit':
-                    res = StorageService.upload_imagekit(cred, file_bytes, file_name)
-                elif cred.provider == 'cloudinary':
-                    res = StorageService.upload_cloudinary(cred, file_bytes, file_name)
-                else:
-                    raise Exception(f'Unsupported provider {cred.provider}')
-                return Response({'success': True, 'data': res, 'provider': cred.name}, status=status.HTTP_200_OK)
-            except Exception as e:
-                errors.append({'provider': cred.name, 'error': str(e)})
-                continue
+        try:
+            result = UploadService.upload(creds, source, file_name, strategy=strategy)
+        except UploadFailed as e:
+            return Response({'success': False, 'errors': e.errors}, status=status.HTTP_502_BAD_GATEWAY)
 
-        return Response({'success': False, 'errors': errors}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({
+            'success': True,
+            'data': result['data'],
+            'provider': result['credential'].name,
+            'strategy': result['strategy'],
+            'latency_ms': result['latency_ms'],
+        }, status=status.HTTP_200_OK)
@@ -1,41 +1,118 @@
+import json
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from api.models import File, Category, ActivityLog
-from api.serializers.file import FileSerializer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from api.models import File, Category, normalize_folder_path
+from api.services.activity_log_service import ActivityLogWriter
+from api.services.file_ingest_service import FileIngestService
+from api.services.file_batch_service import FileBatchService
+from api.services.search_service import SearchService
+from api.serializers.file import FileSerializer, FileBatchSerializer
 from api.serializers.category import CategorySerializer
 from api.utils.permissions import IsOwner
+from api.utils.pagination import KeysetPagination
+from api.utils.cache import CachedResponseMixin
+from api.utils.parsers import NDJSONParser
 
-class FileViewSet(viewsets.ModelViewSet):
+class FileViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = FileSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    pagination_class = KeysetPagination
     filterset_fields = ['file_type', 'is_favorite']
-    search_fields = ['name']
 
     def get_queryset(self):
-        queryset = File.objects.filter(user=self.request.user).select_related('storage_account').prefetch_related('categories')
+        queryset = File.objects.filter(user=self.request.user).select_related('storage_account').prefetch_related(
+            Prefetch('categories', queryset=Category.objects.with_file_count())
+        )
         category_id = self.request.query_params.get('category_id')
         if category_id:
             queryset = queryset.filter(categories__id=category_id)
+        folder_path = self.request.query_params.get('folder_path')
+        if folder_path:
+            queryset = queryset.filter(folder_path=normalize_folder_path(folder_path))
+        tag = self.request.query_params.get('tag')
+        if tag:
+            queryset = queryset.filter(file_tags__tag__user=self.request.user, file_tags__tag__name=tag)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = SearchService.search(queryset, search)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, 'files', lambda: super(FileViewSet, self).list(request, *args, **kwargs))
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     def perform_destroy(self, instance):
         # Trigger external deletion logic here via service if needed
-        ActivityLog.objects.create(
-            user=self.request.user, 
-            action_type='delete', 
-            description=f"Deleted file: {instance.name}"
+        ActivityLogWriter.log(
+            self.request.user,
+            'delete',
+            f"Deleted file: {instance.name}",
+            request=self.request
         )
         instance.delete()
 
+    @action(detail=False, methods=['post'], parser_classes=[NDJSONParser, JSONParser])
+    def bulk(self, request):
+        """
+        Registers many files from an NDJSON stream or a JSON array of file objects.
+        """
+        rows = request.data
+        if isinstance(rows, dict):
+            return Response({'error': 'Expected a JSON array or NDJSON stream of file objects'}, status=status.HTTP_400_BAD_REQUEST)
+        result = FileIngestService.ingest(request.user, rows, context=self.get_serializer_context())
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked search (``?q=``, ``?limit=`` up to 200) over names, tags and category names.
+        Every term matches as a word prefix.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = SearchService.search(self.get_queryset(), query).order_by('-search_rank', '-created_at', '-id')[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({'query': query, 'results': serializer.data})
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Applies one operation to the files selected by ``ids`` or ``filter``.
+        """
+        serializer = FileBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        op = params.pop('op')
+        ids = params.pop('ids', None)
+        filters = params.pop('filter', None)
+        result = FileBatchService.run(request.user, op, ids=ids, filters=filters, **params)
+        # UUIDs (category_ids, filter.category_id) as strings, as the JSON column needs.
+        details = json.loads(json.dumps(
+            {**result, **params, 'id_count': len(ids) if ids else None, 'filter': filters}, cls=DjangoJSONEncoder
+        ))
+        ActivityLogWriter.log(
+            request.user,
+            'delete' if op == 'delete' else 'update',
+            f"Batch {op}: {result['affected']} of {result['matched']} files",
+            details=details,
+            request=request
+        )
+        return Response(result)
+
     @action(detail=True, methods=['get'])
     def categories(self, request, pk=None):
         file = self.get_object()
-        serializer = CategorySerializer(file.categories.all(), many=True)
+        serializer = CategorySerializer(file.categories.with_file_count(), many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -45,10 +122,11 @@ class FileViewSet(viewsets.ModelViewSet):
         categories = Category.objects.filter(id__in=category_ids, user=request.user)
         file.categories.set(categories)
         
-        ActivityLog.objects.create(
-            user=request.user, 
-            action_type='update', 
-            description=f"Updated categories for file: {file.name}"
+        ActivityLogWriter.log(
+            request.user,
+            'update',
+            f"Updated categories for file: {file.name}",
+            request=request
         )
         
         return Response({'status': 'categories updated'})
@@ -0,0 +1,21 @@
+from rest_framework import views, permissions
+from rest_framework.response import Response
+from api.models import Folder, normalize_folder_path
+from api.serializers.folder import FolderSerializer
+from api.services.folder_service import FolderService
+
+class FolderView(views.APIView):
+    """
+    Lists a virtual folder (``?path=``, default ``/``) and its immediate subfolders with recursive totals.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        path = normalize_folder_path(request.query_params.get('path', '/'))
+        folder, children = FolderService.listing(request.user, path)
+        if folder is None:
+            folder = Folder.for_path(request.user.pk, path)
+        return Response({
+            'folder': FolderSerializer(folder).data,
+            'children': FolderSerializer(children, many=True).data,
+        })
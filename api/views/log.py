@@ -3,10 +3,12 @@ from rest_framework import viewsets, permissions
 from api.models import ActivityLog
 from api.serializers.log import ActivityLogSerializer
 from api.utils.permissions import IsOwner
+from api.utils.pagination import KeysetPagination
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return ActivityLog.objects.filter(user=self.request.user)
@@ -1,10 +1,15 @@
 
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from rest_framework import views, permissions, status
 from rest_framework.response import Response
-from api.services.ai_service import AIService
+from api.services.ai_service import AIService, CompletionCache
+from api.utils.permissions import IsAdminUser
+from api.utils.throttling import ConcurrencyLimitMixin
 
-class AIProxyView(views.APIView):
+class AIProxyView(ConcurrencyLimitMixin, views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'ai'
 
     def post(self, request):
         try:
@@ -18,11 +23,34 @@ class AIProxyView(views.APIView):
                 else:
                     return Response({'error': 'No messages or prompt provided'}, status=status.HTTP_400_BAD_REQUEST)
 
+            if request.data.get('stream'):
+                if not isinstance(request._request, ASGIRequest):
+                    # WSGI servers buffer the whole stream (and hold a worker for it).
+                    return Response(
+                        {'error': 'Streaming is only available when served through ASGI; omit "stream".'},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                # Served by an async iterator: streams without holding a worker under ASGI.
+                return StreamingHttpResponse(
+                    AIService.stream_events(messages),
+                    content_type='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                )
+
             response = AIService.generate_response(messages)
             return Response(response)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class AIMetricsView(views.APIView):
+    """
+    Completion cache and streaming counters of the serving process.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'cache': CompletionCache.stats(), 'stream': AIService.stream_metrics()})
+
 class HealthCheckView(views.APIView):
     permission_classes = [permissions.AllowAny]
     def get(self, request):
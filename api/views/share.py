@@ -0,0 +1,25 @@
+from django.http import HttpResponseRedirect, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from api.services.share_service import ShareLinkError, ShareLinkService
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def share_link(request, token):
+    """
+    Public ``/s/<token>``: redirects to the shared file. A plain Django view, so no
+    authentication or session work runs. Password-protected links take the
+    password in the ``X-Share-Password`` header or a POSTed ``password`` form
+    field, never in the URL, where it would end up in access logs.
+    """
+    password = request.headers.get('X-Share-Password') or request.POST.get('password')
+    try:
+        url = ShareLinkService.resolve(token, password)
+    except ShareLinkError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    response = HttpResponseRedirect(url)
+    # Every visit must reach us to be counted, and the token must not leak to the provider.
+    response['Cache-Control'] = 'private, no-store'
+    response['Referrer-Policy'] = 'no-referrer'
+    return response
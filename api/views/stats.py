@@ -0,0 +1,14 @@
+from rest_framework import views, permissions
+from rest_framework.response import Response
+from api.services.stats_service import StatsService
+from api.utils.cache import CachedResponseMixin
+
+class StatsView(CachedResponseMixin, views.APIView):
+    """
+    File counts and bytes per ``file_type``, ``extension``, ``storage_account``,
+    ``is_favorite`` and ``month`` of creation, plus the overall ``total``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return self.cached_response(request, 'stats', lambda: Response(StatsService.summary(request.user)))
@@ -1,6 +1,7 @@
 
 from rest_framework import viewsets, permissions
-from api.models import StorageCredential, ActivityLog
+from api.models import StorageCredential
+from api.services.activity_log_service import ActivityLogWriter
 from api.serializers.storage import StorageCredentialSerializer
 from api.utils.permissions import IsOwner
 
@@ -13,8 +14,9 @@ class StorageCredentialViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        ActivityLog.objects.create(
-            user=self.request.user,
-            action_type='settings_update',
-            description=f"Added storage credential: {serializer.instance.name}"
+        ActivityLogWriter.log(
+            self.request.user,
+            'settings_update',
+            f"Added storage credential: {serializer.instance.name}",
+            request=self.request
         )
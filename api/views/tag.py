@@ -0,0 +1,16 @@
+from rest_framework import views, permissions, status
+from rest_framework.response import Response
+from api.services.tag_service import TagService
+
+class TagFacetView(views.APIView):
+    """
+    Tag cloud: ``[{'name', 'file_count'}]`` most used first, optionally narrowed by ``?prefix=``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': TagService.facets(request.user, request.query_params.get('prefix'), limit)})
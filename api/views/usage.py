@@ -0,0 +1,10 @@
+
+from rest_framework import views, permissions
+from rest_framework.response import Response
+from api.services.usage_service import UsageService
+
+class UsageView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(UsageService.summary(request.user))
@@ -4,9 +4,10 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from api.models import Profile
 from api.serializers.user import ProfileSerializer, ProfileUpdateSerializer
-from api.models import ActivityLog
+from api.services.activity_log_service import ActivityLogWriter
+from api.utils.cache import CachedResponseMixin
 
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     http_method_names = ['get', 'patch']
@@ -19,8 +20,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def me(self, request):
-        serializer = self.get_serializer(request.user.profile)
-        return Response(serializer.data)
+        return self.cached_response(request, 'profile', lambda: Response(self.get_serializer(request.user.profile).data))
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -28,6 +28,6 @@ class ProfileViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         
-        ActivityLog.objects.create(user=request.user, action_type='settings_update', description="Updated Profile")
+        ActivityLogWriter.log(request.user, 'settings_update', "Updated Profile", request=request)
         
         return Response(ProfileSerializer(instance).data)
@@ -1,5 +1,6 @@
 
 import os
+import sys
 from pathlib import Path
 import dj_database_url
 
@@ -18,6 +19,9 @@ DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['*'] # For Vercel, ideally specific domains
 
+# True under `manage.py test` or pytest; keeps background pipelines synchronous
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 # External API Key (ENV-based)
 EXTERNAL_UPLOAD_API_KEY = os.environ.get('EXTERNAL_UPLOAD_API_KEY', '').strip()
 
@@ -69,6 +73,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Database
@@ -90,6 +95,33 @@ DATABASES = {
     )
 }
 
+# Cache
+# CACHE_BACKEND: locmem (default, per process), file or redis (any Redis-compatible
+# server; requires the `redis` package). CACHE_LOCATION overrides the default location.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'default'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/tmp/django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 300)),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'storage'),
+    }
+}
+
+# Invalidation of cached responses (and auth snapshots) bumps counters in this cache,
+# which other workers only see when it is shared. On locmem each process keeps its own
+# counters, so cached entries are bounded by short TTLs instead of invalidated.
+CACHE_SHARED = CACHE_BACKEND != 'locmem'
+
+# Seconds a cached GET response (and, on a per-process cache, its ETag) stays valid
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300 if CACHE_SHARED else 30))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -135,6 +167,13 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Default per-user storage quota in bytes (0 = unlimited); Profile.storage_quota_bytes overrides it
+STORAGE_QUOTA_BYTES = int(os.environ.get('STORAGE_QUOTA_BYTES', 0))
+
+# Uploads above this size are spooled to a temp file instead of memory; the
+# external upload path streams from that file to the storage provider.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', 2621440))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
@@ -143,11 +182,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.utils.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.utils.throttling.PolicyThrottle',
+    ),
+    # Trusted reverse proxies in front of the app. Anonymous callers are
+    # throttled by REMOTE_ADDR (0) or by the address the last proxy appended to
+    # X-Forwarded-For, never by entries the client can forge.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 from datetime import timedelta
@@ -156,5 +202,146 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Outbound HTTP (storage providers, AI endpoint): pooled keep-alive sessions
+HTTP_CLIENT = {
+    'POOL_CONNECTIONS': int(os.environ.get('HTTP_POOL_CONNECTIONS', 10)),
+    'POOL_MAXSIZE': int(os.environ.get('HTTP_POOL_MAXSIZE', 20)),
+    'CONNECT_TIMEOUT': float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.environ.get('HTTP_READ_TIMEOUT', 60)),
+    'MAX_RETRIES': int(os.environ.get('HTTP_MAX_RETRIES', 2)),
+    'BACKOFF_FACTOR': float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3)),
+}
+
+# External upload failover across storage credentials
+# STRATEGY: sequential | hedged | race (clients may override per request)
+UPLOAD_FAILOVER = {
+    'STRATEGY': os.environ.get('UPLOAD_STRATEGY', 'sequential'),
+    'POOL_SIZE': int(os.environ.get('UPLOAD_POOL_SIZE', 8)),
+    'HEDGE_DELAY': float(os.environ.get('UPLOAD_HEDGE_DELAY', 3)),
+    'RACE_WIDTH': int(os.environ.get('UPLOAD_RACE_WIDTH', 2)),
+}
+
+# Health-aware credential ordering for uploads (EWMA latency + circuit breakers).
+# SHARED keeps breaker state in the Django cache so all workers see it.
+PROVIDER_SCHEDULER = {
+    'EWMA_ALPHA': float(os.environ.get('PROVIDER_EWMA_ALPHA', 0.3)),
+    'ERROR_PENALTY': float(os.environ.get('PROVIDER_ERROR_PENALTY', 4)),
+    'FAILURE_THRESHOLD': int(os.environ.get('PROVIDER_FAILURE_THRESHOLD', 3)),
+    'OPEN_SECONDS': float(os.environ.get('PROVIDER_OPEN_SECONDS', 30)),
+    'SHARED': os.environ.get('PROVIDER_SCHEDULER_SHARED', 'False') == 'True',
+    'SHARED_TTL': int(os.environ.get('PROVIDER_SCHEDULER_SHARED_TTL', 600)),
+}
+
+# Cached active StorageCredential rows for the upload path
+CREDENTIAL_REGISTRY = {
+    'TTL': int(os.environ.get('CREDENTIAL_REGISTRY_TTL', 300)),
+    'SHARED': os.environ.get('CREDENTIAL_REGISTRY_SHARED', 'False') == 'True',
+}
+
+# Activity log writer: async mode batches inserts on a background thread
+ACTIVITY_LOG = {
+    # Opt-in: the background writer loses queued entries if the process is
+    # frozen or killed (e.g. serverless), so entries are written inline by default.
+    'ASYNC': os.environ.get('ACTIVITY_LOG_ASYNC', 'False') == 'True' and not TESTING,
+    'BATCH_SIZE': int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 200)),
+    'FLUSH_INTERVAL': float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 1.0)),
+    'MAX_QUEUE': int(os.environ.get('ACTIVITY_LOG_MAX_QUEUE', 10000)),
+    'RETENTION_DAYS': int(os.environ.get('ACTIVITY_LOG_RETENTION_DAYS', 90)),
+}
+
+# Seconds a cached user+profile snapshot is trusted by CachedJWTAuthentication. Version
+# bumps only reach other workers on a shared cache (CACHE_SHARED), so the per-process
+# default is short: a deactivated user or changed role is picked up within it.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 300 if CACHE_SHARED else 30))
+
+# Bulk file ingestion (/api/files/bulk/)
+FILE_BULK = {
+    'CHUNK_SIZE': int(os.environ.get('FILE_BULK_CHUNK_SIZE', 500)),
+    'MAX_ROWS': int(os.environ.get('FILE_BULK_MAX_ROWS', 10000)),
+}
+
+# Batch file operations (/api/files/batch/)
+FILE_BATCH = {
+    'CHUNK_SIZE': int(os.environ.get('FILE_BATCH_CHUNK_SIZE', 1000)),
+}
+
+# Hashed API key authentication: verified keys are cached per process
+API_KEY_AUTH = {
+    'CACHE_TTL': int(os.environ.get('API_KEY_CACHE_TTL', 60)),
+    'CACHE_SIZE': int(os.environ.get('API_KEY_CACHE_SIZE', 1024)),
+    'TOUCH_INTERVAL': int(os.environ.get('API_KEY_TOUCH_INTERVAL', 300)),
+}
+
+# Per-process cache of identical (non-streamed) AI completions; TTL 0 disables it
+AI_CACHE = {
+    'TTL': int(os.environ.get('AI_CACHE_TTL', 3600)),
+    'SIZE': int(os.environ.get('AI_CACHE_SIZE', 256)),
+}
+
+# Per-endpoint limits (views opt in with ``throttle_scope``), kept in the Django
+# cache. RATE is '<count>/<s|min|h|d>' (empty disables); CONCURRENCY caps
+# in-flight requests per caller (0 disables).
+THROTTLING = {
+    'LEASE_FRACTION': float(os.environ.get('THROTTLE_LEASE_FRACTION', 0.1)),
+    'CONCURRENCY_TTL': int(os.environ.get('THROTTLE_CONCURRENCY_TTL', 300)),
+    'CONCURRENCY_RETRY_AFTER': int(os.environ.get('THROTTLE_CONCURRENCY_RETRY_AFTER', 1)),
+    'POLICIES': {
+        'ai': {
+            'RATE': os.environ.get('THROTTLE_AI_RATE', '30/min'),
+            'CONCURRENCY': int(os.environ.get('THROTTLE_AI_CONCURRENCY', 2)),
+        },
+        'upload': {
+            'RATE': os.environ.get('THROTTLE_UPLOAD_RATE', '120/min'),
+            'CONCURRENCY': int(os.environ.get('THROTTLE_UPLOAD_CONCURRENCY', 4)),
+        },
+        'dev_login': {
+            'RATE': os.environ.get('THROTTLE_DEV_LOGIN_RATE', '10/min'),
+            'CONCURRENCY': 0,
+        },
+    },
+}
+
+# Background jobs (manage.py run_jobs). Failed jobs retry after
+# BACKOFF_BASE * 2^(attempt-1) seconds (capped at BACKOFF_MAX) up to MAX_ATTEMPTS.
+JOBS = {
+    'THREADS': int(os.environ.get('JOBS_THREADS', 4)),
+    'PROCESSES': int(os.environ.get('JOBS_PROCESSES', 1)),
+    'POLL_INTERVAL': float(os.environ.get('JOBS_POLL_INTERVAL', 2)),
+    'MAX_ATTEMPTS': int(os.environ.get('JOBS_MAX_ATTEMPTS', 5)),
+    'BATCH_SIZE': int(os.environ.get('JOBS_BATCH_SIZE', 50)),
+    'BACKOFF_BASE': float(os.environ.get('JOBS_BACKOFF_BASE', 10)),
+    'BACKOFF_MAX': float(os.environ.get('JOBS_BACKOFF_MAX', 3600)),
+    'LEASE_TIMEOUT': int(os.environ.get('JOBS_LEASE_TIMEOUT', 900)),
+    'THUMBNAILS': os.environ.get('JOBS_THUMBNAILS', 'True') == 'True',
+    'THUMBNAIL_SIZE': int(os.environ.get('JOBS_THUMBNAIL_SIZE', 300)),
+    'AI_TAGGING': os.environ.get('JOBS_AI_TAGGING', 'False') == 'True',
+}
+
+# Outbound mail, sent by run_jobs from the 'mail' queue. Use
+# django.core.mail.backends.filebased.EmailBackend (with EMAIL_FILE_PATH) or
+# locmem locally; tests always use locmem.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_USE_SSL = os.environ.get('EMAIL_USE_SSL', 'False') == 'True'
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 10))
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', str(BASE_DIR / 'tmp' / 'emails'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+EMAIL_QUEUE = {
+    'MAX_ATTEMPTS': int(os.environ.get('EMAIL_MAX_ATTEMPTS', 8)),
+    'KEEPALIVE': float(os.environ.get('EMAIL_KEEPALIVE', 60)),
+}
+
+# Public share links (/s/<token>): cached token lookups and coalesced download counts
+SHARE_LINKS = {
+    'CACHE_TTL': int(os.environ.get('SHARE_LINK_CACHE_TTL', 60)),
+    'FLUSH_THRESHOLD': int(os.environ.get('SHARE_LINK_FLUSH_THRESHOLD', 10)),
+    'FLUSH_INTERVAL': float(os.environ.get('SHARE_LINK_FLUSH_INTERVAL', 60)),
+}
+
 # CORS Config
 CORS_ALLOW_ALL_ORIGINS = True
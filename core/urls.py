@@ -2,6 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from api.views.share import share_link
 
 def home(request):
     return JsonResponse({"message": "Django Backend is Running", "status": "ok"})
@@ -10,4 +11,5 @@ urlpatterns = [
     path('', home),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('s/<str:token>', share_link, name='share_link'),
 ]